@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# benchmark_turkish_analyzer.py
+# Türkçe analyzer zincirinin (normalizer + stemmer) kitap korpusu üzerinde token/saniye ölçümü
+
+import sys
+import time
+import logging
+import argparse
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent))
+
+from whoosh.analysis import Filter, RegexTokenizer, LowercaseFilter
+
+from config import INDEX_DIR, PDF_DIR
+from turkish_search_utils import (
+    create_turkish_analyzer, stem_turkish_word, VOWEL_NORMALIZE_MAP, _stemmer
+)
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class LegacyVowelNormalizer(Filter):
+    """Önceki sürüm: karakter başına sözlük araması"""
+
+    def __call__(self, tokens):
+        for token in tokens:
+            token.text = ''.join(VOWEL_NORMALIZE_MAP.get(char, char) for char in token.text)
+            yield token
+
+
+class LegacyStemFilter(Filter):
+    """Önceki sürüm: her token için TurkishStemmer.stem çağrısı"""
+
+    def __call__(self, tokens):
+        for token in tokens:
+            if _stemmer and len(token.text) > 2:
+                try:
+                    stemmed = _stemmer.stem(token.text)
+                    if stemmed and len(stemmed) > 1:
+                        token.text = stemmed
+                except Exception:
+                    pass
+            yield token
+
+
+def load_book_pages(max_pages):
+    """Kitap sayfalarını önce Whoosh indeksinden, yoksa yerel PDF'lerden oku"""
+    pages = []
+    try:
+        from whoosh.index import open_dir
+        ix = open_dir(str(INDEX_DIR))
+        with ix.searcher() as searcher:
+            for fields in searcher.all_stored_fields():
+                if fields.get('type') == 'book' and fields.get('content'):
+                    pages.append(fields['content'])
+                    if len(pages) >= max_pages:
+                        break
+    except Exception as e:
+        logger.warning(f"Whoosh index okunamadı ({e}), yerel PDF'ler deneniyor")
+
+    if not pages:
+        import fitz
+        for pdf_path in sorted(Path(PDF_DIR).glob("*.pdf")):
+            try:
+                doc = fitz.open(pdf_path)
+            except Exception as e:
+                logger.warning(f"PDF açılamadı {pdf_path.name}: {e}")
+                continue
+            with doc:
+                for page in doc:
+                    text = page.get_text("text").strip()
+                    if text:
+                        pages.append(text)
+                    if len(pages) >= max_pages:
+                        return pages
+    return pages
+
+
+def measure(analyzer, pages, rounds):
+    """İlk turun (soğuk stem önbelleği) ve en iyi turun token/saniye değerleri"""
+    rates = []
+    tokens = 0
+    for _ in range(rounds):
+        start = time.perf_counter()
+        tokens = sum(1 for text in pages for _ in analyzer(text))
+        elapsed = time.perf_counter() - start
+        rates.append(tokens / elapsed if elapsed else 0.0)
+    return tokens, rates[0], max(rates)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Turkish analyzer throughput benchmark (tokens/sec)')
+    parser.add_argument('--max-pages', type=int, default=2000, help='Number of book pages to analyze')
+    parser.add_argument('--rounds', type=int, default=3, help='Rounds per analyzer (best is reported)')
+    parser.add_argument('--text-file', help='Use paragraphs of a UTF-8 text file instead of the book corpus')
+    args = parser.parse_args()
+
+    if args.text_file:
+        text = Path(args.text_file).read_text(encoding='utf-8')
+        pages = [p for p in text.split("\n\n") if p.strip()][:args.max_pages]
+    else:
+        pages = load_book_pages(args.max_pages)
+    if not pages:
+        logger.error("Kitap korpusu bulunamadı (index veya PDF yok)")
+        return
+    logger.info(f"Benchmarking on {len(pages)} pages, {sum(len(p) for p in pages)} characters")
+
+    analyzers = {
+        "legacy": RegexTokenizer() | LowercaseFilter() | LegacyVowelNormalizer() | LegacyStemFilter(),
+        "current": create_turkish_analyzer(),
+    }
+
+    # Çıktılar birebir aynı olmalı
+    sample = pages[:50]
+    expected = [[t.text for t in analyzers["legacy"](text)] for text in sample]
+    actual = [[t.text for t in analyzers["current"](text)] for text in sample]
+    if expected != actual:
+        logger.error("Current analyzer output differs from legacy output")
+        return
+
+    print(f"\n{'analyzer':<10} {'tokens':>10} {'cold tok/s':>12} {'best tok/s':>12}")
+    print("-" * 47)
+    results = {}
+    for name, analyzer in analyzers.items():
+        stem_turkish_word.cache_clear()
+        tokens, cold, best = measure(analyzer, pages, args.rounds)
+        results[name] = (cold, best)
+        print(f"{name:<10} {tokens:>10} {cold:>12.0f} {best:>12.0f}")
+    print(f"\nspeedup: cold {results['current'][0] / results['legacy'][0]:.2f}x, "
+          f"best {results['current'][1] / results['legacy'][1]:.2f}x")
+    print(f"stem cache: {stem_turkish_word.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
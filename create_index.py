@@ -1,5 +1,5 @@
 # create_index.py
-# Versiyon 2.2 - Backblaze'den PDF'leri indirip indeksleme
+# Versiyon 2.3 - Backblaze'den PDF'leri paralel indirip, devam ettirilebilir şekilde indeksleme
 
 import os
 from pathlib import Path
@@ -11,10 +11,15 @@ from bs4 import BeautifulSoup
 import json
 import requests
 import tempfile
+import shutil
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 
-from whoosh.index import create_in
+from whoosh.index import create_in, open_dir, exists_in
 from whoosh.fields import Schema, TEXT, ID
 from turkish_search_utils import create_turkish_analyzer
+from search_index import write_author_facet
+from spelling_index import build_spelling_index, spelling_index_outdated
 
 # Temel yapılandırma
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -27,6 +32,16 @@ PDF_DIR = DATA_DIR / "pdfler"
 INDEX_DIR = DATA_DIR / "whoosh_index"
 ARTICLES_DB_PATH = DATA_DIR / "articles_database.db"
 BOOK_METADATA_PATH = DATA_DIR / "book_metadata.json"
+# Kitap başına çıkarılmış sayfa metinleri (yarıda kalan derlemeyi devam ettirmek için)
+INDEX_BUILD_DIR = DATA_DIR / "index_build"
+# Kaynak başına parmak izleri (artımlı güncelleme için, indeks dizininde)
+FINGERPRINTS_FILE = "fingerprints.json"
+
+# Paralellik ayarları
+INDEX_DOWNLOAD_WORKERS = int(os.getenv("INDEX_DOWNLOAD_WORKERS", "4"))
+INDEX_EXTRACT_PROCS = int(os.getenv("INDEX_EXTRACT_PROCS", str(os.cpu_count() or 2)))
+INDEX_WRITER_PROCS = int(os.getenv("INDEX_WRITER_PROCS", str(min(4, os.cpu_count() or 1))))
+INDEX_WRITER_LIMITMB = int(os.getenv("INDEX_WRITER_LIMITMB", "128"))
 
 # PDF dizini - Environment variable'dan al veya varsayılan kullan
 PDF_BASE_URL = os.getenv("PDF_BASE_URL")
@@ -48,21 +63,23 @@ def download_pdf_from_backblaze(pdf_filename):
     if not PDF_BASE_URL:
         return None
     
+    temp_path = None
     try:
         # Önce public URL ile dene
         pdf_url = f"{PDF_BASE_URL}/{pdf_filename}"
         logger.info(f"PDF indiriliyor (public): {pdf_url}")
         
-        response = requests.get(pdf_url, timeout=30)
-        response.raise_for_status()
-        
-        # Geçici dosya oluştur
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-        temp_file.write(response.content)
-        temp_file.close()
+        with requests.get(pdf_url, timeout=30, stream=True) as response:
+            response.raise_for_status()
+            
+            # Geçici dosyaya parça parça yaz (tüm PDF bellekte tutulmaz)
+            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
+                temp_path = temp_file.name
+                for chunk in response.iter_content(chunk_size=1024 * 1024):
+                    temp_file.write(chunk)
         
         logger.info(f"PDF başarıyla indirildi: {pdf_filename}")
-        return temp_file.name
+        return temp_path
         
     except requests.exceptions.HTTPError as e:
         if e.response.status_code == 401:
@@ -78,6 +95,8 @@ def download_pdf_from_backblaze(pdf_filename):
             return None
     except Exception as e:
         logger.error(f"PDF indirilemedi {pdf_filename}: {e}")
+        if temp_path and os.path.exists(temp_path):
+            os.unlink(temp_path)
         return None
 
 def download_pdf_with_b2_api(pdf_filename):
@@ -92,185 +111,516 @@ def download_pdf_with_b2_api(pdf_filename):
         logger.error(f"B2 API ile PDF indirilemedi {pdf_filename}: {e}")
         return None
 
-def create_search_index():
+def extract_pdf_pages(pdf_path):
     """
-    PDF'leri ve makaleleri tarayarak birleşik Whoosh indeksi ve kitap meta verilerini oluşturur.
+    PDF'in sayfa metinlerini çıkarır (işlem havuzunda çalışır).
+    
+    Returns:
+        {"total_pages": int, "pages": [[sayfa_no, metin], ...]}
     """
-    if not os.path.exists(INDEX_DIR):
-        os.makedirs(INDEX_DIR)
-        logger.info(f"İndeks klasörü oluşturuldu: {INDEX_DIR}")
+    doc = fitz.open(pdf_path)
+    try:
+        pages = []
+        for page_num in range(len(doc)):
+            text = doc.load_page(page_num).get_text("text")
+            if text:
+                pages.append([page_num + 1, text])
+        return {"total_pages": len(doc), "pages": pages}
+    finally:
+        doc.close()
+
+def checkpoint_path(pdf_filename):
+    return INDEX_BUILD_DIR / f"{pdf_filename}.json"
+
+def load_checkpoint(pdf_filename):
+    """Kitabın daha önce çıkarılmış sayfa metinlerini yükler, yoksa None"""
+    path = checkpoint_path(pdf_filename)
+    if not path.exists():
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Bozuk checkpoint yok sayılıyor {pdf_filename}: {e}")
+        return None
+
+def save_checkpoint(pdf_filename, extracted):
+    """Kitap başına checkpoint'i atomik olarak yazar"""
+    path = checkpoint_path(pdf_filename)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(extracted, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def prepare_books(books):
+    """
+    Checkpoint'i olmayan kitapları paralel olarak indirir ve metinlerini çıkarır.
+    
+    İndirmeler sınırlı bir thread havuzunda, metin çıkarma bir işlem havuzunda
+    yapılır; her kitap bittiğinde checkpoint yazılır. Çöken bir çalıştırma
+    yeniden başlatıldığında tamamlanan kitaplar atlanır.
+    
+    Args:
+        books: {"pdf_file", "local_path"} anahtarlı sözlükler (local_path yoksa Backblaze'den indirilir)
+    
+    Returns:
+        Başarısız olan pdf_file listesi
+    """
+    INDEX_BUILD_DIR.mkdir(parents=True, exist_ok=True)
+    pending = [book for book in books if not checkpoint_path(book['pdf_file']).exists()]
+    logger.info(f"{len(books) - len(pending)} kitap checkpoint'ten alınacak, {len(pending)} kitap işlenecek")
+    if not pending:
+        return []
+    
+    failed = []
+    with ThreadPoolExecutor(max_workers=INDEX_DOWNLOAD_WORKERS) as downloads, \
+            ProcessPoolExecutor(max_workers=INDEX_EXTRACT_PROCS) as extractors:
+        extractions = {}
+        
+        def submit_extraction(book, pdf_path, temporary):
+            future = extractors.submit(extract_pdf_pages, str(pdf_path))
+            extractions[future] = (book, pdf_path, temporary)
+        
+        # Yerel dosyalar doğrudan, uzak dosyalar indirildikçe işlem havuzuna gönderilir
+        download_futures = {}
+        for book in pending:
+            if book.get('local_path'):
+                submit_extraction(book, book['local_path'], False)
+            else:
+                download_futures[downloads.submit(download_pdf_from_backblaze, book['pdf_file'])] = book
+        
+        for future in as_completed(download_futures):
+            book = download_futures[future]
+            temp_pdf_path = future.result()
+            if temp_pdf_path:
+                submit_extraction(book, temp_pdf_path, True)
+            else:
+                logger.warning(f"PDF indirilemedi, atlanıyor: {book['pdf_file']}")
+                failed.append(book['pdf_file'])
+        
+        for future in as_completed(extractions):
+            book, pdf_path, temporary = extractions[future]
+            try:
+                extracted = future.result()
+                save_checkpoint(book['pdf_file'], extracted)
+                logger.info(f"Kitap işlendi: {book['pdf_file']} ({extracted['total_pages']} sayfa)")
+            except Exception as e:
+                logger.error(f"PDF işlenirken hata oluştu {book['pdf_file']}: {e}")
+                failed.append(book['pdf_file'])
+            finally:
+                if temporary and os.path.exists(pdf_path):
+                    os.unlink(pdf_path)
+    
+    return failed
 
-    # Evrensel Şema - Türkçe Analyzer ile
+def build_schema():
+    """Evrensel Şema - Türkçe Analyzer ile"""
     turkish_analyzer = create_turkish_analyzer()
-    schema = Schema(
+    return Schema(
         type=ID(stored=True),
         title=TEXT(stored=True, analyzer=turkish_analyzer),
         author=TEXT(stored=True, analyzer=turkish_analyzer),
         content=TEXT(stored=True, analyzer=turkish_analyzer),
         source=ID(stored=True),
         page_or_id=ID(stored=True),
-        category=TEXT(stored=True, analyzer=turkish_analyzer)
+        category=TEXT(stored=True, analyzer=turkish_analyzer),
+        # Artımlı güncelleme anahtarları: belge başına tekil, kaynak (kitap/makale) başına ortak
+        doc_key=ID(unique=True),
+        source_key=ID
     )
 
+def collect_books(book_metadata_list):
+    """İndekslenecek kitapları (yerel PDF'ler ya da Backblaze meta verisi) listeler"""
+    # PDF dosyalarını kontrol et
+    pdf_files = list(PDF_DIR.glob("*.pdf"))
+    books = []
+    
+    if not pdf_files and PDF_BASE_URL:
+        logger.info(f"PDF'ler Backblaze'den indirilecek: {PDF_BASE_URL}")
+        for book_info in book_metadata_list:
+            books.append({
+                "book": book_info['book'],
+                "author": book_info['author'],
+                "pdf_file": book_info['pdf_file'],
+                "local_path": None
+            })
+        
+    elif pdf_files:
+        # Yerel PDF'ler varsa onları kullan
+        logger.info(f"Yerel PDF'ler bulundu: {len(pdf_files)} dosya")
+        for pdf_path in pdf_files:
+            file_name = pdf_path.name
+            base_name = file_name.replace(".pdf", "").replace("_", " ")
+
+            if "-" in base_name:
+                book_part, author_part = base_name.split("-", 1)
+                book_name = book_part.strip().title()
+                author_name = author_part.strip().title()
+            else:
+                book_name = base_name.title()
+                author_name = "Bilinmiyor"
+            
+            books.append({
+                "book": book_name,
+                "author": author_name,
+                "pdf_file": file_name,
+                "local_path": pdf_path
+            })
+    else:
+        logger.warning("PDF bulunamadı ve PDF_BASE_URL ayarlanmamış. Kitaplar indekslenmeyecek.")
+    
+    return books
+
+def load_book_metadata():
+    """Mevcut kitap meta verisini yükler"""
+    if os.path.exists(BOOK_METADATA_PATH):
+        try:
+            with open(BOOK_METADATA_PATH, 'r', encoding='utf-8') as f:
+                book_metadata_list = json.load(f)
+            logger.info(f"Mevcut kitap meta verisi yüklendi: {len(book_metadata_list)} kitap")
+            return book_metadata_list
+        except Exception as e:
+            logger.warning(f"Meta veri yüklenirken hata: {e}")
+    return []
+
+def save_book_metadata(book_metadata_list, books, total_pages):
+    """
+    Yerel PDF'lerden gelen kitapların meta verisini günceller ve JSON dosyasına yazar.
+    
+    Args:
+        total_pages: Bu çalıştırmada işlenen kitaplar için {pdf_file: sayfa sayısı}
+    """
+    local_books = [book for book in books if book['local_path']]
+    if local_books:
+        existing = {entry['pdf_file']: entry for entry in book_metadata_list}
+        book_metadata_list = []
+        for book in local_books:
+            if book['pdf_file'] not in existing and book['pdf_file'] not in total_pages:
+                continue  # Hiç işlenemeyen kitap
+            entry = existing.get(book['pdf_file'], {"pdf_file": book['pdf_file']})
+            entry.update({"author": book['author'], "book": book['book']})
+            if book['pdf_file'] in total_pages:
+                entry["total_pages"] = total_pages[book['pdf_file']]
+            book_metadata_list.append(entry)
+    
+    with open(BOOK_METADATA_PATH, 'w', encoding='utf-8') as f:
+        json.dump(book_metadata_list, f, ensure_ascii=False, indent=2)
+    logger.info(f"Kitap meta verileri başarıyla '{BOOK_METADATA_PATH}' dosyasına kaydedildi.")
+
+def load_articles():
+    """Makaleleri veritabanından okur: [(source_key, fingerprint, belge)]"""
+    if not os.path.exists(ARTICLES_DB_PATH):
+        logger.warning("Makale veritabanı bulunamadı. Bu adım atlanıyor.")
+        return []
+    
+    conn = sqlite3.connect(ARTICLES_DB_PATH)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    
+    cursor.execute("SELECT id, title, content, category, url, author FROM articles")
+    articles = cursor.fetchall()
+    conn.close()
+    
+    logger.info(f"{len(articles)} adet makale veritabanından okundu.")
+    
+    result = []
+    for article in articles:
+        key = f"article:{article['id']}"
+        fingerprint = hashlib.sha1("\x1f".join(
+            str(article[field] or "") for field in ("title", "content", "category", "url", "author")
+        ).encode("utf-8")).hexdigest()
+        clean_content = html_to_text(article['content'])
+        document = None
+        if clean_content:
+            document = dict(
+                type='article',
+                title=article['title'],
+                author=article['author'],
+                content=clean_content,
+                source=article['url'],
+                page_or_id=str(article['id']),
+                category=article['category'],
+                doc_key=key,
+                source_key=key
+            )
+        result.append((key, fingerprint, document))
+    return result
+
+def book_key(book):
+    return f"book:{book['pdf_file']}"
+
+def book_documents(book, extracted):
+    """Kitabın checkpoint'inden sayfa belgelerini üretir"""
+    key = book_key(book)
+    for page_no, text in extracted['pages']:
+        yield dict(
+            type='book',
+            title=book['book'],
+            author=book['author'],
+            content=text,
+            source=book['pdf_file'],
+            page_or_id=str(page_no),
+            category=None,
+            doc_key=f"{key}:{page_no}",
+            source_key=key
+        )
+
+def file_sha1(path):
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+def remote_pdf_fingerprint(pdf_filename):
+    """
+    Uzak PDF'i indirmeden parmak izini alır (HEAD): B2'nin içerik SHA1'i,
+    yoksa ETag ya da boyut + değiştirilme zamanı. Alınamazsa None.
+    """
     try:
-        ix = create_in(INDEX_DIR, schema)
-        writer = ix.writer()
-        logger.info("Yeni birleşik arama indeksi oluşturuluyor...")
+        response = requests.head(f"{PDF_BASE_URL}/{pdf_filename}", timeout=15, allow_redirects=True)
+        response.raise_for_status()
+    except Exception as e:
+        logger.warning(f"PDF parmak izi alınamadı {pdf_filename}: {e}")
+        return None
+    headers = response.headers
+    sha1 = headers.get("x-bz-content-sha1")
+    if sha1 and sha1 != "none":
+        return sha1
+    if headers.get("ETag"):
+        return f"etag:{headers['ETag']}"
+    if headers.get("Content-Length") and headers.get("Last-Modified"):
+        return f"{headers['Content-Length']}:{headers['Last-Modified']}"
+    return None
+
+def compute_book_fingerprints(books):
+    """Kitapların parmak izlerini paralel hesaplar: {source_key: fingerprint veya None}"""
+    def fingerprint(book):
+        if book['local_path']:
+            return file_sha1(book['local_path'])
+        return remote_pdf_fingerprint(book['pdf_file'])
+    
+    with ThreadPoolExecutor(max_workers=INDEX_DOWNLOAD_WORKERS) as pool:
+        return dict(zip([book_key(book) for book in books], pool.map(fingerprint, books)))
+
+def load_fingerprints():
+    """Son derlemede indekslenen kaynakların parmak izleri: {source_key: {fingerprint, author}}"""
+    try:
+        with open(INDEX_DIR / FINGERPRINTS_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f).get("sources", {})
+    except (OSError, ValueError):
+        return None
+
+def save_fingerprints(sources):
+    path = INDEX_DIR / FINGERPRINTS_FILE
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"sources": sources}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def source_authors(sources):
+    """/authors yan dosyası için kaynaklardaki yazarlar"""
+    return {entry['author'].title() for entry in sources.values() if entry.get('author')}
+
+def write_spelling_index(ix):
+    """content sözlüğünden /search/suggest yazım sözlüğünü oluştur (hata derlemeyi durdurmaz)"""
+    try:
+        with ix.reader() as reader:
+            build_spelling_index(reader, INDEX_DIR, ix.latest_generation())
+    except Exception as e:
+        logger.error(f"Yazım sözlüğü oluşturulamadı: {e}")
+
+def create_search_index():
+    """
+    PDF'leri ve makaleleri tarayarak birleşik Whoosh indeksi ve kitap meta verilerini oluşturur.
+    
+    1. Kitaplar paralel indirilir/çıkarılır, kitap başına checkpoint yazılır (devam ettirilebilir).
+    2. Checkpoint'ler ve makaleler çok işlemli, çok segmentli bir writer ile tek commit'te indekslenir.
+    """
+    if not os.path.exists(INDEX_DIR):
+        os.makedirs(INDEX_DIR)
+        logger.info(f"İndeks klasörü oluşturuldu: {INDEX_DIR}")
+
+    schema = build_schema()
 
+    try:
         # --- BÖLÜM 1: PDF'leri İşleme ve Meta Veri Toplama ---
         logger.info(">>> Adım 1: Kitaplar (PDF'ler) işleniyor...")
+        book_metadata_list = load_book_metadata()
+        books = collect_books(book_metadata_list)
+        book_fingerprints = compute_book_fingerprints(books)
         
-        # Önce mevcut meta veriyi yükle
-        book_metadata_list = []
-        if os.path.exists(BOOK_METADATA_PATH):
-            try:
-                with open(BOOK_METADATA_PATH, 'r', encoding='utf-8') as f:
-                    book_metadata_list = json.load(f)
-                logger.info(f"Mevcut kitap meta verisi yüklendi: {len(book_metadata_list)} kitap")
-            except Exception as e:
-                logger.warning(f"Meta veri yüklenirken hata: {e}")
-                book_metadata_list = []
+        failed_books = prepare_books(books)
+        if failed_books:
+            logger.warning(f"{len(failed_books)} kitap işlenemedi, tekrar çalıştırıldığında yeniden denenecek: {failed_books}")
         
-        # PDF dosyalarını kontrol et
-        pdf_files = list(PDF_DIR.glob("*.pdf"))
+        # --- BÖLÜM 2: İndeksi oluşturma ---
+        ix = create_in(INDEX_DIR, schema)
+        writer = ix.writer(procs=INDEX_WRITER_PROCS, limitmb=INDEX_WRITER_LIMITMB,
+                           multisegment=INDEX_WRITER_PROCS > 1)
+        logger.info(f"Yeni birleşik arama indeksi oluşturuluyor (procs={INDEX_WRITER_PROCS})...")
+        # Artımlı güncellemeler için kaynak parmak izleri (+ /authors için yazarlar)
+        sources = {}
+        total_pages = {}
         
-        if not pdf_files and PDF_BASE_URL:
-            logger.info(f"PDF'ler Backblaze'den indirilecek: {PDF_BASE_URL}")
-            
-            # Her kitap için PDF'i indir ve indeksle
-            for book_info in book_metadata_list:
-                pdf_filename = book_info['pdf_file']
-                temp_pdf_path = download_pdf_from_backblaze(pdf_filename)
-                
-                if temp_pdf_path:
-                    try:
-                        doc = fitz.open(temp_pdf_path)
-                        book_name = book_info['book']
-                        author_name = book_info['author']
-                        
-                        logger.info(f"Kitap indeksleniyor: {book_name} - {author_name}")
-                        
-                        # Her sayfayı indeksle
-                        for page_num in range(len(doc)):
-                            page = doc.load_page(page_num)
-                            text = page.get_text("text")
-                            if text:
-                                writer.add_document(
-                                    type='book',
-                                    title=book_name,
-                                    author=author_name,
-                                    content=text,
-                                    source=pdf_filename,
-                                    page_or_id=str(page_num + 1),
-                                    category=None
-                                )
-                        
-                        doc.close()
-                        
-                        # Geçici dosyayı sil
-                        os.unlink(temp_pdf_path)
-                        
-                    except Exception as e:
-                        logger.error(f"PDF işlenirken hata oluştu {pdf_filename}: {e}")
-                        if temp_pdf_path and os.path.exists(temp_pdf_path):
-                            os.unlink(temp_pdf_path)
-                        continue
-                else:
-                    logger.warning(f"PDF indirilemedi, atlanıyor: {pdf_filename}")
-            
-            logger.info(">>> Kitapların indekslenmesi tamamlandı (Backblaze'den).")
-            
-        elif pdf_files:
-            # Yerel PDF'ler varsa onları kullan
-            logger.info(f"Yerel PDF'ler bulundu: {len(pdf_files)} dosya")
-            
-            for pdf_path in pdf_files:
-                try:
-                    doc = fitz.open(pdf_path)
-                    file_name = pdf_path.name
-                    base_name = file_name.replace(".pdf", "").replace("_", " ")
-
-                    if "-" in base_name:
-                        book_part, author_part = base_name.split("-", 1)
-                        book_name = book_part.strip().title()
-                        author_name = author_part.strip().title()
-                    else:
-                        book_name = base_name.title()
-                        author_name = "Bilinmiyor"
-                    
-                    # Kitap meta verisini listeye ekle
-                    book_metadata_list.append({
-                        "author": author_name,
-                        "book": book_name,
-                        "pdf_file": file_name,
-                        "total_pages": len(doc)
-                    })
-                    
-                    logger.info(f"Kitap işleniyor: {book_name}")
-
-                    for page_num in range(len(doc)):
-                        page = doc.load_page(page_num)
-                        text = page.get_text("text")
-                        if text:
-                            writer.add_document(
-                                type='book',
-                                title=book_name,
-                                author=author_name,
-                                content=text,
-                                source=file_name,
-                                page_or_id=str(page_num + 1),
-                                category=None
-                            )
-                    doc.close()
-                except Exception as e:
-                    logger.error(f"PDF işlenirken hata oluştu {pdf_path.name}: {e}")
-                    continue
+        for book in books:
+            extracted = load_checkpoint(book['pdf_file'])
+            if extracted is None:
+                continue
             
-            logger.info(">>> Kitapların indekslenmesi tamamlandı (yerel dosyalardan).")
-        else:
-            logger.warning("PDF bulunamadı ve PDF_BASE_URL ayarlanmamış. Kitaplar indekslenmeyecek.")
+            logger.info(f"Kitap indeksleniyor: {book['book']} - {book['author']}")
+            for document in book_documents(book, extracted):
+                writer.add_document(**document)
+            total_pages[book['pdf_file']] = extracted['total_pages']
+            sources[book_key(book)] = {"fingerprint": book_fingerprints.get(book_key(book)), "author": book['author']}
         
-        # Kitap meta verilerini JSON dosyasına yaz
-        with open(BOOK_METADATA_PATH, 'w', encoding='utf-8') as f:
-            json.dump(book_metadata_list, f, ensure_ascii=False, indent=2)
-        logger.info(f"Kitap meta verileri başarıyla '{BOOK_METADATA_PATH}' dosyasına kaydedildi.")
+        logger.info(f">>> {len(total_pages)} kitabın indekslenmesi tamamlandı.")
+        save_book_metadata(book_metadata_list, books, total_pages)
 
-        # --- BÖLÜM 2: MAKALELERİ İndeksleme ---
+        # --- BÖLÜM 3: MAKALELERİ İndeksleme ---
         logger.info(">>> Adım 2: Makaleler (Veritabanından) indeksleniyor...")
-        if not os.path.exists(ARTICLES_DB_PATH):
-            logger.warning("Makale veritabanı bulunamadı. Bu adım atlanıyor.")
-        else:
-            conn = sqlite3.connect(ARTICLES_DB_PATH)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute("SELECT id, title, content, category, url, author FROM articles")
-            articles = cursor.fetchall()
-            conn.close()
-            
-            logger.info(f"{len(articles)} adet makale veritabanından okundu.")
-
-            for article in articles:
-                clean_content = html_to_text(article['content'])
-                if clean_content:
-                    writer.add_document(
-                        type='article',
-                        title=article['title'],
-                        author=article['author'],
-                        content=clean_content,
-                        source=article['url'],
-                        page_or_id=str(article['id']),
-                        category=article['category']
-                    )
-            logger.info(">>> Makalelerin indekslenmesi tamamlandı.")
+        for key, fingerprint, document in load_articles():
+            if document:
+                writer.add_document(**document)
+            sources[key] = {"fingerprint": fingerprint, "author": document['author'] if document else None}
+        logger.info(">>> Makalelerin indekslenmesi tamamlandı.")
 
         # --- SON ADIM: İndeksi Kaydetme ---
         writer.commit()
+        save_fingerprints(sources)
+        index_authors = source_authors(sources)
+        write_author_facet(INDEX_DIR, index_authors, ix.latest_generation())
+        logger.info(f"Yazar listesi yazıldı: {len(index_authors)} yazar")
+        write_spelling_index(ix)
         logger.info("Birleşik arama indeksi ve meta veriler başarıyla oluşturuldu.")
+        
+        # Başarılı derlemeden sonra checkpoint'ler gereksiz (başarısız kitaplar yoksa)
+        if not failed_books:
+            shutil.rmtree(INDEX_BUILD_DIR, ignore_errors=True)
 
     except Exception as e:
         logger.error(f"İndeks oluşturma sırasında genel bir hata oluştu: {e}")
+        logger.error(f"Tamamlanan kitaplar '{INDEX_BUILD_DIR}' altında saklandı; tekrar çalıştırıldığında kaldığı yerden devam eder.")
+        sys.exit(1)
+
+def update_search_index(optimize=False):
+    """
+    Mevcut indeksi yalnızca değişen kaynaklarla günceller.
+    
+    Kaynak başına parmak izi (PDF SHA1, makale alan özeti) önceki derlemeyle
+    karşılaştırılır; değişen kitapların sayfaları silinip yeniden eklenir,
+    değişen makaleler doc_key üzerinden update_document ile yenilenir,
+    kaybolan kaynaklar silinir. İndeks ya da parmak izi dosyası yoksa tam derleme yapılır.
+    
+    Args:
+        optimize: Commit sonrası segmentleri tek segmentte birleştir
+    """
+    previous = load_fingerprints()
+    ix = open_dir(str(INDEX_DIR)) if exists_in(str(INDEX_DIR)) else None
+    if ix is None or previous is None or "doc_key" not in ix.schema:
+        logger.info("Artımlı güncelleme için uygun indeks bulunamadı, tam derleme yapılıyor...")
+        create_search_index()
+        return
+    
+    try:
+        book_metadata_list = load_book_metadata()
+        books = collect_books(book_metadata_list)
+        book_fingerprints = compute_book_fingerprints(books)
+        articles = load_articles()
+        
+        sources = dict(previous)
+        changed_books = []
+        for book in books:
+            key = book_key(book)
+            fingerprint = book_fingerprints[key]
+            if fingerprint is None and key in previous:
+                continue  # Doğrulanamadı: mevcut sayfalar korunur
+            if key not in previous or previous[key].get("fingerprint") != fingerprint:
+                changed_books.append(book)
+        changed_articles = [
+            (key, fingerprint, document) for key, fingerprint, document in articles
+            if key not in previous or previous[key].get("fingerprint") != fingerprint
+        ]
+        current_keys = {book_key(book) for book in books} | {key for key, _, _ in articles}
+        removed_keys = [key for key in previous if key not in current_keys]
+        
+        logger.info(
+            f"Değişiklikler: {len(changed_books)} kitap, {len(changed_articles)} makale, "
+            f"{len(removed_keys)} silinen kaynak"
+        )
+        if not (changed_books or changed_articles or removed_keys):
+            logger.info("İndeks güncel.")
+            if optimize:
+                ix.optimize()
+                write_author_facet(INDEX_DIR, source_authors(previous), ix.latest_generation())
+            if spelling_index_outdated(INDEX_DIR):
+                write_spelling_index(ix)
+            return
+        
+        # Değişen kitapların eski checkpoint'leri kullanılmamalı
+        for book in changed_books:
+            checkpoint_path(book['pdf_file']).unlink(missing_ok=True)
+        failed_books = set(prepare_books(changed_books))
+        if failed_books:
+            logger.warning(f"{len(failed_books)} kitap işlenemedi, eski sayfaları korunuyor: {sorted(failed_books)}")
+        
+        writer = ix.writer(limitmb=INDEX_WRITER_LIMITMB)
+        for key in removed_keys:
+            writer.delete_by_term("source_key", key)
+            sources.pop(key, None)
+        
+        total_pages = {}
+        for book in changed_books:
+            if book['pdf_file'] in failed_books:
+                continue
+            extracted = load_checkpoint(book['pdf_file'])
+            if extracted is None:
+                continue
+            key = book_key(book)
+            logger.info(f"Kitap yeniden indeksleniyor: {book['book']} - {book['author']}")
+            # Sayfa sayısı değişmiş olabilir: kitabın tüm sayfalarını sil, yeniden ekle
+            writer.delete_by_term("source_key", key)
+            for document in book_documents(book, extracted):
+                writer.add_document(**document)
+            total_pages[book['pdf_file']] = extracted['total_pages']
+            sources[key] = {"fingerprint": book_fingerprints[key], "author": book['author']}
+        
+        for key, fingerprint, document in changed_articles:
+            if document:
+                writer.update_document(**document)
+            else:
+                writer.delete_by_term("source_key", key)
+            sources[key] = {"fingerprint": fingerprint, "author": document['author'] if document else None}
+        
+        writer.commit()
+        save_fingerprints(sources)
+        save_book_metadata(book_metadata_list, books, total_pages)
+        
+        if optimize:
+            logger.info("İndeks segmentleri birleştiriliyor (optimize)...")
+            ix.optimize()
+        
+        # optimize yeni bir nesil oluşturur: yazar listesi en son nesle yazılmalı
+        write_author_facet(INDEX_DIR, source_authors(sources), ix.latest_generation())
+        write_spelling_index(ix)
+        logger.info(f"İndeks artımlı olarak güncellendi (nesil {ix.latest_generation()}).")
+        
+        if not failed_books:
+            shutil.rmtree(INDEX_BUILD_DIR, ignore_errors=True)
+    
+    except Exception as e:
+        logger.error(f"Artımlı indeks güncellemesi sırasında hata oluştu: {e}")
         sys.exit(1)
 
 if __name__ == "__main__":
-    create_search_index()
\ No newline at end of file
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Whoosh arama indeksini oluştur veya güncelle')
+    parser.add_argument('--incremental', action='store_true', help='Yalnızca değişen kitap ve makaleleri yeniden indeksle')
+    parser.add_argument('--optimize', action='store_true', help='Artımlı güncellemeden sonra segmentleri birleştir')
+    args = parser.parse_args()
+    
+    if args.incremental:
+        update_search_index(optimize=args.optimize)
+    else:
+        create_search_index()
\ No newline at end of file
@@ -0,0 +1,234 @@
+# data/answer_cache.py
+# Tekrarlanan sohbet soruları için anlamsal cevap önbelleği
+
+import os
+import json
+import time
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+from data.vector_db import get_vector_db, np
+
+logger = logging.getLogger(__name__)
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "1") == "1"
+# Kosinüs benzerliği bu değerin üzerindeyse önceki cevap döndürülür
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", str(7 * 24 * 3600)))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "5000"))
+
+
+class AnswerCache:
+    """
+    Soru embedding'lerine göre önceki DeepSeek cevaplarını döndüren önbellek.
+
+    - Sorular vektör veritabanının modeliyle (sorgu embedding önbelleği üzerinden) encode edilir.
+    - Kayıtlar SQLite'ta tutulur; embedding matrisi bellekte, tüm worker'lar dosyayı paylaşır.
+    - Kayıtlar ANSWER_CACHE_TTL sonunda ya da vektör deposu değiştiğinde (generation) geçersizdir.
+    - scope: aynı soru farklı ayarlarla (ör. source_types) sorulduğunda cevaplar karışmaz.
+    """
+
+    def __init__(self, vector_db, db_file: Optional[Path] = None):
+        self.vector_db = vector_db
+        self.db_file = Path(db_file or vector_db.db_path / "answer_cache.db")
+        self._lock = threading.Lock()
+        self._conn = None
+        self._conn_pid = None
+
+        # Bellekteki eşlenik: satır id'leri, scope'lar, oluşturulma zamanları, normalize embedding'ler
+        self._ids = np.zeros(0, dtype='int64')
+        self._scopes = np.zeros(0, dtype=object)
+        self._created = np.zeros(0, dtype='float64')
+        self._matrix = np.zeros((0, vector_db.dimension), dtype='float32')
+        self._last_row_id = 0
+        self._generation = None
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.saved_llm_seconds = 0.0
+        self.lookup_seconds = 0.0
+
+        self._init_db()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        if self._conn is None or self._conn_pid != os.getpid():
+            self._conn = sqlite3.connect(self.db_file, timeout=2.0, check_same_thread=False)
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    def _init_db(self):
+        conn = self._get_connection()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS answers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                scope TEXT NOT NULL,
+                question TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                sources TEXT,
+                confidence REAL,
+                llm_seconds REAL,
+                generation INTEGER NOT NULL,
+                embedding BLOB NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        conn.commit()
+
+    def _embed(self, question: str):
+        """Soruyu birim uzunlukta embedding'e çevir (kosinüs = iç çarpım)"""
+        vector = self.vector_db.encode_query(question)[0]
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    def _sync(self):
+        """
+        Bellekteki matrisi SQLite ile eşitle (_lock altında çağrılır).
+        Vektör deposu değiştiyse tüm kayıtlar geçersiz sayılır.
+        """
+        conn = self._get_connection()
+        generation = self.vector_db.get_generation()
+        if generation != self._generation:
+            if self._generation is not None:
+                self.invalidations += 1
+                logger.info(f"Vector store changed (generation {generation}), answer cache invalidated")
+            conn.execute("DELETE FROM answers WHERE generation != ?", (generation,))
+            conn.commit()
+            self._ids = np.zeros(0, dtype='int64')
+            self._scopes = np.zeros(0, dtype=object)
+            self._created = np.zeros(0, dtype='float64')
+            self._matrix = np.zeros((0, self.vector_db.dimension), dtype='float32')
+            self._last_row_id = 0
+            self._generation = generation
+
+        # Diğer worker'ların eklediği kayıtları al
+        rows = conn.execute(
+            "SELECT id, scope, created_at, embedding FROM answers WHERE id > ? AND generation = ? ORDER BY id",
+            (self._last_row_id, generation)
+        ).fetchall()
+        if rows:
+            self._ids = np.concatenate([self._ids, np.array([r[0] for r in rows], dtype='int64')])
+            self._scopes = np.concatenate([self._scopes, np.array([r[1] for r in rows], dtype=object)])
+            self._created = np.concatenate([self._created, np.array([r[2] for r in rows], dtype='float64')])
+            vectors = np.vstack([np.frombuffer(r[3], dtype='float32') for r in rows])
+            self._matrix = np.vstack([self._matrix, vectors])
+            self._last_row_id = rows[-1][0]
+
+    def lookup(self, question: str, scope: str = "default") -> Optional[Dict[str, Any]]:
+        """
+        Benzer bir önceki soru varsa cevabını döndür.
+
+        Returns:
+            answer, sources, confidence, similarity, cached_question, llm_seconds alanlarını
+            içeren sözlük ya da None
+        """
+        if not ANSWER_CACHE_ENABLED:
+            return None
+        start = time.time()
+        try:
+            vector = self._embed(question)
+            with self._lock:
+                self._sync()
+                if not len(self._ids):
+                    self.misses += 1
+                    return None
+                similarities = self._matrix @ vector
+                valid = (self._scopes == scope) & (self._created >= time.time() - ANSWER_CACHE_TTL)
+                similarities = np.where(valid, similarities, -1.0)
+                best = int(np.argmax(similarities))
+                similarity = float(similarities[best])
+                if similarity < ANSWER_CACHE_THRESHOLD:
+                    self.misses += 1
+                    return None
+                row = self._get_connection().execute(
+                    "SELECT question, answer, sources, confidence, llm_seconds FROM answers WHERE id = ?",
+                    (int(self._ids[best]),)
+                ).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                self.hits += 1
+                self.saved_llm_seconds += row[4] or 0.0
+            return {
+                "cached_question": row[0],
+                "answer": row[1],
+                "sources": json.loads(row[2]) if row[2] else [],
+                "confidence": row[3] or 0.0,
+                "llm_seconds": row[4] or 0.0,
+                "similarity": similarity,
+            }
+        except Exception as e:
+            logger.warning(f"Answer cache lookup failed: {e}")
+            return None
+        finally:
+            self.lookup_seconds += time.time() - start
+
+    def store(self, question: str, answer: str, sources: List[Dict[str, Any]], confidence: float,
+              llm_seconds: float, scope: str = "default"):
+        """Yeni cevabı önbelleğe yaz"""
+        if not ANSWER_CACHE_ENABLED or not answer:
+            return
+        try:
+            vector = self._embed(question).astype('float32')
+            with self._lock:
+                self._sync()
+                conn = self._get_connection()
+                conn.execute("""
+                    INSERT INTO answers
+                    (scope, question, answer, sources, confidence, llm_seconds, generation, embedding, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    scope, question, answer, json.dumps(sources, ensure_ascii=False, default=str),
+                    confidence, llm_seconds, self._generation, vector.tobytes(), time.time()
+                ))
+                # En eski kayıtları at
+                conn.execute("""
+                    DELETE FROM answers WHERE id NOT IN (
+                        SELECT id FROM answers ORDER BY id DESC LIMIT ?
+                    )
+                """, (ANSWER_CACHE_MAX_ENTRIES,))
+                conn.commit()
+                self._sync()
+                if len(self._ids) > ANSWER_CACHE_MAX_ENTRIES:
+                    keep = slice(len(self._ids) - ANSWER_CACHE_MAX_ENTRIES, None)
+                    self._ids, self._scopes = self._ids[keep], self._scopes[keep]
+                    self._created, self._matrix = self._created[keep], self._matrix[keep]
+        except Exception as e:
+            logger.warning(f"Answer cache store failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": ANSWER_CACHE_ENABLED,
+            "entries": int(len(self._ids)),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "saved_llm_seconds": round(self.saved_llm_seconds, 3),
+            "avg_lookup_ms": round(self.lookup_seconds / lookups * 1000, 3) if lookups else 0.0,
+            "threshold": ANSWER_CACHE_THRESHOLD,
+            "ttl_seconds": ANSWER_CACHE_TTL,
+            "generation": self._generation,
+        }
+
+
+# Global instance
+_answer_cache = None
+
+def get_answer_cache() -> Optional[AnswerCache]:
+    """Global cevap önbelleğini getir (vektör bağımlılıkları yoksa None)"""
+    global _answer_cache
+    if _answer_cache is None:
+        vector_db = get_vector_db()
+        if vector_db is None:
+            return None
+        try:
+            _answer_cache = AnswerCache(vector_db)
+        except Exception as e:
+            logger.error(f"Failed to initialize answer cache: {e}")
+            return None
+    return _answer_cache
@@ -360,7 +360,7 @@ if search_button and query.strip():
             
             # Eğer sonuç az ise fuzzy search dene
             if len(results) < 50 and q and q.strip():
-                fuzzy_query = query_expander.create_fuzzy_query(q.strip(), "content")
+                fuzzy_query = query_expander.create_fuzzy_query(q.strip(), "content", index_dir="whoosh_index")
                 if authors:
                     from whoosh.query import And
                     fuzzy_final = And([fuzzy_query, author_query]) if 'author_query' in locals() else fuzzy_query
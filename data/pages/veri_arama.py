@@ -204,7 +204,7 @@ def ask_data_havuzu(question: str, selected_authors, result_type):
                     
                     # Eğer sonuç az ise fuzzy search dene
                     if len(results) < 10 and question and question.strip():
-                        fuzzy_query = query_expander.create_fuzzy_query(question.strip(), "content")
+                        fuzzy_query = query_expander.create_fuzzy_query(question.strip(), "content", index_dir="whoosh_index")
                         if author_query:
                             from whoosh.query import And
                             fuzzy_final = And([author_query, fuzzy_query])
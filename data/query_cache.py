@@ -0,0 +1,232 @@
+# data/query_cache.py
+# Sık tekrarlanan arama sorguları için paylaşılan sonuç önbelleği
+
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+QUERY_CACHE_ENABLED = os.getenv("QUERY_CACHE_ENABLED", "1") == "1"
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "2000"))
+QUERY_CACHE_DEFAULT_TTL = int(os.getenv("QUERY_CACHE_DEFAULT_TTL", "600"))
+# Namespace başına geçersizleştirme dosyaları: tüm worker'lar aynı dizini görür
+QUERY_CACHE_EPOCH_DIR = Path(os.getenv("QUERY_CACHE_EPOCH_DIR", str(Path(__file__).parent / "query_cache_epochs")))
+
+
+def normalize_query(query: str) -> str:
+    """Anahtar için sorgu: küçük harf, fazla boşluklar tek boşluk"""
+    return " ".join((query or "").lower().split())
+
+
+def file_version(*paths) -> Tuple[float, ...]:
+    """
+    Dosyaların değiştirilme zamanları (SQLite -wal dosyaları dahil); dosya yoksa 0.
+    Başka bir süreç veritabanını güncellediğinde önbellek kayıtları geçersiz olur.
+    """
+    version = []
+    for path in paths:
+        for candidate in (Path(path), Path(f"{path}-wal")):
+            try:
+                version.append(candidate.stat().st_mtime)
+            except OSError:
+                version.append(0.0)
+    return tuple(version)
+
+
+class QueryResultCache:
+    """
+    Endpoint, normalize sorgu ve filtrelere göre anahtarlanan LRU/TTL sonuç önbelleği.
+
+    - Namespace (endpoint) başına TTL ve isteğe bağlı sürüm fonksiyonu: sürüm
+      (index nesli, veritabanı dosyası zamanı) değişince kayıtlar geçersizdir.
+    - invalidate() namespace'in epoch dosyasını yeniler; epoch sürümün parçası olduğundan
+      tüm worker'lardaki kayıtlar geçersiz olur.
+    - Aynı anahtar için eşzamanlı istekler tek hesaplamayı bekler (single-flight).
+    - Event loop içinden kullanılır; kilit gerekmez. Her worker kendi önbelleğini tutar.
+    """
+
+    def __init__(self, max_entries: int = QUERY_CACHE_MAX_ENTRIES,
+                 epoch_dir: Optional[Path] = QUERY_CACHE_EPOCH_DIR):
+        self.max_entries = max_entries
+        self.epoch_dir = Path(epoch_dir) if epoch_dir is not None else None
+        self._entries: "OrderedDict[tuple, Tuple[float, Any, Any]]" = OrderedDict()
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        self._namespaces: Dict[str, Dict[str, Any]] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def register(self, namespace: str, ttl: int = QUERY_CACHE_DEFAULT_TTL,
+                 version: Optional[Callable[[], Any]] = None):
+        """Namespace için TTL (saniye) ve sürüm fonksiyonunu tanımla"""
+        self._namespaces[namespace] = {"ttl": ttl, "version": version}
+        self._stats.setdefault(namespace, {
+            "hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "invalidations": 0
+        })
+
+    @staticmethod
+    def make_key(namespace: str, query: str, **filters) -> tuple:
+        items = []
+        for name, value in sorted(filters.items()):
+            if isinstance(value, (list, tuple, set)):
+                value = tuple(sorted(value))
+            items.append((name, value))
+        return (namespace, normalize_query(query), tuple(items))
+
+    def namespaces(self) -> List[str]:
+        return list(self._namespaces)
+
+    def _epoch_path(self, namespace: str) -> Path:
+        return self.epoch_dir / f"{namespace}.epoch"
+
+    def _epoch(self, namespace: str):
+        """Namespace'in paylaşılan geçersizleştirme sayacı: epoch dosyasının kimliği"""
+        if self.epoch_dir is None:
+            return None
+        try:
+            stat = self._epoch_path(namespace).stat()
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns)
+
+    def _bump_epoch(self, namespace: str):
+        """Epoch dosyasını atomik olarak yeniden yaz (yeni inode): diğer worker'lar sürüm farkını görür"""
+        if self.epoch_dir is None:
+            return
+        try:
+            self.epoch_dir.mkdir(parents=True, exist_ok=True)
+            path = self._epoch_path(namespace)
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            tmp_path.write_text(str(time.time_ns()))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Query cache epoch update failed for {namespace}: {e}")
+
+    def _version(self, namespace: str):
+        version_fn = self._namespaces[namespace]["version"]
+        version = None
+        if version_fn is not None:
+            try:
+                version = version_fn()
+            except Exception as e:
+                logger.debug(f"Query cache version check failed for {namespace}: {e}")
+        return (self._epoch(namespace), version)
+
+    async def get_or_compute(self, namespace: str, query: str,
+                             compute: Callable[[], Awaitable[Any]],
+                             cache_if: Optional[Callable[[Any], bool]] = None, **filters) -> Any:
+        """
+        Önbellekteki sonucu döndür ya da compute() ile hesapla.
+
+        Args:
+            compute: Sonucu üreten coroutine fonksiyonu
+            cache_if: False dönerse sonuç önbelleğe alınmaz (ör. hata sonrası boş liste)
+            filters: Anahtara eklenecek sorgu filtreleri
+        """
+        if not QUERY_CACHE_ENABLED:
+            return await compute()
+        if namespace not in self._namespaces:
+            self.register(namespace)
+        stats = self._stats[namespace]
+        key = self.make_key(namespace, query, **filters)
+        version = self._version(namespace)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, entry_version, value = entry
+            if expires_at > time.monotonic() and entry_version == version:
+                self._entries.move_to_end(key)
+                stats["hits"] += 1
+                return value
+            del self._entries[key]
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            stats["coalesced"] += 1
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # Hesaplayan istek iptal edildi: bu istek kendisi hesaplar
+                return await compute()
+
+        stats["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Bekleyen yoksa "exception was never retrieved" uyarısını engelle
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            if cache_if is None or cache_if(value):
+                self._store(key, version, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def _store(self, key: tuple, version, value):
+        ttl = self._namespaces[key[0]]["ttl"]
+        self._entries[key] = (time.monotonic() + ttl, version, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            evicted_key, _ = self._entries.popitem(last=False)
+            self._stats[evicted_key[0]]["evictions"] += 1
+
+    def invalidate(self, namespace: Optional[str] = None) -> int:
+        """
+        Index ya da veritabanı yenilendiğinde çağrılan kanca: namespace'in (None ise tümünün)
+        epoch'unu yenile ve bu worker'daki kayıtlarını sil. Diğer worker'ların kayıtları
+        epoch değiştiği için bir sonraki okumada geçersiz sayılır.
+        Bu worker'da silinen kayıt sayısını döndürür.
+        """
+        for name in self._namespaces:
+            if namespace is None or name == namespace:
+                self._bump_epoch(name)
+        keys = [key for key in self._entries if namespace is None or key[0] == namespace]
+        for key in keys:
+            del self._entries[key]
+        for name, stats in self._stats.items():
+            if namespace is None or name == namespace:
+                stats["invalidations"] += 1
+        if keys:
+            logger.info(f"Query cache invalidated ({namespace or 'all'}): {len(keys)} entries")
+        return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        namespaces = {}
+        for name, stats in self._stats.items():
+            lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+            namespaces[name] = dict(
+                stats,
+                entries=sum(1 for key in self._entries if key[0] == name),
+                hit_rate=round(stats["hits"] / lookups, 4) if lookups else 0.0,
+                ttl_seconds=self._namespaces[name]["ttl"],
+            )
+        return {
+            "enabled": QUERY_CACHE_ENABLED,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "namespaces": namespaces,
+        }
+
+
+# Global instance
+_query_cache: Optional[QueryResultCache] = None
+
+def get_query_cache() -> QueryResultCache:
+    """Global sorgu sonuç önbelleğini getir"""
+    global _query_cache
+    if _query_cache is None:
+        _query_cache = QueryResultCache()
+    return _query_cache
@@ -8,8 +8,17 @@ import logging
 from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
 
+try:
+    import fcntl
+except ImportError:  # Windows: süreçler arası kilit yok (tek süreçli geliştirme ortamı)
+    fcntl = None
+
 # Optional imports for vector functionality
 try:
     import numpy as np
@@ -22,8 +31,467 @@ except ImportError:
     SentenceTransformer = None
     VECTOR_DEPS_AVAILABLE = False
 
+try:
+    from turkish_search_utils import normalize_turkish_text
+except ImportError:
+    normalize_turkish_text = None
+
 logger = logging.getLogger(__name__)
 
+# Sık kullanılan metadata satırları için bellek içi LRU boyutu (0 = kapalı)
+METADATA_CACHE_SIZE = int(os.getenv("VECTOR_METADATA_CACHE_SIZE", "2048"))
+
+# SQLite'ın tek sorguda kabul ettiği parametre sınırının altında kal
+_SQLITE_MAX_PARAMS = 900
+
+_METADATA_COLUMNS = (
+    "vector_id", "source_type", "source_id", "title", "author", "content",
+    "page_number", "timestamp", "url", "embedding_model"
+)
+
+# --- ANN index ayarları ---
+# Desteklenen backend'ler: flat | ivf_flat | ivf_pq | hnsw
+INDEX_BACKENDS = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+VECTOR_INDEX_TYPE = os.getenv("VECTOR_INDEX_TYPE", "flat").lower()
+# Korpus bu boyutu geçene kadar Flat kullanılır, geçince ANN index eğitilir
+VECTOR_INDEX_TRAIN_THRESHOLD = int(os.getenv("VECTOR_INDEX_TRAIN_THRESHOLD", "20000"))
+VECTOR_IVF_NLIST = int(os.getenv("VECTOR_IVF_NLIST", "0"))  # 0 = otomatik (~4*sqrt(n))
+VECTOR_IVF_NPROBE = int(os.getenv("VECTOR_IVF_NPROBE", "16"))
+VECTOR_PQ_M = int(os.getenv("VECTOR_PQ_M", "48"))
+VECTOR_HNSW_M = int(os.getenv("VECTOR_HNSW_M", "32"))
+VECTOR_HNSW_EF_CONSTRUCTION = int(os.getenv("VECTOR_HNSW_EF_CONSTRUCTION", "80"))
+VECTOR_HNSW_EF_SEARCH = int(os.getenv("VECTOR_HNSW_EF_SEARCH", "64"))
+VECTOR_HNSW_FILTER_EF_MAX = int(os.getenv("VECTOR_HNSW_FILTER_EF_MAX", "2048"))
+
+# Index'i mmap ile salt okunur aç: gunicorn worker'ları aynı sayfaları paylaşır
+VECTOR_INDEX_MMAP = os.getenv("VECTOR_INDEX_MMAP", "1") == "1"
+# Metadata SQLite'ı için mmap boyutu (işletim sistemi sayfa önbelleği üzerinden paylaşılır)
+VECTOR_SQLITE_MMAP_BYTES = int(os.getenv("VECTOR_SQLITE_MMAP_BYTES", str(256 * 1024 * 1024)))
+
+# Delta segment: yeni vektörler küçük bir yan index'e ve WAL'a yazılır, ana index'e
+# arka planda birleştirilir. Eşik max(THRESHOLD, RATIO * ana index) olduğundan
+# toplu doldurmalarda toplam yazma maliyeti doğrusal kalır.
+VECTOR_DELTA_COMPACT_THRESHOLD = int(os.getenv("VECTOR_DELTA_COMPACT_THRESHOLD", "5000"))
+VECTOR_DELTA_COMPACT_RATIO = float(os.getenv("VECTOR_DELTA_COMPACT_RATIO", "0.1"))
+VECTOR_DELTA_COMPACT_INTERVAL = int(os.getenv("VECTOR_DELTA_COMPACT_INTERVAL", "300"))
+
+# Sorgu embedding önbelleği: bellek içi LRU + opsiyonel kalıcı SQLite katmanı
+QUERY_CACHE_SIZE = int(os.getenv("VECTOR_QUERY_CACHE_SIZE", "1024"))
+QUERY_CACHE_DISK = os.getenv("VECTOR_QUERY_CACHE_DISK", "1") == "1"
+# Kalıcı katmandaki en fazla satır; aşılınca en uzun süredir kullanılmayanlar silinir
+QUERY_CACHE_DISK_MAX_ROWS = int(os.getenv("VECTOR_QUERY_CACHE_DISK_MAX_ROWS", "50000"))
+# Budama sınırın altına bu oranda iner: her yeni sorguda DELETE çalışmasın
+QUERY_CACHE_DISK_PRUNE_RATIO = 0.9
+
+# source_type filtresi + tombstone kombinasyonları için önbelleğe alınan seçici sayısı
+SELECTOR_CACHE_SIZE = 32
+
+
+def normalize_query(query: str) -> str:
+    """Önbellek anahtarı: Türkçe normalize edilmiş, boşlukları sadeleştirilmiş sorgu"""
+    text = " ".join((query or "").split())
+    if normalize_turkish_text is not None:
+        return normalize_turkish_text(text)
+    return text.lower()
+
+
+class QueryEmbeddingCache:
+    """
+    Sorgu embedding'leri için iki katmanlı önbellek.
+
+    1. katman: süreç içi sınırlı LRU
+    2. katman: yeniden başlatmalarda korunan SQLite tablosu (vektörler float32 blob),
+       en fazla disk_max_rows satır; last_used'a göre LRU budanır
+    """
+
+    def __init__(self, model_name: str, dimension: int, disk_path: Optional[Path] = None,
+                 max_size: int = QUERY_CACHE_SIZE, disk_max_rows: int = QUERY_CACHE_DISK_MAX_ROWS):
+        self.model_name = model_name
+        self.dimension = dimension
+        self.max_size = max_size
+        self.disk_path = disk_path
+        self.disk_max_rows = disk_max_rows
+        self._disk_rows = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._conn_pid = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.disk_pruned = 0
+
+        if self.disk_path is not None:
+            try:
+                conn = self._get_disk_connection()
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS query_embeddings (
+                        query_key TEXT NOT NULL,
+                        model TEXT NOT NULL,
+                        vector BLOB NOT NULL,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        last_used REAL NOT NULL DEFAULT 0,
+                        PRIMARY KEY (query_key, model)
+                    )
+                """)
+                # Eski tablolarda last_used yok: mevcut satırlar ilk budamada silinir
+                columns = {row[1] for row in conn.execute("PRAGMA table_info(query_embeddings)")}
+                if "last_used" not in columns:
+                    conn.execute("ALTER TABLE query_embeddings ADD COLUMN last_used REAL NOT NULL DEFAULT 0")
+                conn.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_query_embeddings_last_used
+                    ON query_embeddings(last_used)
+                """)
+                conn.commit()
+                self._disk_rows = conn.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()[0]
+                self._prune_disk(conn)
+            except Exception as e:
+                logger.warning(f"Query embedding disk cache disabled: {e}")
+                self.disk_path = None
+
+    def _get_disk_connection(self) -> sqlite3.Connection:
+        if self._conn is None or self._conn_pid != os.getpid():
+            self._conn = sqlite3.connect(self.disk_path, timeout=1.0, check_same_thread=False)
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    def _remember(self, key: str, vector):
+        if self.max_size <= 0:
+            return
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str):
+        """Önbellekteki vektörü döndür, yoksa None"""
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return vector
+
+            if self.disk_path is not None:
+                try:
+                    conn = self._get_disk_connection()
+                    row = conn.execute(
+                        "SELECT vector FROM query_embeddings WHERE query_key = ? AND model = ?",
+                        (key, self.model_name)
+                    ).fetchone()
+                    if row:
+                        conn.execute(
+                            "UPDATE query_embeddings SET last_used = ? WHERE query_key = ? AND model = ?",
+                            (time.time(), key, self.model_name)
+                        )
+                        conn.commit()
+                except Exception as e:
+                    logger.debug(f"Query embedding disk lookup failed: {e}")
+                    row = None
+                if row:
+                    vector = np.frombuffer(row[0], dtype='float32').reshape(1, self.dimension)
+                    self._remember(key, vector)
+                    self.disk_hits += 1
+                    return vector
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, vector):
+        """Vektörü iki katmana da yaz"""
+        vector = np.ascontiguousarray(vector, dtype='float32').reshape(1, self.dimension)
+        with self._lock:
+            self._remember(key, vector)
+            if self.disk_path is not None:
+                try:
+                    conn = self._get_disk_connection()
+                    conn.execute(
+                        "INSERT OR REPLACE INTO query_embeddings (query_key, model, vector, last_used) VALUES (?, ?, ?, ?)",
+                        (key, self.model_name, vector.tobytes(), time.time())
+                    )
+                    conn.commit()
+                    self._disk_rows += 1
+                    self._prune_disk(conn)
+                except Exception as e:
+                    logger.debug(f"Query embedding disk write failed: {e}")
+
+    def _prune_disk(self, conn: sqlite3.Connection):
+        """
+        Satır sayısı sınırı aştıysa en uzun süredir kullanılmayanları sil.
+        _disk_rows süreç başına tahmindir (diğer worker'lar da yazar): sınır aşılınca
+        gerçek sayı okunur ve satırlar sınırın QUERY_CACHE_DISK_PRUNE_RATIO katına indirilir.
+        """
+        if self.disk_max_rows <= 0 or self._disk_rows <= self.disk_max_rows:
+            return
+        self._disk_rows = conn.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()[0]
+        if self._disk_rows <= self.disk_max_rows:
+            return
+        excess = self._disk_rows - int(self.disk_max_rows * QUERY_CACHE_DISK_PRUNE_RATIO)
+        conn.execute("""
+            DELETE FROM query_embeddings WHERE rowid IN (
+                SELECT rowid FROM query_embeddings ORDER BY last_used LIMIT ?
+            )
+        """, (excess,))
+        conn.commit()
+        self._disk_rows -= excess
+        self.disk_pruned += excess
+        logger.info(f"Pruned {excess} least recently used query embeddings from disk cache")
+
+    def _disk_stats(self) -> Dict[str, Any]:
+        """Kalıcı katmanın satır sayısı ve dosya boyutu"""
+        try:
+            rows = self._get_disk_connection().execute("SELECT COUNT(*) FROM query_embeddings").fetchone()[0]
+            size_mb = self.disk_path.stat().st_size / (1024 * 1024)
+        except Exception as e:
+            logger.debug(f"Query embedding disk stats failed: {e}")
+            return {}
+        return {'disk_rows': rows, 'disk_size_mb': round(size_mb, 2)}
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        stats = {
+            'memory_entries': len(self._memory),
+            'max_size': self.max_size,
+            'disk_enabled': self.disk_path is not None,
+            'disk_max_rows': self.disk_max_rows,
+            'disk_pruned': self.disk_pruned,
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+        }
+        if self.disk_path is not None:
+            with self._lock:
+                stats.update(self._disk_stats())
+        return stats
+
+
+def _choose_nlist(n_vectors: int) -> int:
+    """IVF küme sayısı: ~4*sqrt(n), her kümeye en az 39 eğitim vektörü düşecek şekilde"""
+    if VECTOR_IVF_NLIST > 0:
+        nlist = VECTOR_IVF_NLIST
+    else:
+        nlist = int(4 * (max(n_vectors, 1) ** 0.5))
+    return max(1, min(nlist, max(n_vectors // 39, 1)))
+
+
+def _choose_pq_m(dimension: int) -> int:
+    """PQ alt-vektör sayısı boyutu tam bölmeli"""
+    m = min(VECTOR_PQ_M, dimension)
+    while dimension % m != 0:
+        m -= 1
+    return m
+
+
+def read_index(path, mmap: bool = VECTOR_INDEX_MMAP):
+    """
+    FAISS index'i diskten oku.
+
+    mmap=True ise index salt okunur olarak bellek eşlemeli açılır; kodlar heap'e
+    kopyalanmaz ve aynı dosyayı açan tüm süreçler fiziksel sayfaları paylaşır.
+
+    Returns:
+        (index, readonly) ikilisi
+    """
+    if mmap:
+        flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+        # IO_FLAG_MMAP_IFC Flat/HNSW kodlarını eşler (faiss >= 1.10) ama IVF ters
+        # listelerinde hata verir; IVF index'ler yalnızca IO_FLAG_MMAP ile
+        # OnDiskInvertedLists olarak eşlenir. Not: OnDiskInvertedLists üzerinde fork
+        # öncesi arama yapılırsa worker'lardaki aramalar çöker (faiss 1.15); --preload
+        # master'ı index'i yalnızca yükler, aramalar worker'larda yapılır.
+        mmap_ifc = getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+        attempts = [flags | mmap_ifc, flags] if mmap_ifc else [flags]
+        error = None
+        for attempt in attempts:
+            try:
+                return faiss.read_index(str(path), attempt), True
+            except Exception as e:
+                error = e
+        logger.warning(f"mmap index load failed, falling back to heap load: {error}")
+    return faiss.read_index(str(path)), False
+
+
+def build_index(dimension: int, backend: str = "flat", n_vectors: int = 0):
+    """
+    İstenen backend için boş (gerekirse eğitilmemiş) bir FAISS index oluştur.
+
+    Args:
+        dimension: Vektör boyutu
+        backend: flat | ivf_flat | ivf_pq | hnsw
+        n_vectors: Eğitim/ekleme yapılacak vektör sayısı (nlist seçimi için)
+    """
+    backend = (backend or "flat").lower()
+    if backend not in INDEX_BACKENDS:
+        logger.warning(f"Unknown index backend '{backend}', falling back to flat")
+        backend = "flat"
+
+    if backend == "ivf_flat":
+        index = faiss.index_factory(dimension, f"IVF{_choose_nlist(n_vectors)},Flat")
+    elif backend == "ivf_pq":
+        index = faiss.index_factory(dimension, f"IVF{_choose_nlist(n_vectors)},PQ{_choose_pq_m(dimension)}")
+    elif backend == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, VECTOR_HNSW_M)
+        index.hnsw.efConstruction = VECTOR_HNSW_EF_CONSTRUCTION
+    else:
+        index = faiss.IndexFlatL2(dimension)
+
+    return index
+
+
+def detect_backend(index) -> str:
+    """Yüklenmiş bir index'in backend adını döndür"""
+    if index is None:
+        return "none"
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    try:
+        ivf = faiss.extract_index_ivf(index)
+    except Exception:
+        ivf = None
+    if ivf is not None:
+        # extract_index_ivf temel IndexIVF proxy'si döndürür: alt türü görmek için downcast gerekir
+        return "ivf_pq" if isinstance(faiss.downcast_index(ivf), faiss.IndexIVFPQ) else "ivf_flat"
+    return "flat"
+
+
+def apply_search_params(index, nprobe: int = VECTOR_IVF_NPROBE, ef_search: int = VECTOR_HNSW_EF_SEARCH):
+    """Arama zamanı ayarlarını (nprobe / efSearch) uygula"""
+    backend = detect_backend(index)
+    try:
+        if backend in ("ivf_flat", "ivf_pq"):
+            ivf = faiss.extract_index_ivf(index)
+            ivf.nprobe = min(nprobe, ivf.nlist)
+            # get_similar_documents için reconstruct desteği
+            ivf.make_direct_map()
+        elif backend == "hnsw":
+            index.hnsw.efSearch = ef_search
+    except Exception as e:
+        logger.warning(f"Failed to apply search params to {backend} index: {e}")
+
+
+def _grow_mask(mask, size: int):
+    """Boolean maskeyi en az size uzunluğuna (False ile) genişlet"""
+    if mask is None:
+        return np.zeros(size, dtype=bool)
+    if len(mask) >= size:
+        return mask
+    grown = np.zeros(size, dtype=bool)
+    grown[:len(mask)] = mask
+    return grown
+
+
+def _bitmap_selector(mask):
+    """Boolean maskeden FAISS IDSelectorBitmap oluştur: (selector, bitmap)"""
+    bitmap = np.packbits(mask, bitorder='little') if len(mask) else np.zeros(1, dtype='uint8')
+    return faiss.IDSelectorBitmap(len(bitmap), faiss.swig_ptr(bitmap)), bitmap
+
+
+def make_search_params(index, selector, k: int = 0, selectivity: float = 1.0):
+    """
+    Seçici (IDSelector) içeren arama parametreleri oluştur.
+    Index'e özgü ayarlar (nprobe / efSearch) korunur.
+    
+    HNSW grafikte yalnızca efSearch kadar aday gezer; seçici veri kümesinin
+    küçük bir dilimini bıraktığında k sonuç bulabilmek için efSearch
+    seçicilik oranıyla büyütülür (VECTOR_HNSW_FILTER_EF_MAX ile sınırlı).
+    """
+    backend = detect_backend(index)
+    if backend in ("ivf_flat", "ivf_pq"):
+        params = faiss.SearchParametersIVF()
+        params.nprobe = faiss.extract_index_ivf(index).nprobe
+    elif backend == "hnsw":
+        params = faiss.SearchParametersHNSW()
+        ef_search = index.hnsw.efSearch
+        if k and selectivity < 1.0:
+            wanted = int(np.ceil(k / max(selectivity, 1e-6)))
+            ef_search = max(ef_search, min(wanted, VECTOR_HNSW_FILTER_EF_MAX))
+        params.efSearch = ef_search
+    else:
+        params = faiss.SearchParameters()
+    params.sel = selector
+    return params
+
+
+def train_and_fill_index(vectors, backend: str, dimension: int):
+    """
+    Vektörlerden verilen backend için index oluştur; gerekirse önce eğit.
+    Vektörler sırasıyla eklenir, böylece vector_id = sıra numarası korunur.
+    """
+    index = build_index(dimension, backend, n_vectors=len(vectors))
+    if len(vectors) and not index.is_trained:
+        logger.info(f"Training {backend} index on {len(vectors)} vectors")
+        index.train(vectors)
+    if len(vectors):
+        index.add(vectors)
+    apply_search_params(index)
+    return index
+
+
+def benchmark_index_backends(vectors, queries, k: int = 10,
+                             backends: Tuple[str, ...] = INDEX_BACKENDS) -> List[Dict[str, Any]]:
+    """
+    Backend'leri Flat taban çizgisine karşı recall@k ve gecikme açısından karşılaştır.
+
+    Returns:
+        Her backend için: build süresi, ortalama/p95 arama süresi (ms),
+        recall@k ve serialize edilmiş index boyutu (MB)
+    """
+    import time
+
+    vectors = np.ascontiguousarray(vectors, dtype='float32')
+    queries = np.ascontiguousarray(queries, dtype='float32')
+    dimension = vectors.shape[1]
+
+    baseline = faiss.IndexFlatL2(dimension)
+    baseline.add(vectors)
+    _, truth = baseline.search(queries, k)
+
+    report = []
+    for backend in backends:
+        start = time.perf_counter()
+        index = train_and_fill_index(vectors, backend, dimension)
+        build_seconds = time.perf_counter() - start
+
+        latencies = []
+        found = np.empty_like(truth)
+        for i in range(len(queries)):
+            t0 = time.perf_counter()
+            _, ids = index.search(queries[i:i + 1], k)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            found[i] = ids[0]
+
+        hits = sum(len(set(truth[i]) & set(found[i])) for i in range(len(queries)))
+        report.append({
+            'backend': backend,
+            'build_seconds': round(build_seconds, 3),
+            'mean_ms': round(float(np.mean(latencies)), 3),
+            'p95_ms': round(float(np.percentile(latencies, 95)), 3),
+            f'recall@{k}': round(hits / float(truth.size), 4),
+            'size_mb': round(faiss.serialize_index(index).nbytes / (1024 * 1024), 2),
+        })
+    return report
+
+def check_backend_detection(dimension: int = 64, n_vectors: int = 2000,
+                            backends: Tuple[str, ...] = INDEX_BACKENDS) -> Dict[str, str]:
+    """
+    Her backend için küçük bir index oluşturup serialize/deserialize sonrası
+    detect_backend'in aynı adı verdiğini doğrula.
+
+    Returns:
+        Uyuşmayan backend'ler: {beklenen: bulunan}; boşsa hepsi doğru
+    """
+    vectors = np.random.default_rng(0).random((n_vectors, dimension), dtype='float32')
+    mismatches = {}
+    for backend in backends:
+        index = train_and_fill_index(vectors, backend, dimension)
+        restored = faiss.deserialize_index(faiss.serialize_index(index))
+        for candidate in (index, restored):
+            detected = detect_backend(candidate)
+            if detected != backend:
+                mismatches[backend] = detected
+    return mismatches
+
 class VectorDatabase:
     """
     FAISS tabanlı vektör veritabanı yöneticisi
@@ -41,6 +509,9 @@ class VectorDatabase:
         self.index_file = self.db_path / "faiss.index"
         self.metadata_file = self.db_path / "metadata.json"
         self.embeddings_file = self.db_path / "embeddings.pkl"
+        self.wal_file = self.db_path / "delta.wal"
+        # Worker'lar ve CLI yazıcıları arasında id ataması / WAL / sıkıştırma kilidi
+        self.lock_file = self.db_path / "store.lock"
         
         # SQLite metadata veritabanı
         self.sqlite_db = self.db_path / "vector_metadata.db"
@@ -53,11 +524,46 @@ class VectorDatabase:
         # FAISS index
         self.index = None
         self.metadata = []
+        self.index_type = VECTOR_INDEX_TYPE
+        self.index_readonly = False
+        
+        # Delta segment (ana index'e henüz birleştirilmemiş vektörler)
+        # vector_id = delta_base + delta içindeki sıra
+        self.delta_index = None
+        self.delta_base = 0
+        self._write_lock = threading.RLock()
+        self._segment_lock = threading.Lock()
+        self._timer_lock = threading.Lock()
+        self._compaction_timer = None
+        
+        # Bu sürecin en son senkronize olduğu depo durumu (diğer süreçlerin yazmalarını fark etmek için)
+        self._synced_generation = None
+        self._index_stat = None
+        self._store_lock_depth = 0
+        
+        # vector_id maskeleri: tombstone'lar ve source_type başına bölümler
+        self._dead_mask = None
+        self._dead_count = 0
+        self._type_masks = {}
+        self._selector_cache = OrderedDict()
+        # count_legacy_book_rows sonucu (generation, sayı)
+        self._legacy_book_rows = None
+        
+        # Metadata hidrasyonu: thread başına salt okunur bağlantı + LRU
+        self._read_local = threading.local()
+        self.metadata_cache_size = METADATA_CACHE_SIZE
+        self._metadata_cache = OrderedDict()
+        self._metadata_cache_lock = threading.Lock()
         
         # Initialize
         self._init_model()
         self._init_sqlite()
         self._load_or_create_index()
+        self.query_cache = QueryEmbeddingCache(
+            self.model_name,
+            self.dimension,
+            disk_path=self.db_path / "query_embeddings.db" if QUERY_CACHE_DISK else None
+        )
     
     def _init_model(self):
         """Sentence transformer modelini yükle"""
@@ -102,6 +608,14 @@ class VectorDatabase:
                 CREATE INDEX IF NOT EXISTS idx_source_id ON vector_metadata(source_id)
             """)
             
+            # İçerik değiştikçe artan sayaç (önbellek geçersizleştirme için)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS vector_store_info (
+                    key TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )
+            """)
+            
             conn.commit()
             conn.close()
             logger.info("SQLite metadata database initialized")
@@ -148,26 +662,466 @@ class VectorDatabase:
     
     def _load_or_create_index(self):
         """FAISS index'i yükle veya oluştur"""
+        with self._store_lock(shared=True):
+            self._load_index_and_wal()
+        
+        # WAL'dan gelen delta heap'te kalmasın: büyükse fork öncesi hemen, değilse arka planda birleştir
+        if self.delta_index.ntotal and self.delta_index.ntotal >= self._compaction_threshold():
+            self.compact()
+        else:
+            self._schedule_compaction()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+    
+    def _load_index_and_wal(self):
+        """Ana index + WAL + maskeler (store kilidi altında çağrılır)"""
+        generation = self.get_generation()
         try:
             if self.index_file.exists():
                 logger.info("Loading existing FAISS index")
-                self.index = faiss.read_index(str(self.index_file))
-                logger.info(f"Loaded FAISS index with {self.index.ntotal} vectors")
+                self.index, self.index_readonly = read_index(self.index_file)
+                logger.info(f"Loaded FAISS index with {self.index.ntotal} vectors (mmap={self.index_readonly})")
             else:
                 # Backblaze'den indirmeyi dene
                 if self._download_from_backblaze():
                     logger.info("Downloaded FAISS index from Backblaze")
-                    self.index = faiss.read_index(str(self.index_file))
-                    logger.info(f"Loaded FAISS index with {self.index.ntotal} vectors")
+                    self.index, self.index_readonly = read_index(self.index_file)
+                    logger.info(f"Loaded FAISS index with {self.index.ntotal} vectors (mmap={self.index_readonly})")
                 else:
                     logger.info("Creating new FAISS index")
-                    # L2 distance kullanarak IndexFlatL2 oluştur
-                    self.index = faiss.IndexFlatL2(self.dimension)
+                    # Boş korpusta eğitim yapılamaz: eşik aşılana kadar Flat
+                    self.index = build_index(self.dimension, "flat")
                     logger.info(f"Created new FAISS index with dimension {self.dimension}")
+            apply_search_params(self.index)
+            logger.info(f"FAISS index backend: {detect_backend(self.index)} (configured: {self.index_type})")
         except Exception as e:
             logger.error(f"Failed to load/create FAISS index: {e}")
             # Fallback: yeni index oluştur
-            self.index = faiss.IndexFlatL2(self.dimension)
+            self.index = build_index(self.dimension, "flat")
+            self.index_readonly = False
+        
+        self._index_stat = self._index_file_stat()
+        self._replay_wal()
+        self._load_id_masks()
+        self._synced_generation = generation
+    
+    def _after_fork(self):
+        """
+        gunicorn worker'ında: ebeveynden kalan kilitler ve zamanlayıcı geçersizdir.
+        Kilitler yeniden oluşturulur, WAL delta'sı için sıkıştırma bu süreçte yeniden planlanır.
+        """
+        self._write_lock = threading.RLock()
+        self._segment_lock = threading.Lock()
+        self._timer_lock = threading.Lock()
+        self._metadata_cache_lock = threading.Lock()
+        self._compaction_timer = None
+        self._store_lock_depth = 0
+        self._schedule_compaction()
+    
+    def _load_id_masks(self):
+        """
+        vector_id maskelerini SQLite'tan kur:
+        - tombstone: index'te olup metadata'sı olmayan id'ler (eski silmelerden kalan yetimler dahil)
+        - source_type başına bitmap: filtreli aramalar yalnızca ilgili dilimi tarar
+        """
+        try:
+            total = self._total_vectors()
+            conn = sqlite3.connect(self.sqlite_db)
+            rows = conn.execute(
+                "SELECT vector_id, source_type FROM vector_metadata WHERE vector_id IS NOT NULL"
+            ).fetchall()
+            conn.close()
+            
+            ids = np.fromiter((row[0] for row in rows), dtype='int64', count=len(rows))
+            types = np.array([row[1] or '' for row in rows], dtype=object)
+            valid = (ids >= 0) & (ids < total)
+            ids, types = ids[valid], types[valid]
+            
+            dead = np.ones(total, dtype=bool)
+            dead[ids] = False
+            type_masks = {}
+            for source_type in set(types.tolist()):
+                mask = np.zeros(total, dtype=bool)
+                mask[ids[types == source_type]] = True
+                type_masks[source_type] = mask
+            
+            with self._segment_lock:
+                self._dead_mask = dead
+                self._dead_count = int(dead.sum())
+                self._type_masks = type_masks
+                self._selector_cache.clear()
+            if self._dead_count:
+                logger.info(f"{self._dead_count} deleted vectors will be skipped during search")
+        except Exception as e:
+            logger.error(f"Failed to load vector id masks: {e}")
+    
+    def _mark_added(self, vector_ids: List[int], source_types: List[str]):
+        """Yeni vektörleri source_type bölümlerine ekle"""
+        with self._segment_lock:
+            total = self.index.ntotal + self.delta_index.ntotal
+            for vector_id, source_type in zip(vector_ids, source_types):
+                mask = _grow_mask(self._type_masks.get(source_type), total)
+                mask[vector_id] = True
+                self._type_masks[source_type] = mask
+            self._selector_cache.clear()
+    
+    def _mark_deleted(self, vector_ids: List[int]):
+        """Verilen vector_id'leri tombstone olarak işaretle"""
+        with self._segment_lock:
+            total = self.index.ntotal + self.delta_index.ntotal
+            dead = _grow_mask(self._dead_mask, total)
+            ids = np.asarray([vid for vid in vector_ids if 0 <= vid < total], dtype='int64')
+            dead[ids] = True
+            self._dead_mask = dead
+            self._dead_count = int(dead.sum())
+            self._selector_cache.clear()
+    
+    def _segment_selectors(self, source_types: Optional[List[str]] = None):
+        """
+        Ana index ve delta için IDSelector'ları döndür (_segment_lock altında çağrılır).
+        
+        İzinli id'ler = seçilen source_type bölümleri VE silinmemiş olanlar.
+        
+        Returns:
+            (ana seçici, delta seçici, izinli oran); filtre ve tombstone yoksa (None, None, 1.0)
+        """
+        if source_types is None and not self._dead_count:
+            return None, None, 1.0
+        
+        total = self.index.ntotal + self.delta_index.ntotal
+        key = (frozenset(source_types) if source_types is not None else None, self.delta_base, total)
+        cached = self._selector_cache.get(key)
+        if cached is not None:
+            self._selector_cache.move_to_end(key)
+            return cached[0], cached[1], cached[2]
+        
+        if source_types is None:
+            allowed = np.ones(total, dtype=bool)
+        else:
+            allowed = np.zeros(total, dtype=bool)
+            for source_type in set(source_types):
+                mask = self._type_masks.get(source_type)
+                if mask is not None:
+                    n = min(len(mask), total)
+                    allowed[:n] |= mask[:n]
+        if self._dead_count:
+            n = min(len(self._dead_mask), total)
+            allowed[:n] &= ~self._dead_mask[:n]
+        
+        selectivity = float(allowed.mean()) if total else 1.0
+        main_selector, main_bitmap = _bitmap_selector(allowed[:self.delta_base])
+        delta_selector, delta_bitmap = _bitmap_selector(allowed[self.delta_base:])
+        # SWIG seçicileri bitmap'i kopyalamaz: bitmap'ler önbellekte canlı tutulur
+        self._selector_cache[key] = (main_selector, delta_selector, selectivity, main_bitmap, delta_bitmap)
+        while len(self._selector_cache) > SELECTOR_CACHE_SIZE:
+            self._selector_cache.popitem(last=False)
+        return main_selector, delta_selector, selectivity
+    
+    def _wal_dtype(self):
+        """WAL kayıt formatı: int64 vector_id + float32 vektör"""
+        return np.dtype([('id', '<i8'), ('vector', '<f4', (self.dimension,))])
+    
+    def _read_wal(self, start_id: int):
+        """
+        WAL'daki start_id ve sonrasındaki kesintisiz kayıtları döndür.
+        Sıkıştırma sırasında çökme olduysa ana index'te zaten bulunan kayıtlar atlanır.
+        """
+        record = self._wal_dtype()
+        if not self.wal_file.exists():
+            return np.empty(0, dtype=record)
+        raw = self.wal_file.read_bytes()
+        # Yarım yazılmış son kaydı yok say
+        usable = len(raw) - len(raw) % record.itemsize
+        entries = np.frombuffer(raw[:usable], dtype=record)
+        entries = entries[entries['id'] >= start_id]
+        
+        # Yalnızca kesintisiz id dizisini kabul et
+        expected = np.arange(start_id, start_id + len(entries))
+        if len(entries) and not np.array_equal(entries['id'], expected):
+            valid = int(np.argmax(entries['id'] != expected))
+            logger.warning(f"WAL has a gap after {valid} records, ignoring the rest")
+            entries = entries[:valid]
+        return entries
+    
+    def _replay_wal(self):
+        """Ana index'e birleştirilmemiş vektörleri WAL'dan delta segment'e geri yükle"""
+        self.delta_index = faiss.IndexFlatL2(self.dimension)
+        self.delta_base = self.index.ntotal
+        try:
+            entries = self._read_wal(self.delta_base)
+            if len(entries):
+                self.delta_index.add(np.ascontiguousarray(entries['vector']))
+                logger.info(f"Replayed {len(entries)} vectors from WAL into delta segment")
+        except Exception as e:
+            logger.error(f"Failed to replay WAL: {e}")
+    
+    @contextmanager
+    def _store_lock(self, shared: bool = False, blocking: bool = True):
+        """
+        Süreçler arası dosya kilidi. Yazmalar (id ataması + WAL, sıkıştırma, silme,
+        yeniden oluşturma) özel, görünüm yenilemeleri paylaşımlı kilit alır.
+        _write_lock altında çağrılır; iç içe çağrılar (örn. rebuild -> compact) kilidi yeniden almaz.
+        
+        Yields:
+            Kilit alındıysa True (blocking=False iken kilit meşgulse False)
+        """
+        if fcntl is None or self._store_lock_depth:
+            yield True
+            return
+        with open(self.lock_file, 'a+b') as f:
+            flags = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+            try:
+                fcntl.flock(f.fileno(), flags if blocking else flags | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            self._store_lock_depth += 1
+            try:
+                yield True
+            finally:
+                self._store_lock_depth -= 1
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    
+    def _index_file_stat(self):
+        """Ana index dosyasının kimliği; başka bir süreç yeniden yazdıysa değişir"""
+        try:
+            stat = self.index_file.stat()
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    
+    def _sync_with_store(self):
+        """
+        Diğer süreçlerin yazmalarını bu sürecin görünümüne al (store kilidi altında çağrılır).
+        
+        - Ana index dosyası değiştiyse (sıkıştırma / yeniden oluşturma) yeniden açılır
+          ve delta WAL'dan baştan kurulur
+        - Aksi halde WAL'a eklenmiş yeni vektörler delta'ya eklenir
+        - Generation değiştiyse maskeler ve metadata önbelleği yenilenir
+        """
+        generation = self.get_generation()
+        stat = self._index_file_stat()
+        if stat != self._index_stat and stat is not None:
+            index, readonly = read_index(self.index_file)
+            apply_search_params(index)
+            delta_index = faiss.IndexFlatL2(self.dimension)
+            entries = self._read_wal(index.ntotal)
+            if len(entries):
+                delta_index.add(np.ascontiguousarray(entries['vector']))
+            with self._segment_lock:
+                self.index = index
+                self.index_readonly = readonly
+                self.delta_index = delta_index
+                self.delta_base = index.ntotal
+            self._index_stat = stat
+            logger.info(f"Reloaded FAISS index written by another process ({index.ntotal} + {delta_index.ntotal} delta)")
+        else:
+            entries = self._read_wal(self._total_vectors())
+            if len(entries):
+                with self._segment_lock:
+                    self.delta_index.add(np.ascontiguousarray(entries['vector']))
+        
+        if generation != self._synced_generation:
+            self._load_id_masks()
+            self._invalidate_metadata_cache()
+            self._synced_generation = generation
+    
+    def _refresh_if_stale(self):
+        """
+        Başka bir worker / CLI depoyu değiştirdiyse (generation arttıysa) görünümü yenile.
+        Kilitler meşgulse aramayı bekletmez: yenileme bir sonraki aramaya kalır.
+        """
+        if self.get_generation() == self._synced_generation:
+            return
+        if not self._write_lock.acquire(blocking=False):
+            return
+        try:
+            with self._store_lock(shared=True, blocking=False) as locked:
+                if locked:
+                    self._sync_with_store()
+        except Exception as e:
+            logger.error(f"Failed to refresh vector store view: {e}")
+        finally:
+            self._write_lock.release()
+    
+    def _append_wal(self, start_id: int, embeddings):
+        """Yeni vektörleri WAL'a ekle ve diske zorla"""
+        entries = np.empty(len(embeddings), dtype=self._wal_dtype())
+        entries['id'] = np.arange(start_id, start_id + len(embeddings))
+        entries['vector'] = embeddings
+        with open(self.wal_file, 'ab') as f:
+            f.write(entries.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+    
+    def _total_vectors(self) -> int:
+        """Ana index + delta segment'teki toplam vektör sayısı"""
+        return self.index.ntotal + (self.delta_index.ntotal if self.delta_index is not None else 0)
+    
+    def _maybe_train_index(self, index):
+        """
+        Korpus eğitim eşiğini geçtiyse Flat index'i yapılandırılmış ANN backend'e dönüştür.
+        """
+        if self.index_type == "flat" or detect_backend(index) != "flat":
+            return index
+        if index.ntotal < VECTOR_INDEX_TRAIN_THRESHOLD:
+            return index
+        logger.info(
+            f"Corpus reached {index.ntotal} vectors (threshold {VECTOR_INDEX_TRAIN_THRESHOLD}), "
+            f"training {self.index_type} index"
+        )
+        vectors = index.reconstruct_n(0, index.ntotal)
+        return train_and_fill_index(vectors, self.index_type, self.dimension)
+    
+    def _search_segments(self, query_vectors, k: int, source_types: Optional[List[str]] = None):
+        """
+        Ana index ve delta segment'te ara, sonuçları mesafeye göre birleştir.
+        Tombstone'lar ve source_type filtresi IDSelector ile index içinde uygulanır.
+        
+        Returns:
+            (distances, vector_ids) tek boyutlu numpy dizileri
+        """
+        with self._segment_lock:
+            index = self.index
+            base = self.delta_base
+            main_selector, delta_selector, selectivity = self._segment_selectors(source_types)
+            if self.delta_index.ntotal:
+                delta_k = min(k, self.delta_index.ntotal)
+                if delta_selector is not None:
+                    delta_distances, delta_ids = self.delta_index.search(
+                        query_vectors, delta_k, params=faiss.SearchParameters(sel=delta_selector)
+                    )
+                else:
+                    delta_distances, delta_ids = self.delta_index.search(query_vectors, delta_k)
+            else:
+                delta_distances = delta_ids = None
+        
+        if main_selector is not None:
+            params = make_search_params(index, main_selector, k=k, selectivity=selectivity)
+            distances, ids = index.search(query_vectors, k, params=params)
+        else:
+            distances, ids = index.search(query_vectors, k)
+        distances, ids = distances[0], ids[0]
+        if delta_ids is None:
+            return distances, ids
+        
+        delta_ids = np.where(delta_ids[0] >= 0, delta_ids[0] + base, -1)
+        distances = np.concatenate([distances, delta_distances[0]])
+        ids = np.concatenate([ids, delta_ids])
+        order = np.argsort(distances, kind='stable')[:k]
+        return distances[order], ids[order]
+    
+    def _reconstruct(self, vector_id: int):
+        """vector_id'ye ait vektörü ana index'ten ya da delta'dan getir"""
+        with self._segment_lock:
+            if vector_id >= self.delta_base:
+                return self.delta_index.reconstruct(vector_id - self.delta_base)
+            index = self.index
+        return index.reconstruct(vector_id)
+    
+    def _write_index(self, index):
+        """
+        Index'i önce geçici dosyaya yaz, sonra atomik rename yap; böylece dosyayı
+        mmap ile açmış diğer worker'lar yarım yazılmış bir index görmez.
+        """
+        tmp_file = self.index_file.with_suffix(".index.tmp")
+        faiss.write_index(index, str(tmp_file))
+        os.replace(tmp_file, self.index_file)
+    
+    def compact(self, force_write: bool = False) -> int:
+        """
+        Delta segment'i ana index'e birleştir, atomik olarak kaydet ve WAL'ı sıfırla.
+        
+        Canlı index yerinde değiştirilmez: kopyası üzerinde çalışılır ve
+        aramalar kesintisiz devam eder.
+        
+        Returns:
+            Birleştirilen vektör sayısı
+        """
+        with self._write_lock, self._store_lock():
+            # Diğer süreçlerin WAL'a eklediklerini de al: WAL sıfırlanınca kaybolmasınlar
+            self._sync_with_store()
+            pending = self.delta_index.ntotal
+            if not pending and not force_write:
+                return 0
+            
+            if pending:
+                if self.index_readonly:
+                    new_index, _ = read_index(self.index_file, mmap=False)
+                else:
+                    new_index = faiss.clone_index(self.index)
+                new_index.add(self.delta_index.reconstruct_n(0, pending))
+                new_index = self._maybe_train_index(new_index)
+                apply_search_params(new_index)
+            else:
+                new_index = self.index
+            
+            self._write_index(new_index)
+            self._index_stat = self._index_file_stat()
+            
+            # Yazılan dosyayı tekrar mmap ile aç: sayfalar worker'larla paylaşılsın
+            readonly = False
+            if VECTOR_INDEX_MMAP and pending:
+                new_index, readonly = read_index(self.index_file)
+                apply_search_params(new_index)
+            
+            with self._segment_lock:
+                if pending:
+                    self.index = new_index
+                    self.index_readonly = readonly
+                self.delta_index = faiss.IndexFlatL2(self.dimension)
+                self.delta_base = self.index.ntotal
+            
+            # Ana index kalıcı hale geldi: WAL'ı sıfırla
+            open(self.wal_file, 'wb').close()
+            
+            if pending:
+                logger.info(f"Compacted {pending} delta vectors into main index ({self.index.ntotal} total)")
+            return pending
+    
+    def _compaction_threshold(self) -> int:
+        return max(VECTOR_DELTA_COMPACT_THRESHOLD, int(self.index.ntotal * VECTOR_DELTA_COMPACT_RATIO))
+    
+    def _schedule_compaction(self):
+        """
+        Delta eşiği aştıysa hemen, aksi halde VECTOR_DELTA_COMPACT_INTERVAL saniye
+        sonra arka planda sıkıştırma planla.
+        """
+        if not self.delta_index.ntotal:
+            return
+        delay = 0 if self.delta_index.ntotal >= self._compaction_threshold() else VECTOR_DELTA_COMPACT_INTERVAL
+        with self._timer_lock:
+            if self._compaction_timer is not None:
+                if delay or self._compaction_timer.interval == 0:
+                    return
+                self._compaction_timer.cancel()
+            timer = threading.Timer(delay, self._background_compact)
+            timer.daemon = True
+            self._compaction_timer = timer
+            timer.start()
+    
+    def _background_compact(self):
+        with self._timer_lock:
+            self._compaction_timer = None
+        try:
+            self.compact()
+        except Exception as e:
+            logger.error(f"Background compaction failed: {e}")
+    
+    def _collect_vectors(self):
+        """
+        Mevcut index'teki vektörleri vector_id sırasıyla döndür.
+        Yeniden oluşturulamıyorsa (örn. PQ) None döner.
+        """
+        if self.index is None or self.index.ntotal == 0:
+            return None
+        if detect_backend(self.index) == "ivf_pq":
+            return None  # PQ kayıplı: metadata'dan yeniden encode edilmeli
+        try:
+            return self.index.reconstruct_n(0, self.index.ntotal)
+        except Exception as e:
+            logger.warning(f"Could not reconstruct vectors from index: {e}")
+            return None
     
     def add_documents(self, documents: List[Dict[str, Any]], skip_duplicates: bool = True) -> List[int]:
         """
@@ -196,44 +1150,13 @@ class VectorDatabase:
             
             # Embeddings oluştur
             logger.info(f"Creating embeddings for {len(texts)} documents")
-            embeddings = self.model.encode(texts, convert_to_numpy=True)
+            embeddings = self.model.encode(texts, convert_to_numpy=True).astype('float32')
             
-            # FAISS'e ekle
-            start_id = self.index.ntotal
-            self.index.add(embeddings.astype('float32'))
+            with self._write_lock, self._store_lock():
+                vector_ids = self._add_to_delta(documents, embeddings)
             
-            # Metadata'yı SQLite'a kaydet
-            vector_ids = []
-            conn = sqlite3.connect(self.sqlite_db)
-            cursor = conn.cursor()
-            
-            for i, doc in enumerate(documents):
-                vector_id = start_id + i
-                vector_ids.append(vector_id)
-                
-                cursor.execute("""
-                    INSERT OR REPLACE INTO vector_metadata 
-                    (vector_id, source_type, source_id, title, author, content, 
-                     page_number, timestamp, url, embedding_model)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    vector_id,
-                    doc.get('source_type', ''),
-                    doc.get('source_id', ''),
-                    doc.get('title', ''),
-                    doc.get('author', ''),
-                    doc.get('content', ''),
-                    doc.get('page_number'),
-                    doc.get('timestamp'),
-                    doc.get('url'),
-                    self.model_name
-                ))
-            
-            conn.commit()
-            conn.close()
-            
-            # Index'i kaydet
-            self.save_index()
+            # Tam index yazımı yerine arka planda sıkıştırma
+            self._schedule_compaction()
             
             logger.info(f"Added {len(documents)} documents to vector database")
             return vector_ids
@@ -242,6 +1165,77 @@ class VectorDatabase:
             logger.error(f"Failed to add documents: {e}")
             return []
     
+    def _add_to_delta(self, documents: List[Dict[str, Any]], embeddings) -> List[int]:
+        """
+        Vektörleri WAL + delta segment'e, metadata'yı SQLite'a yaz (store kilidi altında çağrılır).
+        Önce diğer süreçlerin eklemeleri alınır: id'ler tüm worker'lar arasında tekildir.
+        """
+        self._sync_with_store()
+        start_id = self._total_vectors()
+        
+        # Önce WAL: çökme durumunda vektörler kaybolmaz
+        self._append_wal(start_id, embeddings)
+        with self._segment_lock:
+            self.delta_index.add(embeddings)
+        
+        # Metadata'yı SQLite'a kaydet
+        vector_ids = []
+        conn = sqlite3.connect(self.sqlite_db)
+        cursor = conn.cursor()
+        
+        for i, doc in enumerate(documents):
+            vector_id = start_id + i
+            vector_ids.append(vector_id)
+            
+            cursor.execute("""
+                INSERT OR REPLACE INTO vector_metadata 
+                (vector_id, source_type, source_id, title, author, content, 
+                 page_number, timestamp, url, embedding_model)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                vector_id,
+                doc.get('source_type', ''),
+                doc.get('source_id', ''),
+                doc.get('title', ''),
+                doc.get('author', ''),
+                doc.get('content', ''),
+                doc.get('page_number'),
+                doc.get('timestamp'),
+                doc.get('url'),
+                self.model_name
+            ))
+        
+        generation = self._bump_generation(cursor)
+        conn.commit()
+        conn.close()
+        self._mark_added(vector_ids, [doc.get('source_type', '') for doc in documents])
+        self._invalidate_metadata_cache()
+        self._synced_generation = generation
+        return vector_ids
+    
+    @staticmethod
+    def _bump_generation(cursor) -> int:
+        """İçerik sayacını aynı transaction içinde artır, yeni değeri döndür"""
+        cursor.execute("""
+            INSERT INTO vector_store_info (key, value) VALUES ('generation', 1)
+            ON CONFLICT(key) DO UPDATE SET value = value + 1
+        """)
+        return cursor.execute("SELECT value FROM vector_store_info WHERE key = 'generation'").fetchone()[0]
+    
+    def get_generation(self) -> int:
+        """
+        Vektör deposunun içerik sürümü. Belge eklendiğinde/silindiğinde artar;
+        tüm worker'lar aynı SQLite dosyasını okuduğu için süreçler arası tutarlıdır.
+        """
+        try:
+            row = self._get_read_connection().execute(
+                "SELECT value FROM vector_store_info WHERE key = 'generation'"
+            ).fetchone()
+            return row[0] if row else 0
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to read vector store generation: {e}")
+            return 0
+    
     def _filter_duplicates(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         Mevcut source_id'leri filtrele (duplicate detection)
@@ -279,6 +1273,126 @@ class VectorDatabase:
             logger.error(f"Failed to filter duplicates: {e}")
             return documents  # Hata durumunda orijinal listeyi döndür
     
+    def _get_read_connection(self) -> sqlite3.Connection:
+        """
+        Thread başına tekrar kullanılan salt okunur SQLite bağlantısı.
+        Her aramada yeni bağlantı açma maliyetini ortadan kaldırır.
+        """
+        conn = getattr(self._read_local, "conn", None)
+        # fork sonrası ebeveynden kalan bağlantıyı kullanma
+        if conn is None or getattr(self._read_local, "pid", None) != os.getpid():
+            uri = f"file:{self.sqlite_db.resolve().as_posix()}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            # Sayfalar heap yerine işletim sistemi önbelleğinden okunur (worker'lar arası paylaşım)
+            conn.execute(f"PRAGMA mmap_size={VECTOR_SQLITE_MMAP_BYTES}")
+            self._read_local.conn = conn
+            self._read_local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _row_to_metadata(row) -> Dict[str, Any]:
+        """SELECT sonucunu metadata sözlüğüne çevir"""
+        return dict(zip(_METADATA_COLUMNS, row))
+
+    def _fetch_metadata(self, vector_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Verilen vector_id'lerin metadata'sını toplu olarak getir.
+
+        Önce LRU önbelleğe bakılır, eksikler tek bir `WHERE vector_id IN (...)`
+        sorgusuyla çekilir.
+        """
+        found: Dict[int, Dict[str, Any]] = {}
+        missing = []
+
+        with self._metadata_cache_lock:
+            for vid in vector_ids:
+                cached = self._metadata_cache.get(vid)
+                if cached is not None:
+                    self._metadata_cache.move_to_end(vid)
+                    found[vid] = cached
+                else:
+                    missing.append(vid)
+
+        if not missing:
+            return found
+
+        conn = self._get_read_connection()
+        columns = ", ".join(_METADATA_COLUMNS)
+        for start in range(0, len(missing), _SQLITE_MAX_PARAMS):
+            chunk = missing[start:start + _SQLITE_MAX_PARAMS]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT {columns} FROM vector_metadata WHERE vector_id IN ({placeholders})",
+                chunk
+            ).fetchall()
+            for row in rows:
+                metadata = self._row_to_metadata(row)
+                found[metadata['vector_id']] = metadata
+
+        if self.metadata_cache_size > 0:
+            with self._metadata_cache_lock:
+                for vid in missing:
+                    if vid in found:
+                        self._metadata_cache[vid] = found[vid]
+                        self._metadata_cache.move_to_end(vid)
+                while len(self._metadata_cache) > self.metadata_cache_size:
+                    self._metadata_cache.popitem(last=False)
+
+        return found
+
+    def _invalidate_metadata_cache(self):
+        """Metadata LRU önbelleğini temizle (ekleme/silme sonrası)"""
+        with self._metadata_cache_lock:
+            self._metadata_cache.clear()
+
+    def _hydrate_results(self, distances, indices, source_types: Optional[List[str]] = None,
+                         exclude_ids: Optional[set] = None) -> List[Dict[str, Any]]:
+        """
+        FAISS sonuçlarını metadata ile zenginleştir, FAISS sırasını koru.
+        """
+        hits = []
+        for distance, vector_id in zip(distances, indices):
+            vector_id = int(vector_id)
+            if vector_id == -1:  # FAISS boş slot
+                continue
+            if exclude_ids and vector_id in exclude_ids:
+                continue
+            hits.append((vector_id, float(distance)))
+
+        if not hits:
+            return []
+
+        metadata_by_id = self._fetch_metadata([vid for vid, _ in hits])
+
+        results = []
+        for vector_id, distance in hits:
+            row = metadata_by_id.get(vector_id)
+            if row is None:
+                continue
+            # Kaynak türü filtresi
+            if source_types is not None and row['source_type'] not in source_types:
+                continue
+            metadata = dict(row)
+            metadata['distance'] = distance
+            metadata['similarity'] = 1.0 / (1.0 + distance)  # Distance'ı similarity'ye çevir
+            results.append(metadata)
+
+        return results
+
+    def encode_query(self, query: str):
+        """
+        Sorgu embedding'ini önbellekten getir ya da modelle hesapla.
+        
+        Returns:
+            (1, dimension) boyutunda float32 numpy dizisi
+        """
+        key = normalize_query(query)
+        vector = self.query_cache.get(key)
+        if vector is None:
+            vector = self.model.encode([query], convert_to_numpy=True).astype('float32')
+            self.query_cache.put(key, vector)
+        return vector
+    
     def search(self, query: str, k: int = 10, source_types: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """
         Anlamsal arama yap
@@ -292,51 +1406,19 @@ class VectorDatabase:
             List of search results with metadata
         """
         try:
-            if self.index.ntotal == 0:
+            self._refresh_if_stale()
+            if self._total_vectors() == 0:
                 logger.warning("Vector database is empty")
                 return []
             
-            # Query embedding oluştur
-            query_embedding = self.model.encode([query], convert_to_numpy=True)
+            # Query embedding (önbellekli)
+            query_embedding = self.encode_query(query)
             
-            # FAISS'te ara
-            distances, indices = self.index.search(query_embedding.astype('float32'), k * 2)  # Fazladan al, filtreleme için
+            # FAISS'te ara (ana index + delta); source_type filtresi index içinde uygulanır
+            distances, indices = self._search_segments(query_embedding, k, source_types=source_types)
             
-            # Metadata'yı getir
-            results = []
-            conn = sqlite3.connect(self.sqlite_db)
-            cursor = conn.cursor()
-            
-            for i, (distance, vector_id) in enumerate(zip(distances[0], indices[0])):
-                if vector_id == -1:  # FAISS boş slot
-                    continue
-                
-                cursor.execute("""
-                    SELECT * FROM vector_metadata WHERE vector_id = ?
-                """, (int(vector_id),))
-                
-                row = cursor.fetchone()
-                if row:
-                    metadata = {
-                        'vector_id': row[1],
-                        'source_type': row[2],
-                        'source_id': row[3],
-                        'title': row[4],
-                        'author': row[5],
-                        'content': row[6],
-                        'page_number': row[7],
-                        'timestamp': row[8],
-                        'url': row[9],
-                        'embedding_model': row[10],
-                        'distance': float(distance),
-                        'similarity': 1.0 / (1.0 + float(distance))  # Distance'ı similarity'ye çevir
-                    }
-                    
-                    # Kaynak türü filtresi
-                    if source_types is None or metadata['source_type'] in source_types:
-                        results.append(metadata)
-            
-            conn.close()
+            # Metadata'yı tek sorguda getir (FAISS sırası korunur)
+            results = self._hydrate_results(distances, indices, source_types=source_types)
             
             # Similarity'ye göre sırala ve k tane döndür
             results.sort(key=lambda x: x['similarity'], reverse=True)
@@ -351,44 +1433,18 @@ class VectorDatabase:
         Belirli bir vektöre benzer belgeleri bul
         """
         try:
-            if vector_id >= self.index.ntotal:
+            self._refresh_if_stale()
+            if vector_id >= self._total_vectors():
                 return []
             
             # Vektörü al
-            vector = self.index.reconstruct(vector_id)
+            vector = self._reconstruct(vector_id)
             
             # Benzer vektörleri ara
-            distances, indices = self.index.search(vector.reshape(1, -1), k + 1)  # +1 çünkü kendisi de gelecek
-            
-            # Metadata'yı getir (kendisi hariç)
-            results = []
-            conn = sqlite3.connect(self.sqlite_db)
-            cursor = conn.cursor()
+            distances, indices = self._search_segments(vector.reshape(1, -1), k + 1)  # +1 çünkü kendisi de gelecek
             
-            for distance, idx in zip(distances[0], indices[0]):
-                if idx != vector_id and idx != -1:  # Kendisi ve boş slot değilse
-                    cursor.execute("""
-                        SELECT * FROM vector_metadata WHERE vector_id = ?
-                    """, (int(idx),))
-                    
-                    row = cursor.fetchone()
-                    if row:
-                        metadata = {
-                            'vector_id': row[1],
-                            'source_type': row[2],
-                            'source_id': row[3],
-                            'title': row[4],
-                            'author': row[5],
-                            'content': row[6],
-                            'page_number': row[7],
-                            'timestamp': row[8],
-                            'url': row[9],
-                            'distance': float(distance),
-                            'similarity': 1.0 / (1.0 + float(distance))
-                        }
-                        results.append(metadata)
-            
-            conn.close()
+            # Metadata'yı tek sorguda getir (kendisi hariç)
+            results = self._hydrate_results(distances, indices, exclude_ids={vector_id})
             return results
             
         except Exception as e:
@@ -399,20 +1455,34 @@ class VectorDatabase:
         """
         Belirli bir kaynağın tüm vektörlerini sil
         
-        Note: FAISS deletion is complex, so we mark as deleted in metadata
+        Metadata silinir, vektörler tombstone olarak işaretlenir ve aramada
+        FAISS seçicisiyle elenir. Fiziksel silme için purge_deleted() kullanılır.
         """
         try:
-            conn = sqlite3.connect(self.sqlite_db)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                DELETE FROM vector_metadata 
-                WHERE source_type = ? AND source_id = ?
-            """, (source_type, source_id))
-            
-            deleted_count = cursor.rowcount
-            conn.commit()
-            conn.close()
+            with self._write_lock, self._store_lock():
+                # Maskeler id'lere göre tutulur: önce diğer süreçlerin eklemelerini al
+                self._sync_with_store()
+                conn = sqlite3.connect(self.sqlite_db)
+                cursor = conn.cursor()
+                
+                cursor.execute("""
+                    SELECT vector_id FROM vector_metadata 
+                    WHERE source_type = ? AND source_id = ?
+                """, (source_type, source_id))
+                vector_ids = [row[0] for row in cursor.fetchall() if row[0] is not None]
+                
+                cursor.execute("""
+                    DELETE FROM vector_metadata 
+                    WHERE source_type = ? AND source_id = ?
+                """, (source_type, source_id))
+                
+                deleted_count = cursor.rowcount
+                generation = self._bump_generation(cursor) if deleted_count else self._synced_generation
+                conn.commit()
+                conn.close()
+                self._mark_deleted(vector_ids)
+                self._invalidate_metadata_cache()
+                self._synced_generation = generation
             
             logger.info(f"Deleted {deleted_count} vectors for {source_type}:{source_id}")
             return deleted_count
@@ -421,6 +1491,43 @@ class VectorDatabase:
             logger.error(f"Failed to delete vectors: {e}")
             return 0
     
+    # Eski populate_vector_db kitap kayıtları: source_id yalnızca "_<parça>", dosya/sayfa yok
+    # (yeni biçim "<pdf>:<sayfa>_<parça>")
+    _LEGACY_BOOK_ROWS_WHERE = "source_type = 'book' AND instr(source_id, ':') = 0"
+
+    def count_legacy_book_rows(self) -> int:
+        """Sayfa bilgisi olmayan eski biçimli kitap kayıtlarının sayısı (generation başına bir kez sayılır)"""
+        generation = self.get_generation()
+        cached = self._legacy_book_rows
+        if cached is not None and cached[0] == generation:
+            return cached[1]
+        try:
+            count = self._get_read_connection().execute(
+                f"SELECT COUNT(*) FROM vector_metadata WHERE {self._LEGACY_BOOK_ROWS_WHERE}"
+            ).fetchone()[0]
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to count legacy book rows: {e}")
+            return 0
+        if count:
+            logger.warning(
+                f"Vector store has {count} legacy book rows without page info; "
+                "re-run populate_vector_db.py --books-only to replace them"
+            )
+        self._legacy_book_rows = (generation, count)
+        return count
+
+    def delete_legacy_book_rows(self) -> int:
+        """Eski biçimli kitap kayıtlarını sil (populate_vector_db yenilerini eklemeden önce)"""
+        try:
+            with sqlite3.connect(self.sqlite_db) as conn:
+                source_ids = [row[0] for row in conn.execute(
+                    f"SELECT DISTINCT source_id FROM vector_metadata WHERE {self._LEGACY_BOOK_ROWS_WHERE}"
+                )]
+        except sqlite3.Error as e:
+            logger.error(f"Failed to list legacy book rows: {e}")
+            return 0
+        return sum(self.delete_by_source("book", source_id) for source_id in source_ids)
+
     def get_stats(self) -> Dict[str, Any]:
         """
         Vektör veritabanı istatistikleri
@@ -455,7 +1562,15 @@ class VectorDatabase:
             
             return {
                 'total_vectors': total_vectors,
-                'faiss_total': self.index.ntotal,
+                'faiss_total': self._total_vectors(),
+                'main_vectors': self.index.ntotal,
+                'delta_vectors': self.delta_index.ntotal,
+                'deleted_vectors': self._dead_count,
+                'generation': self.get_generation(),
+                'index_backend': detect_backend(self.index),
+                'index_mmap': self.index_readonly,
+                'query_embedding_cache': self.query_cache.stats(),
+                'configured_backend': self.index_type,
                 'dimension': self.dimension,
                 'model_name': self.model_name,
                 'source_distribution': source_distribution,
@@ -469,48 +1584,176 @@ class VectorDatabase:
             return {}
     
     def save_index(self):
-        """FAISS index'i diske kaydet"""
+        """
+        FAISS index'i diske kaydet (bekleyen delta segment birleştirilir).
+        CLI yazıcıları çıkmadan önce çağırır: arka plan zamanlayıcısı daemon thread'dir
+        ve süreç çıkarken çalışmaz, bu yüzden sıkıştırma burada eşzamanlı yapılır.
+        """
+        with self._timer_lock:
+            if self._compaction_timer is not None:
+                self._compaction_timer.cancel()
+                self._compaction_timer = None
         try:
-            faiss.write_index(self.index, str(self.index_file))
+            self.compact(force_write=True)
             logger.debug("FAISS index saved")
         except Exception as e:
             logger.error(f"Failed to save FAISS index: {e}")
     
-    def rebuild_index(self):
+    @staticmethod
+    def _trainable_backend(backend: str, n_vectors: int) -> str:
+        """Küçük korpusta eğitim anlamsız: eşiğin altında IVF yerine Flat kullan"""
+        if n_vectors < VECTOR_INDEX_TRAIN_THRESHOLD and backend in ("ivf_flat", "ivf_pq"):
+            logger.info(f"Corpus below training threshold ({n_vectors}), using flat index")
+            return "flat"
+        return backend
+    
+    def _renumber_vector_ids(self, cursor, old_ids) -> int:
+        """
+        Artan sıradaki eski vector_id'leri 0..n-1 olarak yeniden numarala (çağıranın transaction'ında).
+        Artan sırada yeniden numaralandırma çakışmaz: yeni id <= eski id.
+        Generation artar, böylece diğer worker'lar yeni id'leri görmek için görünümlerini yeniler.
+        
+        Returns:
+            Yeni generation
+        """
+        cursor.executemany(
+            "UPDATE vector_metadata SET vector_id = ? WHERE vector_id = ?",
+            [(new_id, int(old_id)) for new_id, old_id in enumerate(old_ids) if new_id != int(old_id)]
+        )
+        return self._bump_generation(cursor)
+    
+    def rebuild_index(self, backend: Optional[str] = None):
         """
         Index'i sıfırdan yeniden oluştur (metadata'dan)
+        
+        Args:
+            backend: flat | ivf_flat | ivf_pq | hnsw (None ise VECTOR_INDEX_TYPE)
         """
-        try:
-            logger.info("Rebuilding FAISS index from metadata")
-            
-            # Yeni index oluştur
-            new_index = faiss.IndexFlatL2(self.dimension)
+        with self._write_lock, self._store_lock():
+            try:
+                backend = (backend or self.index_type).lower()
+                logger.info(f"Rebuilding FAISS index ({backend})")
+                
+                # Önce bekleyen delta'yı ana index'e al
+                self.compact()
+                
+                # Mümkünse mevcut vektörleri kullan (vector_id = sıra numarası korunur)
+                vectors = self._collect_vectors()
+                if vectors is not None:
+                    new_index = train_and_fill_index(vectors, self._trainable_backend(backend, len(vectors)), self.dimension)
+                    self._write_index(new_index)
+                    generation = self._synced_generation
+                else:
+                    # Metadata'dan yeniden encode: silinmiş kayıtların yeri boş kalmadığı için
+                    # vector_id'ler yeni index'teki sırayla (0..n-1) yeniden numaralanır
+                    conn = sqlite3.connect(self.sqlite_db)
+                    try:
+                        rows = conn.execute("""
+                            SELECT vector_id, content FROM vector_metadata 
+                            WHERE vector_id >= 0 
+                            ORDER BY vector_id
+                        """).fetchall()
+                        if rows:
+                            vectors = self.model.encode([content for _, content in rows], convert_to_numpy=True).astype('float32')
+                        else:
+                            vectors = np.zeros((0, self.dimension), dtype='float32')
+                        new_index = train_and_fill_index(vectors, self._trainable_backend(backend, len(vectors)), self.dimension)
+                        generation = self._renumber_vector_ids(conn.cursor(), [vid for vid, _ in rows])
+                        self._write_index(new_index)
+                        conn.commit()
+                    except Exception:
+                        conn.rollback()
+                        raise
+                    finally:
+                        conn.close()
+                
+                # Eski index'i değiştir
+                with self._segment_lock:
+                    self.index = new_index
+                    self.index_readonly = False
+                    self.delta_index = faiss.IndexFlatL2(self.dimension)
+                    self.delta_base = new_index.ntotal
+                self._index_stat = self._index_file_stat()
+                self._load_id_masks()
+                self._invalidate_metadata_cache()
+                self._synced_generation = generation
+                
+                logger.info(f"Index rebuilt with {self.index.ntotal} vectors")
+                
+            except Exception as e:
+                logger.error(f"Failed to rebuild index: {e}")
+    
+    def purge_deleted(self) -> int:
+        """
+        Tombstone'lu vektörleri fiziksel olarak sil: index'i yalnızca canlı
+        vektörlerle yeniden kur ve vector_id'leri 0..n-1 olarak yeniden numarala.
+        
+        Not: vector_id'ler değiştiği için bu komut bakım penceresinde çalıştırılmalıdır;
+        diğer worker'lar generation değişince yeni index'i ve id'leri yükler.
+        
+        Returns:
+            Silinen vektör sayısı
+        """
+        with self._write_lock, self._store_lock():
+            # Önce bekleyen delta'yı ana index'e al
+            self.compact()
             
-            # Metadata'dan tüm belgeleri al
+            total = self.index.ntotal
             conn = sqlite3.connect(self.sqlite_db)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT content FROM vector_metadata 
-                ORDER BY vector_id
-            """)
-            
-            contents = [row[0] for row in cursor.fetchall()]
-            conn.close()
-            
-            if contents:
-                # Embeddings oluştur ve ekle
-                embeddings = self.model.encode(contents, convert_to_numpy=True)
-                new_index.add(embeddings.astype('float32'))
+            try:
+                rows = conn.execute("""
+                    SELECT vector_id, content FROM vector_metadata 
+                    WHERE vector_id IS NOT NULL 
+                    ORDER BY vector_id
+                """).fetchall()
+                alive = [(vid, content) for vid, content in rows if 0 <= vid < total]
+                purged = total - len(alive)
+                orphan_rows = len(rows) - len(alive)
+                if not purged and not orphan_rows:
+                    logger.info("No deleted vectors to purge")
+                    return 0
+                
+                alive_ids = np.asarray([vid for vid, _ in alive], dtype='int64')
+                vectors = self._collect_vectors()
+                if vectors is not None:
+                    vectors = vectors[alive_ids]
+                elif alive:
+                    vectors = self.model.encode([c for _, c in alive], convert_to_numpy=True).astype('float32')
+                else:
+                    vectors = np.zeros((0, self.dimension), dtype='float32')
+                
+                backend = self._trainable_backend(detect_backend(self.index), len(vectors))
+                new_index = self._maybe_train_index(train_and_fill_index(vectors, backend, self.dimension))
+                apply_search_params(new_index)
+                
+                conn.execute("DELETE FROM vector_metadata WHERE vector_id >= ? OR vector_id < 0", (total,))
+                generation = self._renumber_vector_ids(conn.cursor(), alive_ids)
+                self._write_index(new_index)
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Failed to purge deleted vectors: {e}")
+                return 0
+            finally:
+                conn.close()
             
-            # Eski index'i değiştir
-            self.index = new_index
-            self.save_index()
+            readonly = False
+            if VECTOR_INDEX_MMAP:
+                new_index, readonly = read_index(self.index_file)
+                apply_search_params(new_index)
             
-            logger.info(f"Index rebuilt with {self.index.ntotal} vectors")
+            with self._segment_lock:
+                self.index = new_index
+                self.index_readonly = readonly
+                self.delta_index = faiss.IndexFlatL2(self.dimension)
+                self.delta_base = new_index.ntotal
+            self._index_stat = self._index_file_stat()
+            self._load_id_masks()
+            self._invalidate_metadata_cache()
+            self._synced_generation = generation
             
-        except Exception as e:
-            logger.error(f"Failed to rebuild index: {e}")
+            logger.info(f"Purged {purged} deleted vectors ({new_index.ntotal} remaining)")
+            return purged
 
 # Global instance
 _vector_db = None
@@ -14,7 +14,7 @@ echo "Starting server immediately for Railway health checks..."
     echo "Background: Index download finished."
     
     # Eğer indeks indirilemezse, yeni indeks oluştur
-    if [ ! -f "data/whoosh_index/_MAIN_1.toc" ]; then
+    if ! ls data/whoosh_index/_MAIN_*.toc >/dev/null 2>&1; then
         echo "Background: Pre-built index not found, creating new index..."
         python create_index.py
         echo "Background: New index creation finished."
@@ -6,32 +6,48 @@ import io
 import json
 import re
 import asyncio
+import functools
+import gc
+import secrets
 import urllib.parse
+from email.utils import formatdate, parsedate_to_datetime
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Dict, List, Literal, Optional
 import tempfile
 import time
-import fitz
 import requests
 import yt_dlp
 from openai import AsyncOpenAI
 from dotenv import load_dotenv
 import httpx
-from fastapi.responses import StreamingResponse
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from data.audio_db import get_all_audio_by_source, search_audio_chapters
 from data.audio_db import get_audio_path_by_id
 from data.audio_db import init_db as init_audio_db
+from data.audio_db import DB_PATH as AUDIO_DB_PATH
+from data.youtube_cache_db import DB_PATH as YOUTUBE_CACHE_DB_PATH
 from data.vector_db import get_vector_db, init_vector_db
-from fastapi import FastAPI, HTTPException, Query, Depends, BackgroundTasks, Response
+from data.answer_cache import get_answer_cache
+from data.query_cache import get_query_cache, file_version
+from fastapi import FastAPI, HTTPException, Query, Depends, BackgroundTasks, Response, Request, Header
 # CORS middleware import removed
 from fastapi.responses import JSONResponse
 from whoosh.index import open_dir, Index
 from whoosh.qparser import MultifieldParser, AndGroup, QueryParser
 from whoosh.searching import Searcher
+from whoosh.query import Or, Term
+from search_index import get_searcher_pool
+from spelling_index import get_spelling_index, SPELLING_MIN_DOC_FREQ
+from pdf_service import (
+    get_pdf_cache, get_document_pool, get_page_cache, get_page_prefetcher, PDF_DOWNLOAD_TIMEOUT,
+    PAGE_IMAGE_MIN_DPI, PAGE_IMAGE_MAX_DPI, PAGE_IMAGE_MAX_WIDTH
+)
 from data.db import init_db, update_task, get_task, get_all_completed_analyses, save_ai_chat, get_ai_chat_by_slug, get_recent_ai_chats
 from data.articles_db import get_all_articles_by_category, get_article_by_id
 from data.articles_db import init_db as init_articles_db
 from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
 from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled, NoTranscriptFound, CouldNotRetrieveTranscript
 # Deepgram SDK (birincil transkripsiyon)
 from deepgram import DeepgramClient, PrerecordedOptions
@@ -70,8 +86,16 @@ from contextlib import asynccontextmanager
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    # gunicorn --preload: model ve mmap'li index master'da yüklendi. Worker'da ilk iş olarak
+    # devralınan nesneleri GC takibinden çıkar; GC taramaları bu sayfalara yazmaz ve
+    # copy-on-write ile paylaşılmaya devam ederler. Modül import'unda (test/script) çalışmaz.
+    gc.freeze()
     app.state.httpx_client = httpx.AsyncClient(trust_env=False)
     logger.info("httpx client başlatıldı.")
+    # Sohbet RAG aramaları için sınırlı thread havuzu (worker başına)
+    app.state.retrieval_executor = ThreadPoolExecutor(
+        max_workers=RETRIEVAL_MAX_WORKERS, thread_name_prefix="retrieval"
+    )
     
     # Veritabanlarını başlat
     try:
@@ -88,6 +112,8 @@ async def lifespan(app: FastAPI):
     # Shutdown
     await app.state.httpx_client.aclose()
     logger.info("httpx client kapatıldı.")
+    app.state.retrieval_executor.shutdown(wait=False, cancel_futures=True)
+    get_searcher_pool(INDEX_DIR).close()
 
 app = FastAPI(
     title="Mihmandar İlim Havuzu API",
@@ -100,6 +126,16 @@ app = FastAPI(
 ARTICLES_CACHE = {"data": None, "timestamp": 0}
 BOOKS_CACHE = {"data": None, "timestamp": 0}
 
+# Arama sonuç önbelleği: endpoint başına TTL; index nesli ya da veritabanı dosyası
+# değişince kayıtlar kendiliğinden geçersiz olur
+query_cache = get_query_cache()
+query_cache.register("search_all", ttl=int(os.getenv("QUERY_CACHE_SEARCH_TTL", "600")),
+                     version=lambda: get_searcher_pool(INDEX_DIR).generation())
+query_cache.register("audio", ttl=int(os.getenv("QUERY_CACHE_AUDIO_TTL", "1800")),
+                     version=lambda: file_version(AUDIO_DB_PATH))
+query_cache.register("videos", ttl=int(os.getenv("QUERY_CACHE_VIDEOS_TTL", "900")),
+                     version=lambda: file_version(YOUTUBE_CACHE_DB_PATH))
+
 # Tekil global CORS middleware (herkese açık)
 @app.middleware("http")
 async def force_cors_headers(request, call_next):
@@ -179,15 +215,50 @@ except Exception:
     logger.exception("YouTube cache veritabanı init başarısız oldu")
 
 # --- Yardımcı Fonksiyonlar ---
-def get_whoosh_index():
+def get_whoosh_index() -> Index:
+    """Süreç boyunca paylaşılan Whoosh index handle'ı"""
     try:
-        return open_dir(str(INDEX_DIR))
+        return get_searcher_pool(INDEX_DIR).index
     except Exception as e:
         logger.error(f"Kritik Hata: Whoosh indeksi '{INDEX_DIR}' adresinde bulunamadı: {e}")
         raise HTTPException(status_code=503, detail="Arama servisi şu anda kullanılamıyor.")
 
-def get_searcher(ix: Index = Depends(get_whoosh_index)) -> Searcher:
-    return ix.searcher()
+def get_searcher() -> Searcher:
+    """Havuzdan searcher ödünç ver; istek bitince havuza geri döner"""
+    pool = get_searcher_pool(INDEX_DIR)
+    try:
+        searcher = pool.acquire()
+    except Exception as e:
+        logger.error(f"Kritik Hata: Whoosh indeksi '{INDEX_DIR}' adresinde bulunamadı: {e}")
+        raise HTTPException(status_code=503, detail="Arama servisi şu anda kullanılamıyor.")
+    try:
+        yield searcher
+    finally:
+        pool.release(searcher)
+
+def conditional_response(request: Request, body: bytes, etag: str, last_modified: float,
+                         media_type: str, cache_control: str = "no-cache") -> Response:
+    """
+    ETag / Last-Modified başlıklarıyla yanıt döndür; istemcideki kopya
+    güncelse (If-None-Match / If-Modified-Since) gövdesiz 304 gönder.
+    """
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(last_modified, usegmt=True),
+        "Cache-Control": cache_control,
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+            return Response(status_code=304, headers=headers)
+    elif request.headers.get("if-modified-since"):
+        try:
+            since = parsedate_to_datetime(request.headers["if-modified-since"]).timestamp()
+            if int(last_modified) <= since:
+                return Response(status_code=304, headers=headers)
+        except (TypeError, ValueError):
+            pass
+    return Response(content=body, media_type=media_type, headers=headers)
 
 def format_time(seconds: float) -> str:
     minutes, seconds = divmod(int(seconds), 60)
@@ -562,34 +633,87 @@ async def start_analysis(background_tasks: BackgroundTasks, url: str = Query(...
     background_tasks.add_task(run_video_analysis, task_id, url)
     return JSONResponse(status_code=202, content={"task_id": task_id, "message": "Analiz başlatıldı."})
 # ... Diğer tüm endpointleriniz ...
+# /search/all sayfa boyutu sınırları; page verilmezse eski davranış (ilk 150 sonuç)
+SEARCH_ALL_LEGACY_LIMIT = 150
+SEARCH_PAGE_SIZE_MAX = 100
+SNIPPET_CHARS = 300
+
+def format_search_hit(hit, highlight: bool = True) -> Dict[str, Any]:
+    """Whoosh hit'ini API sonuç formatına çevir; highlight=False ise saklanan metnin başı döner"""
+    content = hit.get("content", "")
+    excerpt = (hit.highlights("content") if highlight else "") or content[:SNIPPET_CHARS]
+    if hit.get('type') == 'book':
+        return {
+            "type": "book", "kitap": hit["title"], "yazar": hit["author"],
+            "sayfa": hit["page_or_id"], "alinti": excerpt,
+            "pdf_dosyasi": hit["source"]
+        }
+    if hit.get('type') == 'article':
+        return {
+            "type": "article", "id": hit["page_or_id"], "baslik": hit["title"],
+            "yazar": hit["author"], "kategori": hit["category"], "url": hit["source"],
+            "alinti": excerpt
+        }
+    return None
+
+def spelling_suggestion(searcher: Searcher, q: str, max_suggestions: int = 5) -> Optional[Dict[str, Any]]:
+    """Yazım sözlüğünden öneriler; sözlük yoksa None"""
+    spelling = get_spelling_index(INDEX_DIR)
+    if spelling is None:
+        return None
+    reader = searcher.reader()
+    return spelling.suggest(
+        q, known_term=lambda term: reader.doc_frequency("content", term) >= SPELLING_MIN_DOC_FREQ,
+        max_suggestions=max_suggestions
+    )
+
+def parse_search_query(searcher: Searcher, q: str, authors: Optional[List[str]] = None):
+    parser = MultifieldParser(["title", "content", "author"], schema=searcher.schema, group=AndGroup)
+    query_parts = [f"({q.lower()})"]
+    if authors:
+        author_filter = " OR ".join([f'author:"{a.lower()}"' for a in authors])
+        query_parts.append(f"({author_filter})")
+    return parser.parse(" AND ".join(query_parts))
+
 @app.get("/search/all")
-async def search_all(q: str, authors: Optional[List[str]] = Query(None), searcher: Searcher = Depends(get_searcher)):
+async def search_all(
+    q: str,
+    authors: Optional[List[str]] = Query(None),
+    page: Optional[int] = Query(None, ge=1, description="Sayfa numarası (verilmezse ilk 150 sonuç)"),
+    page_size: int = Query(20, ge=1, le=SEARCH_PAGE_SIZE_MAX, description="Sayfa başına sonuç"),
+    highlight: bool = Query(True, description="False ise vurgulama yerine saklanan metin parçası döner"),
+    searcher: Searcher = Depends(get_searcher)
+):
     def _search():
-        parser = MultifieldParser(["title", "content", "author"], schema=searcher.schema, group=AndGroup)
-        query_parts = [f"({q.lower()})"]
-        if authors:
-            author_filter = " OR ".join([f'author:"{a.lower()}"' for a in authors])
-            query_parts.append(f"({author_filter})")
-        final_query_str = " AND ".join(query_parts)
-        parsed_query = parser.parse(final_query_str)
-        results = searcher.search(parsed_query, limit=150)
-        formatted_results = []
-        for hit in results:
-            result_type = hit.get('type')
-            if result_type == 'book':
-                formatted_results.append({
-                    "type": "book", "kitap": hit["title"], "yazar": hit["author"],
-                    "sayfa": hit["page_or_id"], "alinti": hit.highlights("content") or hit.get("content", "")[:300],
-                    "pdf_dosyasi": hit["source"]
-                })
-            elif result_type == 'article':
-                formatted_results.append({
-                    "type": "article", "id": hit["page_or_id"], "baslik": hit["title"],
-                    "yazar": hit["author"], "kategori": hit["category"], "url": hit["source"],
-                    "alinti": hit.highlights("content") or hit.get("content", "")[:300]
-                })
-        return {"sonuclar": formatted_results}
-    return await asyncio.to_thread(_search)
+        parsed_query = parse_search_query(searcher, q, authors)
+        if page is None:
+            results = searcher.search(parsed_query, limit=SEARCH_ALL_LEGACY_LIMIT)
+            response = {"sonuclar": [r for r in (format_search_hit(hit, highlight) for hit in results) if r]}
+            if not response["sonuclar"]:
+                # Sonuç yoksa "bunu mu demek istediniz" önerisi
+                suggestion = spelling_suggestion(searcher, q)
+                if suggestion and suggestion["corrected_query"]:
+                    response["oneri"] = suggestion["corrected_query"]
+            return response
+
+        # search_page gibi ilk page*page_size sonucu skorla, ama son sayfadan sonrası boş döner
+        # (search_page son sayfayı tekrar ederdi). Vurgulama yalnızca bu sayfanın sonuçlarına yapılır.
+        results = searcher.search(parsed_query, limit=page * page_size)
+        page_hits = results[(page - 1) * page_size:page * page_size]
+        total = len(results)
+        total_pages = (total + page_size - 1) // page_size
+        return {
+            "sonuclar": [r for r in (format_search_hit(hit, highlight) for hit in page_hits) if r],
+            "page": page,
+            "page_size": page_size,
+            "total": total,
+            "total_pages": total_pages,
+            "has_next": page < total_pages
+        }
+    return await query_cache.get_or_compute(
+        "search_all", q, lambda: asyncio.to_thread(_search),
+        authors=authors or [], page=page, page_size=page_size, highlight=highlight
+    )
 @app.get("/articles/by-category")
 async def list_articles_by_category():
     now = time.time()
@@ -640,11 +764,17 @@ async def get_articles_paginated(
         logger.error(f"Sayfalanmış makaleler alınırken hata: {e}")
         raise HTTPException(status_code=500, detail="Makaleler alınamadı")
 @app.get("/authors")
-async def get_all_authors(searcher: Searcher = Depends(get_searcher)):
-    def _get_authors():
-        all_authors = {f['author'].title() for f in searcher.all_stored_fields() if 'author' in f and f['author']}
-        return {"authors": sorted(list(all_authors))}
-    return await asyncio.to_thread(_get_authors)
+async def get_all_authors(request: Request):
+    # Yazar listesi index nesli başına bir kez hesaplanır, bellekten sunulur
+    try:
+        facet = await asyncio.to_thread(get_searcher_pool(INDEX_DIR).author_facet)
+    except Exception as e:
+        logger.error(f"Yazar listesi alınamadı: {e}")
+        raise HTTPException(status_code=503, detail="Arama servisi şu anda kullanılamıyor.")
+    return conditional_response(
+        request, facet["body"], facet["etag"], facet["last_modified"],
+        media_type="application/json", cache_control="public, max-age=300"
+    )
 @app.get("/books_by_author")
 async def get_books_by_author():
     now = time.time()
@@ -701,46 +831,42 @@ async def search_analyses(q: str, response: Response):
                 "thumbnail": data.get("thumbnail"), "chapters": chapters
             })
     return {"sonuclar": matching_analyses}
+
+def resolve_pdf_path(pdf_file: str) -> Path:
+    """PDF'in yerel yolu: PDF_DIR'deki dosya ya da Backblaze'den indirilen önbellek kopyası"""
+    try:
+        return get_pdf_cache().get(urllib.parse.unquote(pdf_file))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="PDF bulunamadı.")
+    except requests.exceptions.RequestException as e:
+        logger.error(f"PDF indirilemedi {pdf_file}: {e}")
+        raise HTTPException(status_code=502, detail="PDF indirilemedi.")
+
 @app.get("/pdf/info")
 async def get_pdf_info(pdf_file: str):
+    def _info():
+        pdf_path = resolve_pdf_path(pdf_file)
+        with get_document_pool().document(pdf_path) as doc:
+            return {"total_pages": len(doc)}
     try:
-        # Önce yerel PDF'i kontrol et
-        pdf_path = PDF_DIR / urllib.parse.unquote(pdf_file)
-        
-        if pdf_path.is_file():
-            # Yerel PDF varsa onu kullan
-            with fitz.open(pdf_path) as doc: 
-                return {"total_pages": len(doc)}
-        
-        elif PDF_BASE_URL:
-            # Yerel PDF yoksa Backblaze'den indir
-            import tempfile
-            import requests
-            
-            pdf_url = f"{PDF_BASE_URL}/{urllib.parse.unquote(pdf_file)}"
-            logger.info(f"PDF bilgisi için Backblaze'den indiriliyor: {pdf_url}")
-            
-            response = requests.get(pdf_url, timeout=30)
-            response.raise_for_status()
-            
-            # Geçici dosya oluştur
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-            temp_file.write(response.content)
-            temp_file.close()
-            
-            try:
-                with fitz.open(temp_file.name) as doc:
-                    return {"total_pages": len(doc)}
-            finally:
-                # Geçici dosyayı sil
-                if os.path.exists(temp_file.name):
-                    os.unlink(temp_file.name)
-        else:
-            raise HTTPException(status_code=404, detail=f"PDF bulunamadı ve PDF_BASE_URL ayarlanmamış.")
-            
+        return await asyncio.to_thread(_info)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"PDF bilgisi alınırken hata: {e}")
         raise HTTPException(status_code=500, detail="PDF bilgisi alınamadı.")
+
+@app.get("/pdf/cache-stats")
+async def get_pdf_cache_stats():
+    """Backblaze PDF disk önbelleği, açık belge havuzu, sayfa görüntüsü önbelleği ve ön yükleme metrikleri"""
+    return {
+        "status": "success",
+        "stats": await asyncio.to_thread(get_pdf_cache().stats),
+        "documents": get_document_pool().stats(),
+        "pages": get_page_cache().stats(),
+        "prefetch": get_page_prefetcher().stats(),
+    }
+
 @app.get("/books/list")
 async def get_all_books():
     """Tüm kitapları PDF URL'leri ile birlikte listeler"""
@@ -776,113 +902,106 @@ async def get_all_books():
         logger.error(f"Kitap listesi alınırken hata: {e}")
         raise HTTPException(status_code=500, detail="Kitap listesi alınamadı.")
 
+# /pdf/access için CDN'e iletilen istek başlıkları ve istemciye geri iletilen yanıt başlıkları
+PDF_PROXY_REQUEST_HEADERS = ("range", "if-range", "if-none-match", "if-modified-since")
+PDF_PROXY_RESPONSE_HEADERS = (
+    "content-length", "content-range", "content-encoding", "accept-ranges", "etag", "last-modified",
+)
+
 @app.get("/pdf/access")
-async def access_pdf_from_backblaze(pdf_file: str):
-    """PDF dosyasına Backblaze'den doğrudan erişim sağlar"""
+async def access_pdf_from_backblaze(request: Request, pdf_file: str):
+    """
+    PDF dosyasına erişim: yerel kopya (PDF_DIR ya da disk önbelleği) varsa Range
+    destekli olarak diskten, yoksa Backblaze'den parça parça akıtılarak sunulur.
+    Range başlıkları iletilir (206), böylece PDF.js gibi görüntüleyiciler yalnızca
+    gereken bölümleri indirir.
+    """
+    name = urllib.parse.unquote(pdf_file)
+    content_disposition = f"inline; filename*=UTF-8''{urllib.parse.quote(name, safe='')}"
+    try:
+        local_path = await asyncio.to_thread(get_pdf_cache().local_copy, name)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="PDF bulunamadı.")
+    if local_path is not None:
+        # FileResponse Range / If-Range / If-None-Match isteklerini kendisi yanıtlar
+        return FileResponse(
+            local_path, media_type="application/pdf",
+            headers={"Content-Disposition": content_disposition, "Cache-Control": "public, max-age=3600"},
+        )
+
     if not PDF_BASE_URL:
         raise HTTPException(status_code=404, detail="PDF_BASE_URL ayarlanmamış.")
-    
+
+    pdf_url = f"{PDF_BASE_URL}/{urllib.parse.quote(name)}"
+    client: httpx.AsyncClient = app.state.httpx_client
+    upstream_headers = {h: request.headers[h] for h in PDF_PROXY_REQUEST_HEADERS if h in request.headers}
+    upstream_request = client.build_request(
+        "GET", pdf_url, headers=upstream_headers,
+        timeout=httpx.Timeout(PDF_DOWNLOAD_TIMEOUT, connect=10.0),
+    )
     try:
-        pdf_url = f"{PDF_BASE_URL}/{urllib.parse.unquote(pdf_file)}"
-        logger.info(f"PDF erişimi için Backblaze'den indiriliyor: {pdf_url}")
-        
-        # PDF'i Backblaze'den indir
-        response = requests.get(pdf_url, timeout=30)
-        response.raise_for_status()
-        
-        # PDF içeriğini döndür
-        return Response(
-            content=response.content,
-            media_type="application/pdf",
-            headers={"Content-Disposition": f"inline; filename={pdf_file}"}
-        )
-        
-    except requests.exceptions.RequestException as e:
+        upstream = await client.send(upstream_request, stream=True)
+    except httpx.HTTPError as e:
         logger.error(f"PDF indirilemedi {pdf_file}: {e}")
-        raise HTTPException(status_code=404, detail="PDF bulunamadı veya erişilemedi.")
-    except Exception as e:
-        logger.error(f"PDF erişiminde hata: {e}")
-        raise HTTPException(status_code=500, detail="PDF erişiminde hata oluştu.")
+        raise HTTPException(status_code=502, detail="PDF bulunamadı veya erişilemedi.")
+
+    if upstream.status_code >= 400 and upstream.status_code != 416:
+        await upstream.aclose()
+        logger.error(f"PDF erişimi başarısız {pdf_url}: {upstream.status_code}")
+        if upstream.status_code == 404:
+            raise HTTPException(status_code=404, detail="PDF bulunamadı veya erişilemedi.")
+        raise HTTPException(status_code=502, detail="PDF bulunamadı veya erişilemedi.")
+
+    headers = {h: upstream.headers[h] for h in PDF_PROXY_RESPONSE_HEADERS if h in upstream.headers}
+    headers.setdefault("accept-ranges", "bytes")
+    headers["content-disposition"] = content_disposition
+    # Gövde bellekte biriktirilmeden istemciye akıtılır (200, 206, 304 ya da 416)
+    return StreamingResponse(
+        upstream.aiter_raw(), status_code=upstream.status_code, media_type="application/pdf",
+        headers=headers, background=BackgroundTask(upstream.aclose),
+    )
 
 @app.get("/pdf/page_image")
-def get_page_image(pdf_file: str, page_num: int = Query(..., gt=0)):
+def get_page_image(
+    request: Request,
+    pdf_file: str,
+    page_num: int = Query(..., gt=0),
+    dpi: Optional[int] = Query(None, ge=PAGE_IMAGE_MIN_DPI, le=PAGE_IMAGE_MAX_DPI, description="Çözünürlük (varsayılan 150)"),
+    width: Optional[int] = Query(None, gt=0, le=PAGE_IMAGE_MAX_WIDTH, description="Piksel genişlik (dpi yerine)"),
+    fmt: Literal["png", "jpeg", "webp"] = Query("png", alias="format", description="Görüntü formatı"),
+):
+    # Kitap sayfaları değişmez: render edilen görüntüler diskte saklanır, istemci de
+    # süresiz önbelleğe alabilir (anahtar PDF sürümünü içerir)
     try:
-        # Önce yerel PDF'i kontrol et
-        pdf_path = PDF_DIR / urllib.parse.unquote(pdf_file)
-        
-        if pdf_path.is_file():
-            # Yerel PDF varsa onu kullan
-            with fitz.open(pdf_path) as doc:
-                if not (0 < page_num <= len(doc)): raise HTTPException(status_code=400, detail="Geçersiz sayfa.")
-                page = doc.load_page(page_num - 1)
-                pix = page.get_pixmap(dpi=150)
-                return StreamingResponse(io.BytesIO(pix.tobytes("png")), media_type="image/png")
-        
-        elif PDF_BASE_URL:
-            # Yerel PDF yoksa Backblaze'den indir
-            import tempfile
-            import requests
-            
-            pdf_url = f"{PDF_BASE_URL}/{urllib.parse.unquote(pdf_file)}"
-            logger.info(f"PDF Backblaze'den indiriliyor: {pdf_url}")
-            
-            response = requests.get(pdf_url, timeout=30)
-            response.raise_for_status()
-            
-            # Geçici dosya oluştur
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-            temp_file.write(response.content)
-            temp_file.close()
-            
-            try:
-                with fitz.open(temp_file.name) as doc:
-                    if not (0 < page_num <= len(doc)): raise HTTPException(status_code=400, detail="Geçersiz sayfa.")
-                    page = doc.load_page(page_num - 1)
-                    pix = page.get_pixmap(dpi=150)
-                    return StreamingResponse(io.BytesIO(pix.tobytes("png")), media_type="image/png")
-            finally:
-                # Geçici dosyayı sil
-                if os.path.exists(temp_file.name):
-                    os.unlink(temp_file.name)
-        else:
-            raise HTTPException(status_code=404, detail=f"PDF bulunamadı ve PDF_BASE_URL ayarlanmamış.")
-            
+        pdf_path = resolve_pdf_path(pdf_file)
+        image = get_page_cache().get(pdf_path, page_num, dpi=dpi, width=width, fmt=fmt)
+    except HTTPException:
+        raise
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Geçersiz sayfa.")
     except Exception as e:
         logger.error(f"PDF sayfa resmi işlenirken hata: {e}")
         raise HTTPException(status_code=500, detail="Sayfa resmi işlenirken hata oluştu.")
+    # Okuyucu büyük olasılıkla sonraki sayfaya geçecek: arka planda hazırla
+    prefetcher = get_page_prefetcher()
+    prefetcher.record_request(image["key"])
+    client = request.headers.get("x-forwarded-for", request.client.host if request.client else "")
+    prefetcher.schedule((client, pdf_path.name, fmt), pdf_path, page_num, dpi=dpi, width=width, fmt=fmt)
+    return conditional_response(
+        request, image["body"], image["etag"], image["last_modified"],
+        media_type=image["media_type"], cache_control="public, max-age=31536000, immutable"
+    )
 
 @app.get("/pdf/page_text")
 def get_page_text(pdf_file: str, page_num: int = Query(..., gt=0)):
     """Belirtilen PDF sayfasının düz metnini döndürür."""
     try:
-        import tempfile, requests
-        # Önce yerel PDF
-        pdf_path = PDF_DIR / urllib.parse.unquote(pdf_file)
-        if pdf_path.is_file():
-            with fitz.open(pdf_path) as doc:
-                if not (0 < page_num <= len(doc)):
-                    raise HTTPException(status_code=400, detail="Geçersiz sayfa.")
-                page = doc.load_page(page_num - 1)
-                return {"text": page.get_text("text") or ""}
-        # Backblaze
-        if not PDF_BASE_URL:
-            raise HTTPException(status_code=404, detail="PDF bulunamadı.")
-        pdf_url = f"{PDF_BASE_URL}/{urllib.parse.unquote(pdf_file)}"
-        resp = requests.get(pdf_url, timeout=30)
-        resp.raise_for_status()
-        tmp = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-        tmp.write(resp.content); tmp.close()
-        try:
-            with fitz.open(tmp.name) as doc:
-                if not (0 < page_num <= len(doc)):
-                    raise HTTPException(status_code=400, detail="Geçersiz sayfa.")
-                page = doc.load_page(page_num - 1)
-                return {"text": page.get_text("text") or ""}
-        finally:
-            try:
-                os.unlink(tmp.name)
-            except Exception:
-                pass
+        pdf_path = resolve_pdf_path(pdf_file)
+        with get_document_pool().document(pdf_path) as doc:
+            if not (0 < page_num <= len(doc)):
+                raise HTTPException(status_code=400, detail="Geçersiz sayfa.")
+            page = doc.load_page(page_num - 1)
+            return {"text": page.get_text("text") or ""}
     except HTTPException:
         raise
     except Exception as e:
@@ -891,6 +1010,14 @@ def get_page_text(pdf_file: str, page_num: int = Query(..., gt=0)):
 @app.get("/search/videos")
 async def search_videos(q: str, channel: str = ""):
     """YouTube video arama - Cache'den hızlı arama"""
+    # Boş sonuçlar (hata ya da fallback başarısızlığı) önbelleğe alınmaz
+    return await query_cache.get_or_compute(
+        "videos", q, lambda: asyncio.to_thread(_search_videos, q, channel),
+        cache_if=lambda result: bool(result["sonuclar"]), channel=channel
+    )
+
+def _search_videos(q: str, channel: str):
+    """Video araması: önce YouTube cache veritabanı, sonuç yoksa yt-dlp fallback"""
     try:
         from data.youtube_cache_db import search_videos as search_cache_videos
         
@@ -936,6 +1063,32 @@ async def search_videos(q: str, channel: str = ""):
         logger.error(f"Video arama hatası: {e}")
         return {"sonuclar": []}
 
+@app.get("/search/cache-stats")
+async def get_search_cache_stats():
+    """Arama sonuç önbelleği metrikleri (endpoint başına isabet/ıska)"""
+    return {"status": "success", "stats": query_cache.stats()}
+
+# Yönetim endpoint'leri için anahtar; tanımlı değilse bu endpoint'ler kapalıdır
+ADMIN_API_KEY = os.getenv("ADMIN_API_KEY")
+
+def require_admin(x_admin_key: Optional[str] = Header(None)):
+    """X-Admin-Key başlığını ADMIN_API_KEY ile doğrula"""
+    if not ADMIN_API_KEY:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_API_KEY is not set)")
+    if not x_admin_key or not secrets.compare_digest(x_admin_key.encode(), ADMIN_API_KEY.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin key")
+
+@app.post("/search/cache/invalidate", dependencies=[Depends(require_admin)])
+async def invalidate_search_cache(namespace: Optional[str] = Query(None, description="search_all, audio, videos")):
+    """
+    Index ya da veritabanı yenilendikten sonra önbelleği geçersiz kıl (tüm worker'lar).
+    Namespace epoch'u yenilenir; diğer worker'lar kayıtlarını bir sonraki okumada atar.
+    """
+    if namespace is not None and namespace not in query_cache.namespaces():
+        raise HTTPException(status_code=400, detail=f"Unknown cache namespace: {namespace}")
+    removed = query_cache.invalidate(namespace)
+    return {"status": "success", "removed": removed}
+
 @app.get("/youtube/cache/stats")
 async def get_youtube_cache_stats():
     """YouTube cache istatistiklerini getir"""
@@ -1024,8 +1177,9 @@ async def stream_audio_from_b2(file_name: str):
 @app.get("/search/audio")
 async def search_audio(q: str):
     """Konu başlıkları içinde metinsel arama yapar."""
-    results = await asyncio.to_thread(search_audio_chapters, q)
-    return {"sonuclar": results}
+    async def _search():
+        return {"sonuclar": await asyncio.to_thread(search_audio_chapters, q)}
+    return await query_cache.get_or_compute("audio", q, _search)
 # *** BU ENDPOINT'İ ESKİSİYLE DEĞİŞTİRİN ***
 @app.get("/audio/stream/{audio_id}")
 async def stream_audio_file_by_id(audio_id: int):
@@ -1524,6 +1678,80 @@ class ChatResponse(BaseModel):
     confidence: float = 0.0
     processing_time: float = 0.0
 
+CHAT_SYSTEM_PROMPT = """
+Sen Mihmandar Asistanı'sın. Tasavvuf, İslami ilimler ve manevi konularda uzman bir danışmansın.
+
+Görevin:
+1. Kullanıcının sorularını anlayıp, verilen kaynaklardan yararlanarak kapsamlı cevaplar vermek
+2. Cevaplarını Türkçe, saygılı ve bilge bir üslupla sunmak
+3. Kaynaklara atıf yapmak ve güvenilir bilgiler vermek
+4. Manevi rehberlik yaparken İslami değerlere uygun davranmak
+
+Kurallar:
+- Sadece verilen kaynaklardaki bilgileri kullan
+- Kaynak belirtmeden bilgi verme
+- Kısa ve öz cevaplar yerine, doyurucu açıklamalar yap
+- Konuyu aydınlatan, öğretici bir yaklaşım benimse
+"""
+
+def build_advanced_system_prompt(source_count: int, used_vector_search: bool) -> str:
+    """Gelişmiş sohbet için system prompt"""
+    return f"""
+Sen Mihmandar Asistanı'sın. Tasavvuf, İslami ilimler ve manevi konularda uzman bir danışmansın.
+
+Görevin:
+1. Kullanıcının sorularını derinlemesine anlayıp, verilen kaynaklardan yararlanarak kapsamlı cevaplar vermek
+2. Cevaplarını Türkçe, saygılı ve bilge bir üslupla sunmak
+3. Kaynaklara net atıflar yapmak ([1], [2] şeklinde)
+4. Manevi rehberlik yaparken İslami değerlere uygun davranmak
+5. Kullanıcıyı daha derin araştırmaya teşvik etmek
+
+Kurallar:
+- Sadece verilen kaynaklardaki bilgileri kullan
+- Her bilgi için kaynak numarası belirt
+- Kısa cevaplar yerine, konuyu aydınlatan detaylı açıklamalar yap
+- Eğer kaynaklarda yeterli bilgi yoksa, bunu açıkça belirt
+- Kullanıcıyı ilgili sayfalara yönlendir
+
+Kaynak sayısı: {source_count}
+Arama yöntemi: {'Vektör tabanlı anlamsal arama' if used_vector_search else 'Geleneksel arama'}
+"""
+
+def build_chat_messages(system_prompt: str, user_message: str, relevant_sources: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """DeepSeek için system + kaynaklı kullanıcı mesajlarını oluştur"""
+    context_text = build_context_from_sources(relevant_sources)
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": f"Kaynak bilgiler:\n{context_text}\n\nSoru: {user_message}"}
+    ]
+
+def sources_for_save(relevant_sources: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """save_ai_chat için kaynakların özet alanları"""
+    return [{
+        "id": src.get("id"),
+        "title": src.get("title"),
+        "type": src.get("type"),
+        "author": src.get("author"),
+        "score": src.get("score")
+    } for src in relevant_sources]
+
+async def lookup_cached_answer(user_message: str, scope: str) -> Optional[Dict[str, Any]]:
+    """Benzer soru daha önce cevaplandıysa önbellekteki cevabı getir"""
+    answer_cache = get_answer_cache()
+    if not answer_cache:
+        return None
+    cached = await asyncio.to_thread(answer_cache.lookup, user_message, scope)
+    if cached:
+        logger.info(f"Answer cache hit (similarity {cached['similarity']:.3f}, saved {cached['llm_seconds']:.2f}s)")
+    return cached
+
+async def store_cached_answer(user_message: str, scope: str, answer: str, sources: List[Dict[str, Any]],
+                              confidence: float, llm_seconds: float):
+    """Yeni cevabı anlamsal önbelleğe yaz"""
+    answer_cache = get_answer_cache()
+    if answer_cache:
+        await asyncio.to_thread(answer_cache.store, user_message, answer, sources, confidence, llm_seconds, scope)
+
 @app.post("/chat/message", response_model=ChatResponse)
 async def chat_message(chat_request: ChatMessage):
     """
@@ -1540,35 +1768,25 @@ async def chat_message(chat_request: ChatMessage):
         if not user_message:
             raise HTTPException(status_code=400, detail="Mesaj boş olamaz")
         
+        # Benzer soru daha önce cevaplandıysa DeepSeek'i çağırma
+        cached = await lookup_cached_answer(user_message, "message")
+        if cached:
+            return ChatResponse(
+                response=cached["answer"],
+                sources=cached["sources"],
+                session_id=chat_request.session_id,
+                confidence=cached["confidence"],
+                processing_time=time.time() - start_time
+            )
+        
         # RAG sistemi ile ilgili kaynakları ara
         relevant_sources = await search_relevant_content(user_message)
         
         # DeepSeek için context oluştur
-        context_text = build_context_from_sources(relevant_sources)
-        
-        # DeepSeek API çağrısı
-        system_prompt = """
-Sen Mihmandar Asistanı'sın. Tasavvuf, İslami ilimler ve manevi konularda uzman bir danışmansın.
-
-Görevin:
-1. Kullanıcının sorularını anlayıp, verilen kaynaklardan yararlanarak kapsamlı cevaplar vermek
-2. Cevaplarını Türkçe, saygılı ve bilge bir üslupla sunmak
-3. Kaynaklara atıf yapmak ve güvenilir bilgiler vermek
-4. Manevi rehberlik yaparken İslami değerlere uygun davranmak
-
-Kurallar:
-- Sadece verilen kaynaklardaki bilgileri kullan
-- Kaynak belirtmeden bilgi verme
-- Kısa ve öz cevaplar yerine, doyurucu açıklamalar yap
-- Konuyu aydınlatan, öğretici bir yaklaşım benimse
-"""
-        
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": f"Kaynak bilgiler:\n{context_text}\n\nSoru: {user_message}"}
-        ]
+        messages = build_chat_messages(CHAT_SYSTEM_PROMPT, user_message, relevant_sources)
         
         # DeepSeek API çağrısı
+        llm_start = time.time()
         response = await deepseek_client.chat.completions.create(
             model="deepseek-chat",
             messages=messages,
@@ -1583,18 +1801,13 @@ Kurallar:
         
         # Confidence score hesapla (basit heuristik)
         confidence = calculate_response_confidence(assistant_response, relevant_sources)
+        await store_cached_answer(
+            user_message, "message", assistant_response, relevant_sources, confidence, time.time() - llm_start
+        )
         
         # AI sohbet geçmişini Supabase'e kaydet
         try:
-            sources_for_save = [{
-                "id": src.get("id"),
-                "title": src.get("title"),
-                "type": src.get("type"),
-                "author": src.get("author"),
-                "score": src.get("score")
-            } for src in relevant_sources]
-            
-            slug = save_ai_chat(user_message, assistant_response, sources_for_save)
+            slug = save_ai_chat(user_message, assistant_response, sources_for_save(relevant_sources))
             logger.info(f"AI sohbet kaydedildi: {slug}")
         except Exception as e:
             logger.error(f"AI sohbet kaydetme hatası: {e}")
@@ -1620,107 +1833,263 @@ Kurallar:
             processing_time=processing_time
         )
 
-async def search_relevant_content(query: str, max_results: int = 10) -> List[Dict[str, Any]]:
+# --- Retrieval servisi (sohbet RAG aramaları) ---
+# Model encode, FAISS, SQLite ve Supabase çağrıları bloklayıcıdır: event loop yerine
+# sınırlı bir thread havuzunda, kaynak başına zaman aşımıyla paralel çalıştırılır.
+RETRIEVAL_MAX_WORKERS = int(os.getenv("RETRIEVAL_MAX_WORKERS", "8"))
+RETRIEVAL_TIMEOUTS = {
+    "vector": float(os.getenv("RETRIEVAL_VECTOR_TIMEOUT", "4.0")),
+    "whoosh": float(os.getenv("RETRIEVAL_WHOOSH_TIMEOUT", "3.0")),
+    "audio": float(os.getenv("RETRIEVAL_AUDIO_TIMEOUT", "2.0")),
+    "video": float(os.getenv("RETRIEVAL_VIDEO_TIMEOUT", "2.0")),
+}
+
+async def run_retrieval(name: str, func, *args):
     """
-    FAISS vektör veritabanı ve diğer kaynaklarda anlamsal arama
+    Bloklayan bir aramayı retrieval havuzunda zaman aşımıyla çalıştır.
+    Hata veya zaman aşımında None döner (kısmi sonuçla devam edilir).
     """
+    loop = asyncio.get_running_loop()
+    executor = getattr(app.state, "retrieval_executor", None)
+    timeout = RETRIEVAL_TIMEOUTS[name]
+    try:
+        return await asyncio.wait_for(loop.run_in_executor(executor, functools.partial(func, *args)), timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"{name} retrieval timed out after {timeout}s")
+    except Exception as e:
+        logger.warning(f"{name} retrieval error: {e}")
+    return None
+
+def _vector_sources(query: str, max_results: int, source_types: Optional[List[str]]) -> List[Dict[str, Any]]:
+    """FAISS vektör veritabanında anlamsal arama (birincil)"""
+    vector_db = get_vector_db()
+    vector_results = vector_db.search(query, k=max_results, source_types=source_types)
     sources = []
+    for result in vector_results:
+        # Vektör sonuçlarını standart formata çevir
+        sources.append({
+            "id": result.get("source_id", ""),
+            "type": result.get("source_type", ""),
+            "title": result.get("title", ""),
+            "author": result.get("author", ""),
+            "content": result.get("content", ""),
+            "page": result.get("page_number"),
+            "url": result.get("url"),
+            "timestamp": result.get("timestamp"),
+            "score": result.get("similarity", 0.0),
+            "search_method": "vector_semantic"
+        })
+    logger.info(f"Vector search returned {len(vector_results)} results")
+    return sources
+
+def _whoosh_sources(query: str, max_results: int,
+                    source_types: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Whoosh ile geleneksel (BM25F) arama"""
+    sources = []
+    with get_searcher_pool(INDEX_DIR).searcher() as searcher:
+        parser = MultifieldParser(["content", "title", "author"], searcher.schema)
+        query_obj = parser.parse(query)
+        type_filter = None
+        if source_types:
+            type_filter = Or([Term("type", t) for t in source_types if t in ("book", "article")])
+            if not type_filter.subqueries:
+                return []
+        results = searcher.search(query_obj, limit=max_results, filter=type_filter)
+        top_score = results[0].score if results.scored_length() and results[0].score else 1.0
+        
+        for result in results:
+            is_book = result.get("type") == "book"
+            sources.append({
+                "id": result.get("page_or_id", ""),
+                "type": "book" if is_book else "article",
+                "title": result.get("title", ""),
+                "author": result.get("author", ""),
+                "content": result.get("content", "")[:500] + "...",
+                "page": int(result["page_or_id"]) if is_book and result.get("page_or_id", "").isdigit() else None,
+                "url": None if is_book else result.get("source"),
+                "source": result.get("source"),
+                # BM25 skoru sınırsız: en iyi sonuca göre ölçeklenir, vektör aramadan düşük tutulur
+                "score": result.score / top_score * 0.8,
+                "search_method": "whoosh_fallback"
+            })
     
-    try:
-        # FAISS vektör veritabanında anlamsal arama (birincil)
+    logger.info(f"Whoosh search returned {len(sources)} results")
+    return sources
+
+def _audio_sources(query: str) -> List[Dict[str, Any]]:
+    """Audio veritabanında anahtar kelime araması"""
+    sources = []
+    for audio in search_audio_chapters(query)[:3]:  # En fazla 3 ses kaydı
+        sources.append({
+            "id": str(audio.get("id")),
+            "type": "audio",
+            "title": audio.get("title", ""),
+            "author": audio.get("speaker", ""),
+            "content": audio.get("description", "")[:300] + "...",
+            "timestamp": audio.get("timestamp"),
+            "score": 0.6,  # Düşük skor (keyword match)
+            "search_method": "audio_keyword"
+        })
+    return sources
+
+def _video_sources(query: str) -> List[Dict[str, Any]]:
+    """Video analizlerinde anahtar kelime araması"""
+    sources = []
+    analyses = get_all_completed_analyses()
+    if analyses and isinstance(analyses, (list, tuple)):
+        for analysis in analyses[:2]:  # En fazla 2 video analizi
+            if query.lower() in analysis.get("summary", "").lower():
+                sources.append({
+                    "id": analysis.get("task_id"),
+                    "type": "video",
+                    "title": analysis.get("title", "Video Analizi"),
+                    "content": analysis.get("summary", "")[:400] + "...",
+                    "url": analysis.get("url"),
+                    "score": 0.5,  # Düşük skor (keyword match)
+                    "search_method": "video_keyword"
+                })
+    return sources
+
+# Kaynak başına aday sayısı (fan-out): füzyon öncesi her aramadan alınan en fazla sonuç
+HYBRID_FANOUT = {
+    "vector": int(os.getenv("HYBRID_VECTOR_FANOUT", "20")),
+    "whoosh": int(os.getenv("HYBRID_WHOOSH_FANOUT", "20")),
+}
+# Reciprocal rank fusion sabiti ve liste ağırlıkları (anahtar kelime eşleşmeli ek kaynaklar daha düşük)
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+HYBRID_WEIGHTS = {"vector": 1.0, "whoosh": 1.0, "audio": 0.5, "video": 0.5}
+# RAG kaynak arama modu: "hybrid" (vektör + Whoosh füzyonu) veya "vector" (vektör, hata olursa Whoosh).
+# Vektör deposunda sayfa bilgisi olmayan eski kitap kayıtları varsa hybrid, populate_vector_db.py
+# yeniden çalıştırılana kadar vector moduna düşer (bkz. hybrid_retrieval_ready)
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+
+def hybrid_retrieval_ready() -> bool:
+    """
+    Vektör deposu hybrid füzyona uygun mu: eski biçimli kitap kayıtları (sayfa/dosya
+    bilgisi yok) Whoosh sonuçlarıyla eşleştirilemez, bu durumda vector modu kullanılır.
+    """
+    vector_db = get_vector_db()
+    return vector_db is None or vector_db.count_legacy_book_rows() == 0
+
+def source_dedup_key(source: Dict[str, Any]) -> tuple:
+    """
+    Aynı içeriğe işaret eden sonuçlar için anahtar: kitaplarda (kitap, sayfa),
+    makalelerde makale id'si. Vektör sonuçları parça (chunk) bazlıdır; aynı sayfanın
+    parçaları tek sonuca iner.
+    """
+    source_type = source.get("type")
+    if source_type == "book":
+        title = (source.get("title") or "").lower()
+        if source.get("page") is not None:
+            return ("book", title, source.get("page"))
+        # Eski populate_vector_db kayıtlarında sayfa yok, source_id yalnızca "_<parça>":
+        # farklı kitapların/sayfaların parçaları birleşmesin
+        return ("book", title, source.get("id"), (source.get("content") or "")[:200])
+    if source_type == "article":
+        # Whoosh: makale id'si, vektör: "<makale id>_<parça>"
+        return ("article", str(source.get("id", "")).rsplit("_", 1)[0])
+    return (source_type, source.get("id"))
+
+def reciprocal_rank_fusion(ranked_lists: Dict[str, List[Dict[str, Any]]], k: int = HYBRID_RRF_K,
+                           weights: Optional[Dict[str, float]] = None) -> List[Dict[str, Any]]:
+    """
+    Sıralı sonuç listelerini reciprocal rank fusion ile birleştir.
+    
+    Her liste için skor ağırlık / (k + sıra); aynı anahtarlı sonuçların skorları toplanır.
+    Sonuç, ilk listede (sırayla) görülen kaydın kopyasıdır; rrf_score ve ranks alanları eklenir.
+    """
+    weights = weights or HYBRID_WEIGHTS
+    fused: Dict[tuple, Dict[str, Any]] = {}
+    for name, sources in ranked_lists.items():
+        weight = weights.get(name, 1.0)
+        rank = 0
+        seen = set()
+        for source in sources or []:
+            key = source_dedup_key(source)
+            if key in seen:
+                continue  # Aynı listede daha düşük sıradaki parça
+            seen.add(key)
+            rank += 1
+            entry = fused.get(key)
+            if entry is None:
+                entry = dict(source, rrf_score=0.0, ranks={})
+                fused[key] = entry
+            entry["rrf_score"] += weight / (k + rank)
+            entry["ranks"][name] = rank
+    
+    results = sorted(fused.values(), key=lambda x: x["rrf_score"], reverse=True)
+    for entry in results:
+        if len(entry["ranks"]) > 1:
+            entry["search_method"] = "hybrid_rrf"
+    return results
+
+async def hybrid_search(query: str, max_results: int = 10, source_types: Optional[List[str]] = None,
+                        include_extras: bool = True,
+                        fanout: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
+    """
+    Whoosh (BM25F) ve FAISS aramalarını paralel çalıştırıp RRF ile birleştir.
+    
+    Her arama fan-out kadar aday döndürür ve kendi zaman aşımıyla sınırlıdır;
+    başarısız olan arama füzyona katılmaz.
+    """
+    fanout = {**HYBRID_FANOUT, **(fanout or {})}
+    lookups = {
+        "vector": run_retrieval("vector", _vector_sources, query, max(fanout["vector"], max_results), source_types),
+        "whoosh": run_retrieval("whoosh", _whoosh_sources, query, max(fanout["whoosh"], max_results), source_types),
+    }
+    if include_extras and (not source_types or "audio" in source_types):
+        lookups["audio"] = run_retrieval("audio", _audio_sources, query)
+    if include_extras and (not source_types or "video" in source_types):
+        lookups["video"] = run_retrieval("video", _video_sources, query)
+    results = dict(zip(lookups, await asyncio.gather(*lookups.values())))
+    
+    fused = reciprocal_rank_fusion(results)
+    if source_types:
+        fused = [source for source in fused if source.get("type") in source_types]
+    return fused[:max_results]
+
+async def search_relevant_content(query: str, max_results: int = 10,
+                                  source_types: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    FAISS vektör veritabanı ve diğer kaynaklarda anlamsal arama
+    
+    RETRIEVAL_MODE=hybrid ise vektör, Whoosh, audio ve video sonuçları RRF ile
+    birleştirilir (hybrid_search). Aksi halde vektör, audio ve video aramaları
+    eşzamanlı çalışır, vektör arama başarısız olursa Whoosh'a düşülür.
+    Toplam gecikme en yavaş kaynakla (ve onun zaman aşımıyla) sınırlıdır.
+    source_types verilirse filtre vektör index'inin içinde uygulanır ve
+    yalnızca bu türlere ait ek kaynaklar aranır.
+    """
+    if RETRIEVAL_MODE == "hybrid" and await asyncio.to_thread(hybrid_retrieval_ready):
         try:
-            vector_db = get_vector_db()
-            vector_results = vector_db.search(query, k=max_results)
-            
-            for result in vector_results:
-                # Vektör sonuçlarını standart formata çevir
-                source = {
-                    "id": result.get("source_id", ""),
-                    "type": result.get("source_type", ""),
-                    "title": result.get("title", ""),
-                    "author": result.get("author", ""),
-                    "content": result.get("content", ""),
-                    "page": result.get("page_number"),
-                    "url": result.get("url"),
-                    "timestamp": result.get("timestamp"),
-                    "score": result.get("similarity", 0.0),
-                    "search_method": "vector_semantic"
-                }
-                sources.append(source)
-            
-            logger.info(f"Vector search returned {len(vector_results)} results")
-            
+            return await hybrid_search(query, max_results=max_results, source_types=source_types)
         except Exception as e:
-            logger.warning(f"Vector search error: {e}")
-            
-            # Fallback: Whoosh ile geleneksel arama
-            try:
-                ix = get_whoosh_index()
-                with ix.searcher() as searcher:
-                    parser = MultifieldParser(["content", "title", "author"], ix.schema)
-                    query_obj = parser.parse(query)
-                    results = searcher.search(query_obj, limit=max_results)
-                    
-                    for result in results:
-                        source = {
-                            "id": result.get("id", ""),
-                            "type": "book" if result.get("type") == "book" else "article",
-                            "title": result.get("title", ""),
-                            "author": result.get("author", ""),
-                            "content": result.get("content", "")[:500] + "...",
-                            "page": result.get("page"),
-                            "score": result.score * 0.8,  # Vektör aramadan düşük skor
-                            "search_method": "whoosh_fallback"
-                        }
-                        sources.append(source)
-                
-                logger.info(f"Whoosh fallback returned {len(results)} results")
-                
-            except Exception as whoosh_error:
-                logger.error(f"Whoosh fallback also failed: {whoosh_error}")
-        
-        # Ek aramalar (vektör aramayı tamamlamak için)
-        if len(sources) < max_results:
-            # Audio veritabanında ara
-            try:
-                audio_results = search_audio_chapters(query)
-                for audio in audio_results[:3]:  # En fazla 3 ses kaydı
-                    # Duplicate check
-                    if not any(s.get("id") == str(audio.get("id")) and s.get("type") == "audio" for s in sources):
-                        source = {
-                            "id": str(audio.get("id")),
-                            "type": "audio",
-                            "title": audio.get("title", ""),
-                            "author": audio.get("speaker", ""),
-                            "content": audio.get("description", "")[:300] + "...",
-                            "timestamp": audio.get("timestamp"),
-                            "score": 0.6,  # Düşük skor (keyword match)
-                            "search_method": "audio_keyword"
-                        }
-                        sources.append(source)
-            except Exception as e:
-                logger.warning(f"Audio search error: {e}")
-            
-            # Video analizlerinde ara
-            try:
-                analyses = get_all_completed_analyses()
-                if analyses and isinstance(analyses, (list, tuple)):
-                    for analysis in analyses[:2]:  # En fazla 2 video analizi
-                        if query.lower() in analysis.get("summary", "").lower():
-                            # Duplicate check
-                            if not any(s.get("id") == analysis.get("task_id") and s.get("type") == "video" for s in sources):
-                                source = {
-                                    "id": analysis.get("task_id"),
-                                    "type": "video",
-                                    "title": analysis.get("title", "Video Analizi"),
-                                    "content": analysis.get("summary", "")[:400] + "...",
-                                    "url": analysis.get("url"),
-                                    "score": 0.5,  # Düşük skor (keyword match)
-                                    "search_method": "video_keyword"
-                                }
-                                sources.append(source)
-            except Exception as e:
-                logger.warning(f"Video analysis search error: {e}")
+            logger.error(f"Hybrid search error: {e}")
+            return []
+    
+    sources = []
+    
+    try:
+        lookups = {"vector": run_retrieval("vector", _vector_sources, query, max_results, source_types)}
+        if not source_types or "audio" in source_types:
+            lookups["audio"] = run_retrieval("audio", _audio_sources, query)
+        if not source_types or "video" in source_types:
+            lookups["video"] = run_retrieval("video", _video_sources, query)
+        results = dict(zip(lookups, await asyncio.gather(*lookups.values())))
+        
+        sources = results["vector"]
+        if sources is None:
+            # Vektör arama başarısız ya da zaman aşımı: Whoosh ile geleneksel arama
+            sources = await run_retrieval("whoosh", _whoosh_sources, query, max_results, source_types) or []
+        
+        # Ek kaynaklar (vektör aramayı tamamlamak için)
+        for extra in (results.get("audio"), results.get("video")):
+            if len(sources) >= max_results:
+                break
+            for source in extra or []:
+                # Duplicate check
+                if not any(s.get("id") == source["id"] and s.get("type") == source["type"] for s in sources):
+                    sources.append(source)
     
     except Exception as e:
         logger.error(f"Search error: {e}")
@@ -1729,6 +2098,39 @@ async def search_relevant_content(query: str, max_results: int = 10) -> List[Dic
     sources.sort(key=lambda x: x.get("score", 0), reverse=True)
     return sources[:max_results]
 
+@app.get("/search/suggest")
+async def search_suggest(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(5, ge=1, le=20, description="Kelime başına en fazla öneri"),
+    searcher: Searcher = Depends(get_searcher)
+):
+    """Index sözlüğünden yazım önerileri ("bunu mu demek istediniz")"""
+    result = await asyncio.to_thread(spelling_suggestion, searcher, q, limit)
+    if result is None:
+        raise HTTPException(status_code=503, detail="Yazım sözlüğü henüz oluşturulmadı.")
+    return {"query": q, **result}
+
+@app.get("/search/hybrid")
+async def search_hybrid(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(10, ge=1, le=50),
+    source_types: Optional[List[str]] = Query(None, description="book, article, audio, video"),
+    vector_fanout: int = Query(HYBRID_FANOUT["vector"], ge=1, le=100),
+    whoosh_fanout: int = Query(HYBRID_FANOUT["whoosh"], ge=1, le=100)
+):
+    """Whoosh ve vektör aramasının reciprocal rank fusion ile birleştirilmiş sonuçları"""
+    start_time = time.time()
+    results = await hybrid_search(
+        q, max_results=limit, source_types=source_types,
+        fanout={"vector": vector_fanout, "whoosh": whoosh_fanout}
+    )
+    return {
+        "query": q,
+        "results": results,
+        "total": len(results),
+        "processing_time": round(time.time() - start_time, 3)
+    }
+
 def build_context_from_sources(sources: List[Dict[str, Any]]) -> str:
     """
     Kaynaklardan context metni oluştur
@@ -1886,6 +2288,16 @@ async def get_vector_database_stats():
             "message": str(e)
         }
 
+@app.get("/chat/answer-cache-stats")
+async def get_answer_cache_stats():
+    """
+    Anlamsal cevap önbelleği metrikleri (isabet oranı, kazanılan LLM süresi)
+    """
+    answer_cache = get_answer_cache()
+    if not answer_cache:
+        return {"status": "error", "message": "Answer cache not available"}
+    return {"status": "success", "stats": answer_cache.stats()}
+
 @app.post("/chat/vector-search")
 async def vector_search_endpoint(request: dict):
     """
@@ -1947,6 +2359,33 @@ class AdvancedChatRequest(BaseModel):
     temperature: float = 0.7
     max_tokens: int = 2000
 
+def advanced_cache_scope(chat_request: AdvancedChatRequest) -> str:
+    """Cevap önbelleği için gelişmiş sohbet ayarlarının anahtarı"""
+    return json.dumps({
+        "source_types": sorted(chat_request.source_types or []),
+        "max_sources": chat_request.max_sources,
+        "use_vector_search": chat_request.use_vector_search,
+    }, sort_keys=True)
+
+async def retrieve_advanced_sources(chat_request: AdvancedChatRequest, user_message: str) -> List[Dict[str, Any]]:
+    """Gelişmiş sohbet için kaynakları ara (source_types filtresiyle)"""
+    if not chat_request.use_vector_search:
+        return []
+    
+    relevant_sources = await search_relevant_content(
+        user_message, 
+        max_results=chat_request.max_sources,
+        source_types=chat_request.source_types
+    )
+    
+    # Kaynak türü filtresi (Whoosh fallback sonuçları için)
+    if chat_request.source_types:
+        relevant_sources = [
+            source for source in relevant_sources 
+            if source.get("type") in chat_request.source_types
+        ]
+    return relevant_sources
+
 @app.post("/chat/advanced", response_model=ChatResponse)
 async def advanced_chat_message(chat_request: AdvancedChatRequest):
     """
@@ -1962,53 +2401,30 @@ async def advanced_chat_message(chat_request: AdvancedChatRequest):
         if not user_message:
             raise HTTPException(status_code=400, detail="Mesaj boş olamaz")
         
-        # RAG sistemi ile ilgili kaynakları ara
-        if chat_request.use_vector_search:
-            relevant_sources = await search_relevant_content(
-                user_message, 
-                max_results=chat_request.max_sources
+        # Benzer soru aynı ayarlarla daha önce cevaplandıysa DeepSeek'i çağırma
+        cache_scope = advanced_cache_scope(chat_request)
+        cached = await lookup_cached_answer(user_message, cache_scope)
+        if cached:
+            return ChatResponse(
+                response=cached["answer"],
+                sources=cached["sources"],
+                session_id=chat_request.session_id,
+                confidence=cached["confidence"],
+                processing_time=time.time() - start_time
             )
-            
-            # Kaynak türü filtresi uygula
-            if chat_request.source_types:
-                relevant_sources = [
-                    source for source in relevant_sources 
-                    if source.get("type") in chat_request.source_types
-                ]
-        else:
-            relevant_sources = []
-        
-        # Context oluştur
-        context_text = build_context_from_sources(relevant_sources)
         
-        # Gelişmiş system prompt
-        system_prompt = f"""
-Sen Mihmandar Asistanı'sın. Tasavvuf, İslami ilimler ve manevi konularda uzman bir danışmansın.
-
-Görevin:
-1. Kullanıcının sorularını derinlemesine anlayıp, verilen kaynaklardan yararlanarak kapsamlı cevaplar vermek
-2. Cevaplarını Türkçe, saygılı ve bilge bir üslupla sunmak
-3. Kaynaklara net atıflar yapmak ([1], [2] şeklinde)
-4. Manevi rehberlik yaparken İslami değerlere uygun davranmak
-5. Kullanıcıyı daha derin araştırmaya teşvik etmek
-
-Kurallar:
-- Sadece verilen kaynaklardaki bilgileri kullan
-- Her bilgi için kaynak numarası belirt
-- Kısa cevaplar yerine, konuyu aydınlatan detaylı açıklamalar yap
-- Eğer kaynaklarda yeterli bilgi yoksa, bunu açıkça belirt
-- Kullanıcıyı ilgili sayfalara yönlendir
-
-Kaynak sayısı: {len(relevant_sources)}
-Arama yöntemi: {'Vektör tabanlı anlamsal arama' if chat_request.use_vector_search else 'Geleneksel arama'}
-"""
+        # RAG sistemi ile ilgili kaynakları ara
+        relevant_sources = await retrieve_advanced_sources(chat_request, user_message)
         
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": f"Kaynak bilgiler:\n{context_text}\n\nSoru: {user_message}"}
-        ]
+        # Gelişmiş system prompt + context
+        messages = build_chat_messages(
+            build_advanced_system_prompt(len(relevant_sources), chat_request.use_vector_search),
+            user_message,
+            relevant_sources
+        )
         
         # DeepSeek API çağrısı
+        llm_start = time.time()
         response = await deepseek_client.chat.completions.create(
             model="deepseek-chat",
             messages=messages,
@@ -2028,18 +2444,13 @@ Arama yöntemi: {'Vektör tabanlı anlamsal arama' if chat_request.use_vector_se
             user_message,
             chat_request.use_vector_search
         )
+        await store_cached_answer(
+            user_message, cache_scope, assistant_response, relevant_sources, confidence, time.time() - llm_start
+        )
         
         # AI sohbet geçmişini Supabase'e kaydet
         try:
-            sources_for_save = [{
-                "id": src.get("id"),
-                "title": src.get("title"),
-                "type": src.get("type"),
-                "author": src.get("author"),
-                "score": src.get("score")
-            } for src in relevant_sources]
-            
-            slug = save_ai_chat(user_message, assistant_response, sources_for_save)
+            slug = save_ai_chat(user_message, assistant_response, sources_for_save(relevant_sources))
             logger.info(f"AI sohbet kaydedildi (advanced): {slug}")
         except Exception as e:
             logger.error(f"AI sohbet kaydetme hatası (advanced): {e}")
@@ -2100,4 +2511,149 @@ def calculate_advanced_confidence(response: str, sources: List[Dict[str, Any]],
     if len(source_types) > 1:
         confidence += 0.1
     
-    return min(confidence, 1.0)
\ No newline at end of file
+    return min(confidence, 1.0)
+
+# --- Akışlı sohbet (Server-Sent Events) ---
+# Önce kaynaklar, ardından LLM token'ları, en sonda confidence/süre içeren "done" çerçevesi.
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",  # nginx/proxy tamponlamasını kapat
+}
+
+def sse_event(event: str, data: Any) -> str:
+    """Tek bir SSE çerçevesi oluştur"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def stream_chat_events(retrieve, build_messages, session_id: str, user_message: str,
+                             max_tokens: int, temperature: float, confidence_fn, start_time: float,
+                             cache_scope: str):
+    """
+    Sohbet cevabını SSE olarak akıt.
+    
+    Args:
+        retrieve: Kaynakları döndüren coroutine fonksiyonu
+        build_messages: Kaynaklardan DeepSeek mesajlarını oluşturan fonksiyon
+        confidence_fn: (cevap, kaynaklar) -> confidence
+        cache_scope: Cevap önbelleği anahtarı
+    """
+    cached = await lookup_cached_answer(user_message, cache_scope)
+    if cached:
+        yield sse_event("sources", {"sources": cached["sources"], "session_id": session_id})
+        yield sse_event("token", {"content": cached["answer"]})
+        yield sse_event("done", {
+            "session_id": session_id,
+            "confidence": cached["confidence"],
+            "processing_time": time.time() - start_time,
+            "cached": True
+        })
+        return
+    
+    relevant_sources = []
+    assistant_response = ""
+    llm_seconds = 0.0
+    try:
+        relevant_sources = await retrieve()
+        yield sse_event("sources", {"sources": relevant_sources, "session_id": session_id})
+        
+        llm_start = time.time()
+        stream = await deepseek_client.chat.completions.create(
+            model="deepseek-chat",
+            messages=build_messages(relevant_sources),
+            max_tokens=max_tokens,
+            temperature=temperature,
+            top_p=0.9,
+            stream=True
+        )
+        parts = []
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            token = chunk.choices[0].delta.content
+            if token:
+                parts.append(token)
+                yield sse_event("token", {"content": token})
+        assistant_response = "".join(parts)
+        llm_seconds = time.time() - llm_start
+    except Exception as e:
+        logger.error(f"Chat stream error: {e}")
+        yield sse_event("error", {"detail": "Üzgünüm, şu anda size yardımcı olamıyorum. Lütfen daha sonra tekrar deneyin."})
+    
+    # Akış bitti: sohbeti kaydet ve son çerçeveyi gönder
+    slug = None
+    confidence = confidence_fn(assistant_response, relevant_sources) if assistant_response else 0.0
+    if assistant_response:
+        await store_cached_answer(
+            user_message, cache_scope, assistant_response, relevant_sources, confidence, llm_seconds
+        )
+        try:
+            slug = await asyncio.to_thread(
+                save_ai_chat, user_message, assistant_response, sources_for_save(relevant_sources)
+            )
+            logger.info(f"AI sohbet kaydedildi (stream): {slug}")
+        except Exception as e:
+            logger.error(f"AI sohbet kaydetme hatası (stream): {e}")
+    
+    yield sse_event("done", {
+        "session_id": session_id,
+        "confidence": confidence,
+        "processing_time": time.time() - start_time,
+        "slug": slug,
+        "cached": False
+    })
+
+@app.post("/chat/message/stream")
+async def chat_message_stream(chat_request: ChatMessage):
+    """
+    /chat/message'ın akışlı (SSE) sürümü
+    """
+    start_time = time.time()
+    if not deepseek_client:
+        raise HTTPException(status_code=500, detail="DeepSeek API yapılandırılmamış")
+    user_message = chat_request.message.strip()
+    if not user_message:
+        raise HTTPException(status_code=400, detail="Mesaj boş olamaz")
+    
+    events = stream_chat_events(
+        retrieve=lambda: search_relevant_content(user_message),
+        build_messages=lambda sources: build_chat_messages(CHAT_SYSTEM_PROMPT, user_message, sources),
+        session_id=chat_request.session_id,
+        user_message=user_message,
+        max_tokens=2000,
+        temperature=0.7,
+        confidence_fn=calculate_response_confidence,
+        start_time=start_time,
+        cache_scope="message"
+    )
+    return StreamingResponse(events, media_type="text/event-stream", headers=SSE_HEADERS)
+
+@app.post("/chat/advanced/stream")
+async def advanced_chat_message_stream(chat_request: AdvancedChatRequest):
+    """
+    /chat/advanced'ın akışlı (SSE) sürümü
+    """
+    start_time = time.time()
+    if not deepseek_client:
+        raise HTTPException(status_code=500, detail="DeepSeek API yapılandırılmamış")
+    user_message = chat_request.message.strip()
+    if not user_message:
+        raise HTTPException(status_code=400, detail="Mesaj boş olamaz")
+    
+    events = stream_chat_events(
+        retrieve=lambda: retrieve_advanced_sources(chat_request, user_message),
+        build_messages=lambda sources: build_chat_messages(
+            build_advanced_system_prompt(len(sources), chat_request.use_vector_search),
+            user_message,
+            sources
+        ),
+        session_id=chat_request.session_id,
+        user_message=user_message,
+        max_tokens=chat_request.max_tokens,
+        temperature=chat_request.temperature,
+        confidence_fn=lambda response, sources: calculate_advanced_confidence(
+            response, sources, user_message, chat_request.use_vector_search
+        ),
+        start_time=start_time,
+        cache_scope=advanced_cache_scope(chat_request)
+    )
+    return StreamingResponse(events, media_type="text/event-stream", headers=SSE_HEADERS)
@@ -63,6 +63,52 @@ def monitor_memory(interval=5, threshold=85):
     except KeyboardInterrupt:
         print("\nMemory monitoring stopped.")
 
+def report_gunicorn_workers(pattern="main:app"):
+    """
+    gunicorn master ve worker süreçlerinin bellek kullanımını raporla.
+
+    RSS paylaşılan sayfaları her süreçte tekrar sayar; USS yalnızca sürece özel
+    belleği, PSS ise paylaşılan sayfaların adil payını gösterir. mmap'li index ve
+    --preload ile paylaşılan model, worker başına USS'i düşürmelidir.
+    Karşılaştırma için sunucuyu VECTOR_INDEX_MMAP=0 ve VECTOR_INDEX_MMAP=1 ile
+    başlatıp bu raporu ilk /chat/vector-search isteğinden sonra alın.
+    """
+    masters = [
+        p for p in psutil.process_iter(['pid', 'cmdline'])
+        if p.info['cmdline'] and any('gunicorn' in part for part in p.info['cmdline'])
+        and pattern in ' '.join(p.info['cmdline'])
+        and (p.parent() is None or 'gunicorn' not in ' '.join(p.parent().cmdline()))
+    ]
+    if not masters:
+        print(f"gunicorn süreci bulunamadı ({pattern})")
+        return []
+
+    rows = []
+    for master in masters:
+        for proc in [master] + master.children():
+            try:
+                mem = proc.memory_full_info()
+                rows.append({
+                    'pid': proc.pid,
+                    'role': 'master' if proc.pid == master.pid else 'worker',
+                    'rss_mb': mem.rss / 1024 / 1024,
+                    'uss_mb': getattr(mem, 'uss', 0) / 1024 / 1024,
+                    'pss_mb': getattr(mem, 'pss', 0) / 1024 / 1024,
+                })
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+
+    print(f"{'PID':>8} {'ROLE':<8} {'RSS(MB)':>10} {'USS(MB)':>10} {'PSS(MB)':>10}")
+    print("-" * 50)
+    for row in rows:
+        print(f"{row['pid']:>8} {row['role']:<8} {row['rss_mb']:>10.1f} {row['uss_mb']:>10.1f} {row['pss_mb']:>10.1f}")
+    workers = [r for r in rows if r['role'] == 'worker']
+    if workers:
+        print("-" * 50)
+        print(f"Worker başına ortalama USS: {sum(r['uss_mb'] for r in workers) / len(workers):.1f}MB")
+        print(f"Toplam PSS: {sum(r['pss_mb'] for r in rows):.1f}MB")
+    return rows
+
 def check_memory_before_start():
     """Check memory before starting populate script"""
     info = get_memory_info()
@@ -129,6 +175,8 @@ if __name__ == "__main__":
             monitor_memory(interval, threshold)
         elif sys.argv[1] == "check":
             check_memory_before_start()
+        elif sys.argv[1] == "workers":
+            report_gunicorn_workers(sys.argv[2] if len(sys.argv) > 2 else "main:app")
         elif sys.argv[1] == "recommend":
             print("\nMemory Optimization Recommendations:")
             print("-" * 40)
@@ -141,6 +189,7 @@ if __name__ == "__main__":
         print("  python memory_monitor.py monitor    - Monitor memory usage (5s interval)")
         print("  python memory_monitor.py monitor 10 - Monitor with 10s interval")
         print("  python memory_monitor.py recommend  - Get optimization recommendations")
+        print("  python memory_monitor.py workers    - Per-worker RSS/USS/PSS of gunicorn")
         print("\nCurrent memory status:")
         info = get_memory_info()
         print(format_memory_info(info))
\ No newline at end of file
@@ -0,0 +1,809 @@
+# pdf_service.py
+# Backblaze'deki PDF'ler için yerel disk önbelleği, açık PyMuPDF belge havuzu,
+# render edilmiş sayfa görüntüsü önbelleği ve sonraki sayfaların ön yüklenmesi
+
+import os
+import time
+import shutil
+import hashlib
+import logging
+import sqlite3
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Hashable, Optional
+
+import fitz
+import requests
+
+from config import DATA_DIR, PDF_DIR, PDF_BASE_URL
+
+logger = logging.getLogger(__name__)
+
+PDF_CACHE_DIR = Path(os.getenv("PDF_CACHE_DIR", str(DATA_DIR / "pdf_cache")))
+# Önbellekteki PDF'lerin toplam boyut sınırı (bayt); aşılınca en uzun süredir kullanılmayanlar silinir
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+# CDN ile ETag/Last-Modified kontrolü aralığı (saniye)
+PDF_CACHE_REVALIDATE_SECONDS = int(os.getenv("PDF_CACHE_REVALIDATE_SECONDS", "3600"))
+PDF_DOWNLOAD_TIMEOUT = float(os.getenv("PDF_DOWNLOAD_TIMEOUT", "60"))
+# last_access güncellemesi en fazla bu sıklıkta veritabanına yazılır
+_ACCESS_WRITE_INTERVAL = 60
+# Süreç başına açık tutulacak en fazla fitz.Document sayısı
+PDF_DOC_POOL_SIZE = int(os.getenv("PDF_DOC_POOL_SIZE", "16"))
+# Bu kadar saniye kullanılmayan belgeler kapatılır
+PDF_DOC_IDLE_SECONDS = float(os.getenv("PDF_DOC_IDLE_SECONDS", "300"))
+
+PAGE_CACHE_DIR = Path(os.getenv("PAGE_CACHE_DIR", str(DATA_DIR / "page_cache")))
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", str(1024 ** 3)))
+PAGE_IMAGE_DEFAULT_DPI = 150
+PAGE_IMAGE_MIN_DPI = 36
+PAGE_IMAGE_MAX_DPI = 300
+PAGE_IMAGE_MAX_WIDTH = 2400
+# JPEG / WebP kalitesi
+PAGE_IMAGE_QUALITY = int(os.getenv("PAGE_IMAGE_QUALITY", "80"))
+PAGE_IMAGE_FORMATS = {"png": "image/png", "jpeg": "image/jpeg", "webp": "image/webp"}
+# Bir sayfa sunulduktan sonra arka planda render edilecek sonraki sayfa sayısı (0: kapalı)
+PDF_PREFETCH_PAGES = int(os.getenv("PDF_PREFETCH_PAGES", "2"))
+PDF_PREFETCH_WORKERS = int(os.getenv("PDF_PREFETCH_WORKERS", "1"))
+# İsabet / boşa render sayımı için izlenen en fazla ön yüklenmiş sayfa ve süre (saniye);
+# bu süre içinde istenmeyen ön yükleme boşa sayılır
+_PREFETCH_TRACK_SIZE = 4096
+_PREFETCH_TRACK_SECONDS = 1800
+
+
+def safe_pdf_name(pdf_file: str) -> str:
+    """PDF adını doğrula: dizin ayırıcısı veya '..' içeren adlar reddedilir"""
+    if not pdf_file or Path(pdf_file).name != pdf_file or pdf_file in (".", ".."):
+        raise FileNotFoundError(pdf_file)
+    return pdf_file
+
+
+class PdfDiskCache:
+    """
+    Uzak PDF'ler için içerik adresli (SHA1) disk önbelleği.
+
+    - Dosyalar blobs/<sha1>.pdf olarak saklanır; ad -> blob eşlemesi, ETag ve
+      erişim zamanları SQLite'ta tutulur (worker'lar arasında paylaşılır).
+    - Aynı PDF için eşzamanlı istekler tek indirmeyi bekler (single-flight).
+    - PDF_CACHE_REVALIDATE_SECONDS'ta bir koşullu GET ile CDN'e sorulur; 304 ise
+      dosya yeniden indirilmez, CDN'e ulaşılamazsa önbellekteki kopya kullanılır.
+    - Toplam boyut PDF_CACHE_MAX_BYTES'ı aşınca LRU sırasıyla blob'lar silinir.
+    """
+
+    def __init__(self, cache_dir: Path = PDF_CACHE_DIR, max_bytes: int = PDF_CACHE_MAX_BYTES,
+                 base_url: str = PDF_BASE_URL, revalidate_seconds: int = PDF_CACHE_REVALIDATE_SECONDS):
+        self.cache_dir = Path(cache_dir)
+        self.blob_dir = self.cache_dir / "blobs"
+        self.max_bytes = max_bytes
+        self.base_url = base_url
+        self.revalidate_seconds = revalidate_seconds
+        self._lock = threading.Lock()
+        self._name_locks: Dict[str, threading.Lock] = {}
+        self._last_access_write: Dict[str, float] = {}
+        self.hits = 0
+        self.downloads = 0
+        self.revalidated = 0
+        self.evictions = 0
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.cache_dir / "pdf_cache.db", timeout=10.0)
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS pdf_cache (
+                    name TEXT PRIMARY KEY,
+                    sha1 TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    checked_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+
+    def _name_lock(self, name: str) -> threading.Lock:
+        with self._lock:
+            lock = self._name_locks.get(name)
+            if lock is None:
+                lock = self._name_locks[name] = threading.Lock()
+            return lock
+
+    def _blob_path(self, sha1: str) -> Path:
+        return self.blob_dir / f"{sha1}.pdf"
+
+    def _entry(self, name: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM pdf_cache WHERE name = ?", (name,)).fetchone()
+        if row is None or not self._blob_path(row["sha1"]).is_file():
+            return None
+        return dict(row)
+
+    def _touch(self, name: str):
+        now = time.time()
+        if now - self._last_access_write.get(name, 0) < _ACCESS_WRITE_INTERVAL:
+            return
+        self._last_access_write[name] = now
+        with self._connect() as conn:
+            conn.execute("UPDATE pdf_cache SET last_access = ? WHERE name = ?", (now, name))
+
+    def get(self, pdf_file: str) -> Path:
+        """
+        PDF'in yerel yolunu döndür: PDF_DIR'deki dosya ya da önbellekteki kopya
+        (gerekirse indirilir / yeniden doğrulanır).
+
+        Raises:
+            FileNotFoundError: PDF yerel değil ve PDF_BASE_URL ayarlanmamış ya da CDN'de yok
+        """
+        name = safe_pdf_name(pdf_file)
+        local_path = PDF_DIR / name
+        if local_path.is_file():
+            return local_path
+        if not self.base_url:
+            raise FileNotFoundError(name)
+
+        entry = self._entry(name)
+        if entry and time.time() - entry["checked_at"] < self.revalidate_seconds:
+            self.hits += 1
+            self._touch(name)
+            return self._blob_path(entry["sha1"])
+
+        with self._name_lock(name):
+            # Kilit beklenirken başka bir istek indirmiş/doğrulamış olabilir
+            entry = self._entry(name)
+            if entry and time.time() - entry["checked_at"] < self.revalidate_seconds:
+                self.hits += 1
+                self._touch(name)
+                return self._blob_path(entry["sha1"])
+            return self._fetch(name, entry)
+
+    def local_copy(self, pdf_file: str) -> Optional[Path]:
+        """
+        Ağa gitmeden kullanılabilecek yerel kopya: PDF_DIR'deki dosya ya da
+        yeniden doğrulama süresi dolmamış önbellek kaydı; yoksa None (indirme yapmaz).
+        """
+        name = safe_pdf_name(pdf_file)
+        local_path = PDF_DIR / name
+        if local_path.is_file():
+            return local_path
+        entry = self._entry(name)
+        if entry and time.time() - entry["checked_at"] < self.revalidate_seconds:
+            self.hits += 1
+            self._touch(name)
+            return self._blob_path(entry["sha1"])
+        return None
+
+    def _fetch(self, name: str, entry: Optional[Dict[str, Any]]) -> Path:
+        """PDF'i indir ya da önbellekteki kopyayı koşullu GET ile doğrula"""
+        headers = {}
+        if entry:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        url = f"{self.base_url}/{name}"
+        try:
+            response = requests.get(url, headers=headers, timeout=PDF_DOWNLOAD_TIMEOUT, stream=True)
+        except requests.exceptions.RequestException as e:
+            if entry:
+                logger.warning(f"PDF revalidation failed for {name}, serving cached copy: {e}")
+                return self._blob_path(entry["sha1"])
+            raise
+
+        with response:
+            if response.status_code == 304 and entry:
+                self.revalidated += 1
+                with self._connect() as conn:
+                    conn.execute("UPDATE pdf_cache SET checked_at = ?, last_access = ? WHERE name = ?",
+                                 (time.time(), time.time(), name))
+                return self._blob_path(entry["sha1"])
+            if response.status_code == 404:
+                raise FileNotFoundError(name)
+            if response.status_code >= 400 and entry:
+                logger.warning(f"PDF revalidation returned {response.status_code} for {name}, serving cached copy")
+                return self._blob_path(entry["sha1"])
+            response.raise_for_status()
+
+            logger.info(f"PDF indiriliyor (önbelleğe): {url}")
+            sha1 = hashlib.sha1()
+            size = 0
+            fd, tmp_name = tempfile.mkstemp(suffix=".part", dir=self.blob_dir)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    for chunk in response.iter_content(chunk_size=1024 * 1024):
+                        f.write(chunk)
+                        sha1.update(chunk)
+                        size += len(chunk)
+                digest = sha1.hexdigest()
+                os.replace(tmp_name, self._blob_path(digest))
+            except BaseException:
+                if os.path.exists(tmp_name):
+                    os.unlink(tmp_name)
+                raise
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO pdf_cache (name, sha1, size, etag, last_modified, checked_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (name, digest, size, etag, last_modified, now, now))
+        self.downloads += 1
+        if entry and entry["sha1"] != digest:
+            self._delete_unreferenced(entry["sha1"])
+        self._evict(keep=digest)
+        return self._blob_path(digest)
+
+    def _delete_unreferenced(self, sha1: str):
+        with self._connect() as conn:
+            in_use = conn.execute("SELECT 1 FROM pdf_cache WHERE sha1 = ? LIMIT 1", (sha1,)).fetchone()
+        if not in_use:
+            self._unlink_blob(sha1)
+
+    def _unlink_blob(self, sha1: str):
+        try:
+            self._blob_path(sha1).unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"Cached PDF could not be deleted ({sha1}): {e}")
+
+    def _evict(self, keep: Optional[str] = None):
+        """Toplam boyut sınırı aşıldıysa en eski erişilen PDF'leri sil"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT name, sha1, MAX(size) FROM pdf_cache GROUP BY sha1 ORDER BY MAX(last_access)"
+            ).fetchall()
+            total = sum(row[2] for row in rows)
+            for name, sha1, size in rows:
+                if total <= self.max_bytes:
+                    break
+                if sha1 == keep:
+                    continue
+                conn.execute("DELETE FROM pdf_cache WHERE sha1 = ?", (sha1,))
+                self._unlink_blob(sha1)
+                total -= size
+                self.evictions += 1
+                logger.info(f"PDF cache evicted {name} ({size} bytes)")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pdf_cache").fetchone()
+        return {
+            "entries": count,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "downloads": self.downloads,
+            "revalidated": self.revalidated,
+            "evictions": self.evictions,
+        }
+
+    def clear(self):
+        """Tüm önbelleği sil"""
+        with self._lock:
+            shutil.rmtree(self.blob_dir, ignore_errors=True)
+            self.blob_dir.mkdir(parents=True, exist_ok=True)
+            with self._connect() as conn:
+                conn.execute("DELETE FROM pdf_cache")
+
+
+# Global instance
+_pdf_cache: Optional[PdfDiskCache] = None
+_pdf_cache_lock = threading.Lock()
+
+def get_pdf_cache() -> PdfDiskCache:
+    """Global PDF disk önbelleğini getir"""
+    global _pdf_cache
+    with _pdf_cache_lock:
+        if _pdf_cache is None:
+            _pdf_cache = PdfDiskCache()
+        return _pdf_cache
+
+
+class _PooledDocument:
+    __slots__ = ("doc", "mtime", "refs", "last_used", "lock", "stale")
+
+    def __init__(self, doc: fitz.Document, mtime: float):
+        self.doc = doc
+        self.mtime = mtime
+        self.refs = 0
+        self.last_used = time.monotonic()
+        # fitz.Document thread-safe değildir: aynı belgeyi aynı anda tek thread kullanır
+        self.lock = threading.Lock()
+        self.stale = False
+
+
+class PdfDocumentPool:
+    """
+    Dosya yoluna göre anahtarlanan, sınırlı sayıda açık fitz.Document havuzu.
+
+    Aynı kitabın ardışık sayfaları için xref ve sayfa ağacı her istekte yeniden
+    ayrıştırılmaz. Belgeler referans sayılır: kullanımdaki bir belge kapatılmaz;
+    havuz dolduğunda ya da PDF_DOC_IDLE_SECONDS boyunca kullanılmadığında boştaki
+    belgeler LRU sırasıyla kapatılır. Dosya değişirse (mtime) belge yeniden açılır.
+    """
+
+    def __init__(self, max_open: int = PDF_DOC_POOL_SIZE, idle_seconds: float = PDF_DOC_IDLE_SECONDS):
+        self.max_open = max_open
+        self.idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        self._docs: "OrderedDict[str, _PooledDocument]" = OrderedDict()
+        self._pid = os.getpid()
+        self.opened = 0
+        self.reused = 0
+        self.closed = 0
+
+    def _acquire(self, path: Path) -> _PooledDocument:
+        key = str(path)
+        mtime = path.stat().st_mtime
+        with self._lock:
+            if self._pid != os.getpid():
+                # fork sonrası ebeveynin handle'larını kullanma
+                self._docs = OrderedDict()
+                self._pid = os.getpid()
+            entry = self._docs.get(key)
+            if entry is not None and entry.mtime != mtime:
+                self._discard(key, entry)
+                entry = None
+            if entry is not None:
+                entry.refs += 1
+                self._docs.move_to_end(key)
+                self.reused += 1
+                return entry
+
+        # Açma işlemi havuz kilidi dışında: başka kitaplar beklemesin
+        doc = fitz.open(path)
+        with self._lock:
+            entry = self._docs.get(key)
+            if entry is not None and entry.mtime == mtime:
+                # Aynı anda başka bir thread açmış: onunkini kullan
+                doc.close()
+                self.reused += 1
+            else:
+                if entry is not None:
+                    self._discard(key, entry)
+                entry = self._docs[key] = _PooledDocument(doc, mtime)
+                self.opened += 1
+            entry.refs += 1
+            self._docs.move_to_end(key)
+            self._evict()
+            return entry
+
+    def _release(self, entry: _PooledDocument):
+        with self._lock:
+            entry.refs -= 1
+            entry.last_used = time.monotonic()
+            if entry.refs == 0:
+                if entry.stale:
+                    self._close(entry)
+                else:
+                    self._evict()
+
+    def _discard(self, key: str, entry: _PooledDocument):
+        """Belgeyi havuzdan çıkar; kullanımdaysa son kullanıcı bırakınca kapanır"""
+        del self._docs[key]
+        entry.stale = True
+        if entry.refs == 0:
+            self._close(entry)
+
+    def _close(self, entry: _PooledDocument):
+        try:
+            entry.doc.close()
+        except Exception as e:
+            logger.debug(f"PDF document close failed: {e}")
+        self.closed += 1
+
+    def _evict(self):
+        """Boşta kalma süresi dolan ve havuz sınırını aşan boştaki belgeleri kapat"""
+        now = time.monotonic()
+        for key, entry in list(self._docs.items()):
+            if entry.refs:
+                continue
+            if len(self._docs) > self.max_open or now - entry.last_used > self.idle_seconds:
+                self._discard(key, entry)
+
+    @contextmanager
+    def document(self, path):
+        """`with pool.document(path) as doc:` kullanımı için bağlam yöneticisi"""
+        entry = self._acquire(Path(path))
+        try:
+            with entry.lock:
+                yield entry.doc
+        finally:
+            self._release(entry)
+
+    def close_idle(self):
+        """Süresi dolan boştaki belgeleri kapat"""
+        with self._lock:
+            self._evict()
+
+    def close(self):
+        """Boştaki tüm belgeleri kapat"""
+        with self._lock:
+            for key, entry in list(self._docs.items()):
+                self._discard(key, entry)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "open": len(self._docs),
+            "in_use": sum(1 for entry in self._docs.values() if entry.refs),
+            "max_open": self.max_open,
+            "opened": self.opened,
+            "reused": self.reused,
+            "closed": self.closed,
+        }
+
+
+_document_pool: Optional[PdfDocumentPool] = None
+
+def get_document_pool() -> PdfDocumentPool:
+    """Global fitz.Document havuzunu getir"""
+    global _document_pool
+    with _pdf_cache_lock:
+        if _document_pool is None:
+            _document_pool = PdfDocumentPool()
+        return _document_pool
+
+
+def pdf_version(path: Path) -> str:
+    """PDF dosyasının sürüm kimliği (ad, boyut, değiştirilme zamanı); dosya değişince değişir"""
+    stat = path.stat()
+    return hashlib.sha1(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}".encode("utf-8")).hexdigest()
+
+
+class PageImageCache:
+    """
+    (pdf sürümü, sayfa, dpi, format) ile anahtarlanan kalıcı sayfa görüntüsü önbelleği.
+
+    Görüntüler <cache_dir>/<sürüm[:2]>/ altında dosya olarak saklanır; anahtar PDF
+    sürümünü içerdiği için kayıtlar hiç değişmez (ETag anahtardan türetilir).
+    Aynı sayfanın eşzamanlı render'ları tek işte birleşir; toplam boyut
+    PAGE_CACHE_MAX_BYTES'ı aşınca en eski kullanılan dosyalar silinir.
+    """
+
+    def __init__(self, cache_dir: Path = PAGE_CACHE_DIR, max_bytes: int = PAGE_CACHE_MAX_BYTES,
+                 documents: Optional[PdfDocumentPool] = None):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.documents = documents
+        self._lock = threading.Lock()
+        # Aynı sayfanın render'larını birleştiren sabit sayıda kilit (anahtar hash'ine göre)
+        self._render_locks = [threading.Lock() for _ in range(64)]
+        self._total_bytes: Optional[int] = None
+        self.hits = 0
+        self.renders = 0
+        self.evictions = 0
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _documents(self) -> PdfDocumentPool:
+        return self.documents or get_document_pool()
+
+    def resolve_dpi(self, doc: fitz.Document, page_num: int,
+                    dpi: Optional[int] = None, width: Optional[int] = None) -> int:
+        """İstenen genişliği (piksel) sayfa boyutuna göre dpi'ye çevir; sınırlar içinde tut"""
+        if width:
+            dpi = round(width * 72 / doc.load_page(page_num - 1).rect.width)
+        return max(PAGE_IMAGE_MIN_DPI, min(PAGE_IMAGE_MAX_DPI, dpi or PAGE_IMAGE_DEFAULT_DPI))
+
+    def _path(self, version: str, page_num: int, dpi: int, fmt: str) -> Path:
+        return self.cache_dir / version[:2] / f"{version}_{page_num}_{dpi}.{fmt}"
+
+    def _render_lock(self, key: str) -> threading.Lock:
+        return self._render_locks[hash(key) % len(self._render_locks)]
+
+    @staticmethod
+    def _encode(page: fitz.Page, dpi: int, fmt: str) -> bytes:
+        pix = page.get_pixmap(dpi=dpi)
+        if fmt == "png":
+            return pix.tobytes("png")
+        if fmt == "jpeg":
+            return pix.tobytes("jpeg", jpg_quality=PAGE_IMAGE_QUALITY)
+        # WebP için Pillow gerekir
+        return pix.pil_tobytes(format="WEBP", quality=PAGE_IMAGE_QUALITY, method=4)
+
+    def _locate(self, pdf_path: Path, page_num: int, dpi: Optional[int],
+                width: Optional[int], fmt: str):
+        """Önbellek dosyasının yolu, PDF sürümü ve çözülmüş dpi"""
+        if fmt not in PAGE_IMAGE_FORMATS:
+            raise ValueError(f"Geçersiz format: {fmt}")
+        version = pdf_version(pdf_path)
+        if width or dpi is None:
+            # width -> dpi dönüşümü ve sayfa kontrolü için belge gerekir (havuzdan, ucuz)
+            with self._documents().document(pdf_path) as doc:
+                if not (0 < page_num <= len(doc)):
+                    raise ValueError("Geçersiz sayfa.")
+                dpi = self.resolve_dpi(doc, page_num, dpi, width)
+        else:
+            dpi = self.resolve_dpi(None, page_num, dpi)
+        return self._path(version, page_num, dpi, fmt), version, dpi
+
+    def get(self, pdf_path: Path, page_num: int, dpi: Optional[int] = None,
+            width: Optional[int] = None, fmt: str = "png") -> Dict[str, Any]:
+        """
+        Sayfa görüntüsünü önbellekten döndür, yoksa render edip kaydet.
+
+        Returns:
+            body, etag, last_modified, media_type, key (önbellek anahtarı) ve
+            cached (render gerekmedi mi) alanları
+
+        Raises:
+            ValueError: Sayfa numarası ya da format geçersiz
+        """
+        pdf_path = Path(pdf_path)
+        path, version, dpi = self._locate(pdf_path, page_num, dpi, width, fmt)
+        body = self._read(path)
+        cached = body is not None
+        if body is None:
+            with self._render_lock(path.name):
+                body = self._read(path)
+                cached = body is not None
+                if body is None:
+                    body = self._render(pdf_path, path, page_num, dpi, fmt)
+        if cached:
+            self.hits += 1
+
+        return {
+            "body": body,
+            "etag": f'"{version[:16]}-{page_num}-{dpi}-{fmt}"',
+            "last_modified": pdf_path.stat().st_mtime,
+            "media_type": PAGE_IMAGE_FORMATS[fmt],
+            "key": path.name,
+            "cached": cached,
+        }
+
+    def ensure(self, pdf_path: Path, page_num: int, dpi: Optional[int] = None,
+               width: Optional[int] = None, fmt: str = "png") -> Optional[str]:
+        """
+        Sayfa önbellekte yoksa render et (ön yükleme için; gövde okunmaz).
+
+        Returns:
+            Render edildiyse önbellek anahtarı, zaten varsa None
+        """
+        pdf_path = Path(pdf_path)
+        path, _, dpi = self._locate(pdf_path, page_num, dpi, width, fmt)
+        if path.is_file():
+            return None
+        with self._render_lock(path.name):
+            if path.is_file():
+                return None
+            self._render(pdf_path, path, page_num, dpi, fmt)
+        return path.name
+
+    def _read(self, path: Path) -> Optional[bytes]:
+        try:
+            body = path.read_bytes()
+        except OSError:
+            return None
+        # LRU için erişim zamanı: en fazla dakikada bir güncellenir
+        try:
+            if time.time() - path.stat().st_mtime > _ACCESS_WRITE_INTERVAL:
+                os.utime(path)
+        except OSError:
+            pass
+        return body
+
+    def _render(self, pdf_path: Path, path: Path, page_num: int, dpi: int, fmt: str) -> bytes:
+        with self._documents().document(pdf_path) as doc:
+            if not (0 < page_num <= len(doc)):
+                raise ValueError("Geçersiz sayfa.")
+            body = self._encode(doc.load_page(page_num - 1), dpi, fmt)
+        self.renders += 1
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(suffix=".part", dir=path.parent)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(body)
+            os.replace(tmp_name, path)
+        except OSError as e:
+            logger.warning(f"Page image could not be cached ({path.name}): {e}")
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            return body
+
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._disk_usage()
+            else:
+                self._total_bytes += len(body)
+            over_limit = self._total_bytes > self.max_bytes
+        if over_limit:
+            self._evict()
+        return body
+
+    def _files(self):
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_dir():
+                for file_entry in os.scandir(entry.path):
+                    if file_entry.is_file() and not file_entry.name.endswith(".part"):
+                        yield file_entry
+
+    def _disk_usage(self) -> int:
+        return sum(entry.stat().st_size for entry in self._files())
+
+    def _evict(self):
+        """En eski kullanılan görüntüleri sınırın %90'ına inene kadar sil"""
+        with self._lock:
+            files = sorted(((e.stat().st_mtime, e.stat().st_size, e.path) for e in self._files()))
+            total = sum(size for _, size, _ in files)
+            target = self.max_bytes * 0.9
+            for _, size, file_path in files:
+                if total <= target:
+                    break
+                try:
+                    os.unlink(file_path)
+                except OSError:
+                    continue
+                total -= size
+                self.evictions += 1
+            self._total_bytes = total
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "renders": self.renders,
+            "evictions": self.evictions,
+        }
+
+
+_page_cache: Optional[PageImageCache] = None
+
+def get_page_cache() -> PageImageCache:
+    """Global sayfa görüntüsü önbelleğini getir"""
+    global _page_cache
+    with _pdf_cache_lock:
+        if _page_cache is None:
+            _page_cache = PageImageCache()
+        return _page_cache
+
+
+def _lower_thread_priority():
+    """Ön yükleme thread'lerini düşük öncelikte çalıştır (Linux'ta thread başına nice)"""
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 10)
+    except (AttributeError, OSError):
+        pass
+
+
+class PagePrefetcher:
+    """
+    Okuyucu N. sayfayı aldıktan sonra sonraki sayfaları düşük öncelikli bir
+    thread havuzunda sayfa önbelleğine render eder.
+
+    Okuyucu (istemci + kitap) başına bekleyen işler tutulur; okuyucu yeni pencerenin
+    dışına atlarsa henüz başlamamış işler iptal edilir. Ön yüklenen sayfaların
+    sonradan istenip istenmediği izlenir: hit_rate = isabet / ön yükleme render'ı,
+    wasted = istenmeden izlemeden düşen render'lar.
+    """
+
+    def __init__(self, page_cache: Optional[PageImageCache] = None, pages: int = PDF_PREFETCH_PAGES,
+                 workers: int = PDF_PREFETCH_WORKERS, max_readers: int = 1024):
+        self.page_cache = page_cache
+        self.pages = pages
+        self.workers = workers
+        self.max_readers = max_readers
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pid = None
+        self._pending: "OrderedDict[Hashable, Dict[int, Future]]" = OrderedDict()
+        self._prefetched: "OrderedDict[str, float]" = OrderedDict()
+        self.scheduled = 0
+        self.rendered = 0
+        self.skipped = 0
+        self.cancelled = 0
+        self.failed = 0
+        self.hits = 0
+        self.wasted = 0
+
+    def _cache(self) -> PageImageCache:
+        return self.page_cache or get_page_cache()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # fork sonrası ebeveynin thread havuzu kullanılamaz
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="pdf-prefetch",
+                initializer=_lower_thread_priority,
+            )
+            self._pid = os.getpid()
+            self._pending = OrderedDict()
+        return self._executor
+
+    def schedule(self, reader: Hashable, pdf_path: Path, page_num: int, dpi: Optional[int] = None,
+                 width: Optional[int] = None, fmt: str = "png"):
+        """page_num sunulduktan sonra çağrılır: sonraki `pages` sayfayı kuyruğa al"""
+        if self.pages <= 0:
+            return
+        wanted = range(page_num + 1, page_num + 1 + self.pages)
+        with self._lock:
+            executor = self._get_executor()
+            pending = self._pending.pop(reader, {})
+            # Yeni pencerenin dışında kalan (okuyucunun atladığı) işleri iptal et
+            for page, future in pending.items():
+                if page not in wanted and future.cancel():
+                    self.cancelled += 1
+            pending = {page: f for page, f in pending.items() if page in wanted and not f.done()}
+            for page in wanted:
+                if page not in pending:
+                    pending[page] = executor.submit(self._prefetch, pdf_path, page, dpi, width, fmt)
+                    self.scheduled += 1
+            self._pending[reader] = pending
+            while len(self._pending) > self.max_readers:
+                _, stale = self._pending.popitem(last=False)
+                for future in stale.values():
+                    if future.cancel():
+                        self.cancelled += 1
+
+    def _prefetch(self, pdf_path: Path, page_num: int, dpi: Optional[int], width: Optional[int], fmt: str):
+        try:
+            key = self._cache().ensure(pdf_path, page_num, dpi=dpi, width=width, fmt=fmt)
+        except ValueError:
+            # Kitabın sonu
+            with self._lock:
+                self.skipped += 1
+            return
+        except Exception as e:
+            logger.warning(f"Page prefetch failed ({Path(pdf_path).name} p{page_num}): {e}")
+            with self._lock:
+                self.failed += 1
+            return
+        with self._lock:
+            if key is None:
+                self.skipped += 1
+                return
+            self.rendered += 1
+            self._prefetched[key] = time.monotonic()
+            self._expire_prefetched()
+
+    def _expire_prefetched(self):
+        """Süresi dolan ya da izleme sınırını aşan ön yüklemeleri boşa say"""
+        deadline = time.monotonic() - _PREFETCH_TRACK_SECONDS
+        while self._prefetched:
+            key, rendered_at = next(iter(self._prefetched.items()))
+            if len(self._prefetched) <= _PREFETCH_TRACK_SIZE and rendered_at > deadline:
+                break
+            del self._prefetched[key]
+            self.wasted += 1
+
+    def record_request(self, key: str):
+        """Sunulan sayfa daha önce ön yüklendiyse isabet say"""
+        with self._lock:
+            if self._prefetched.pop(key, None) is not None:
+                self.hits += 1
+            self._expire_prefetched()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._expire_prefetched()
+            return {
+                "pages_ahead": self.pages,
+                "pending": sum(1 for p in self._pending.values() for f in p.values() if not f.done()),
+                "scheduled": self.scheduled,
+                "rendered": self.rendered,
+                "skipped": self.skipped,
+                "cancelled": self.cancelled,
+                "failed": self.failed,
+                "hits": self.hits,
+                "wasted": self.wasted,
+                "hit_rate": round(self.hits / self.rendered, 4) if self.rendered else 0.0,
+            }
+
+
+_page_prefetcher: Optional[PagePrefetcher] = None
+
+def get_page_prefetcher() -> PagePrefetcher:
+    """Global sayfa ön yükleyicisini getir"""
+    global _page_prefetcher
+    with _pdf_cache_lock:
+        if _page_prefetcher is None:
+            _page_prefetcher = PagePrefetcher()
+        return _page_prefetcher
@@ -71,6 +71,11 @@ def populate_from_books(force_update=False):
         
         # Force update değilse, duplicate detection kullan
         vector_db = get_vector_db()
+        # Eski biçimli kitap kayıtları (source_id "_<parça>", sayfa yok) yeni
+        # "<pdf>:<sayfa>_<parça>" kayıtlarıyla eşleşmez: yanlarına eklenmesinler
+        legacy_rows = vector_db.delete_legacy_book_rows()
+        if legacy_rows:
+            logger.info(f"Removed {legacy_rows} legacy book vectors; books will be re-added with page info")
         if not force_update:
             stats = vector_db.get_stats()
             existing_book_count = stats.get('source_distribution', {}).get('book', 0)
@@ -95,15 +100,18 @@ def populate_from_books(force_update=False):
                         # Uzun metinleri parçalara böl
                         chunks = chunk_text(content, chunk_size=800, overlap=100)
                         
+                        # Whoosh şemasında kitap dosyası 'source', sayfa 'page_or_id' alanındadır
+                        pdf_file = doc.get('source', '')
+                        page = doc.get('page_or_id', '')
                         for i, chunk in enumerate(chunks):
                             documents.append({
                                 'content': chunk,
                                 'source_type': 'book',
-                                'source_id': f"{doc.get('id', '')}_{i}",
+                                'source_id': f"{pdf_file}:{page}_{i}",
                                 'title': doc.get('title', ''),
                                 'author': doc.get('author', ''),
-                                'page_number': doc.get('page'),
-                                'url': f"/kitaplar/{doc.get('id', '')}"
+                                'page_number': int(page) if page.isdigit() else None,
+                                'url': f"/kitaplar/{pdf_file}"
                             })
         
         logger.info(f"Found {len(documents)} book chunks")
@@ -379,6 +387,7 @@ def main():
     parser.add_argument('--articles-only', action='store_true', help='Only process articles')
     parser.add_argument('--audio-only', action='store_true', help='Only process audio')
     parser.add_argument('--video-only', action='store_true', help='Only process video analyses')
+    parser.add_argument('--purge-deleted', action='store_true', help='Physically remove deleted vectors and renumber ids, then exit')
     
     args = parser.parse_args()
     
@@ -397,6 +406,12 @@ def main():
         initial_stats = vector_db.get_stats()
         logger.info(f"Initial stats: {initial_stats}")
         
+        # Silinmiş vektörleri temizle (bakım komutu)
+        if args.purge_deleted:
+            purged = vector_db.purge_deleted()
+            logger.info(f"Purged {purged} deleted vectors. Running workers reload the index on their next search.")
+            return
+        
         # Seçili kaynaklardan doldur
         if args.books_only:
             populate_from_books(force_update=args.force)
@@ -281,6 +281,9 @@ def main():
         else:
             populate_articles_optimized(args.force, args.max_articles)
         
+        # Delta segment'i ana index'e birleştir ve kaydet
+        vector_db.save_index()
+        
         # Final stats
         stats = vector_db.get_stats()
         logger.info(f"Final stats: {stats}")
@@ -0,0 +1,229 @@
+# search_index.py
+# Süreç boyunca açık tutulan Whoosh index'i ve yeniden kullanılabilir searcher havuzu
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from whoosh.index import open_dir, Index
+from whoosh.searching import Searcher
+
+logger = logging.getLogger(__name__)
+
+# Havuzda boşta bekletilecek en fazla searcher sayısı (eşzamanlı kullanım sınırı değildir)
+WHOOSH_SEARCHER_POOL_SIZE = int(os.getenv("WHOOSH_SEARCHER_POOL_SIZE", "8"))
+# Index neslinin (generation) diskte kontrol edilme aralığı, saniye
+WHOOSH_REFRESH_INTERVAL = float(os.getenv("WHOOSH_REFRESH_INTERVAL", "5"))
+
+# create_index.py'nin index dizinine yazdığı yazar listesi (author alanı analiz edildiği
+# için lexicon'dan tam isimler elde edilemez)
+AUTHOR_FACET_FILE = "author_facet.json"
+
+
+def write_author_facet(index_dir, authors: Iterable[str], generation: int):
+    """Yazar listesini index nesliyle birlikte yan dosyaya yaz (atomik)"""
+    path = Path(index_dir) / AUTHOR_FACET_FILE
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"generation": generation, "authors": sorted(set(authors))}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def read_author_facet(index_dir, generation: int) -> Optional[List[str]]:
+    """Yan dosya bu index nesline aitse yazar listesini döndür, değilse None"""
+    path = Path(index_dir) / AUTHOR_FACET_FILE
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("generation") != generation:
+        return None
+    return data.get("authors", [])
+
+
+class SearcherPool:
+    """
+    Tek bir Whoosh index handle'ı ve ödünç verilen searcher'lardan oluşan havuz.
+
+    Searcher'lar thread-safe değildir; her istek havuzdan bir searcher alır ve
+    işi bitince geri verir. Index yeni bir nesle geçtiğinde searcher'lar
+    `refresh()` ile güncellenir.
+    """
+
+    def __init__(self, index_dir, size: int = WHOOSH_SEARCHER_POOL_SIZE,
+                 refresh_interval: float = WHOOSH_REFRESH_INTERVAL):
+        self.index_dir = Path(index_dir)
+        self.size = size
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._ix: Optional[Index] = None
+        self._pid = None
+        self._idle: List[Searcher] = []
+        self._generation = None
+        self._checked_at = 0.0
+        self._facet_lock = threading.Lock()
+        self._author_facet: Optional[Dict[str, Any]] = None
+        self.opened = 0
+        self.reused = 0
+        self.refreshed = 0
+
+    @property
+    def index(self) -> Index:
+        """Paylaşılan index handle'ı (ilk kullanımda açılır)"""
+        with self._lock:
+            return self._get_index()
+
+    def _get_index(self) -> Index:
+        # fork sonrası ebeveynin handle'larını kullanma
+        if self._ix is None or self._pid != os.getpid():
+            self._ix = open_dir(str(self.index_dir))
+            self._pid = os.getpid()
+            self._idle = []
+            self._generation = self._ix.latest_generation()
+            self._checked_at = time.monotonic()
+            logger.info(f"Whoosh index opened (generation {self._generation})")
+        return self._ix
+
+    def _current_generation(self) -> int:
+        """Index neslini en fazla refresh_interval saniyede bir diskten oku"""
+        now = time.monotonic()
+        if now - self._checked_at >= self.refresh_interval:
+            self._generation = self._ix.latest_generation()
+            self._checked_at = now
+        return self._generation
+
+    def generation(self) -> int:
+        """Index'in (en fazla refresh_interval saniye gecikmeli) güncel nesli"""
+        with self._lock:
+            self._get_index()
+            return self._current_generation()
+
+    def acquire(self) -> Searcher:
+        """Havuzdan güncel bir searcher al"""
+        with self._lock:
+            ix = self._get_index()
+            generation = self._current_generation()
+            searcher = self._idle.pop() if self._idle else None
+
+        if searcher is None:
+            self.opened += 1
+            return ix.searcher()
+
+        self.reused += 1
+        if searcher.reader().generation() != generation:
+            # refresh() değişmeyen segmentleri yeniden kullanır ve gereksiz kalan
+            # kaynakları kendisi kapatır: eski searcher ayrıca kapatılmamalı
+            fresh = searcher.refresh()
+            if fresh is not searcher:
+                self.refreshed += 1
+            searcher = fresh
+        return searcher
+
+    def release(self, searcher: Searcher):
+        """Searcher'ı havuza geri ver; havuz doluysa ya da eskimişse kapat"""
+        with self._lock:
+            keep = (
+                self._pid == os.getpid()
+                and len(self._idle) < self.size
+                and searcher.reader().generation() == self._generation
+            )
+            if keep:
+                self._idle.append(searcher)
+                return
+        searcher.close()
+
+    @contextmanager
+    def searcher(self):
+        """`with pool.searcher() as s:` kullanımı için bağlam yöneticisi"""
+        searcher = self.acquire()
+        try:
+            yield searcher
+        finally:
+            self.release(searcher)
+
+    def author_facet(self) -> Dict[str, Any]:
+        """
+        Yazar listesini index nesli başına bir kez hesapla ve bellekte tut.
+
+        Returns:
+            generation, authors, body (hazır JSON), etag, last_modified alanları
+        """
+        generation = self.generation()
+        facet = self._author_facet
+        if facet is not None and facet["generation"] == generation:
+            return facet
+
+        with self._facet_lock:
+            facet = self._author_facet
+            if facet is not None and facet["generation"] == generation:
+                return facet
+
+            authors = read_author_facet(self.index_dir, generation)
+            if authors is None:
+                # Yan dosya yok ya da eski: bu nesil için bir kez tam tarama
+                logger.warning("Author facet file missing or stale, scanning stored fields once")
+                with self.searcher() as searcher:
+                    authors = sorted({
+                        f["author"].title() for f in searcher.all_stored_fields()
+                        if "author" in f and f["author"]
+                    })
+                try:
+                    write_author_facet(self.index_dir, authors, generation)
+                except OSError as e:
+                    logger.debug(f"Author facet file could not be written: {e}")
+
+            # Last-Modified worker'lar arasında aynı olsun: yan dosyanın zamanı
+            try:
+                last_modified = (self.index_dir / AUTHOR_FACET_FILE).stat().st_mtime
+            except OSError:
+                last_modified = time.time()
+
+            body = json.dumps({"authors": authors}, ensure_ascii=False).encode("utf-8")
+            facet = {
+                "generation": generation,
+                "authors": authors,
+                "body": body,
+                "etag": f'"{hashlib.sha1(body).hexdigest()[:20]}"',
+                "last_modified": last_modified,
+            }
+            self._author_facet = facet
+            return facet
+
+    def close(self):
+        """Boştaki tüm searcher'ları kapat"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for searcher in idle:
+            searcher.close()
+
+    def stats(self) -> dict:
+        return {
+            "generation": self._generation,
+            "idle": len(self._idle),
+            "opened": self.opened,
+            "reused": self.reused,
+            "refreshed": self.refreshed,
+        }
+
+
+# Global instance
+_searcher_pool: Optional[SearcherPool] = None
+_pool_lock = threading.Lock()
+
+def get_searcher_pool(index_dir=None) -> SearcherPool:
+    """Global searcher havuzunu getir"""
+    global _searcher_pool
+    with _pool_lock:
+        if _searcher_pool is None:
+            if index_dir is None:
+                from config import INDEX_DIR
+                index_dir = INDEX_DIR
+            _searcher_pool = SearcherPool(index_dir)
+        return _searcher_pool
@@ -0,0 +1,256 @@
+# spelling_index.py
+# Whoosh content sözlüğü üzerinde "bunu mu demek istediniz" önerileri (symmetric delete)
+
+import os
+import re
+import time
+import hashlib
+import logging
+import threading
+from collections import Counter
+from itertools import combinations
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from rapidfuzz.distance import OSA
+
+from turkish_search_utils import create_basic_turkish_analyzer, stem_turkish_word, normalize_turkish_text
+
+logger = logging.getLogger(__name__)
+
+# create_index.py'nin index dizinine yazdığı yazım sözlüğü
+SPELLING_FILE = "spelling.npz"
+SPELLING_MAX_DISTANCE = int(os.getenv("SPELLING_MAX_DISTANCE", "2"))
+# Silme anahtarları yalnızca terimin ilk N harfinden üretilir (bellek / hız dengesi)
+SPELLING_PREFIX_LENGTH = int(os.getenv("SPELLING_PREFIX_LENGTH", "7"))
+# Bu kadar belgede geçmeyen terimler (çoğunlukla OCR gürültüsü) öneri olarak sunulmaz
+SPELLING_MIN_DOC_FREQ = int(os.getenv("SPELLING_MIN_DOC_FREQ", "2"))
+SPELLING_MIN_TERM_LENGTH = 3
+
+
+def _deletes(word: str, max_distance: int, prefix_length: int) -> set:
+    """Kelimenin önekinden en fazla max_distance harf silinerek elde edilen dizgiler"""
+    prefix = word[:prefix_length]
+    result = {prefix}
+    for distance in range(1, min(max_distance, len(prefix) - 1) + 1):
+        for positions in combinations(range(len(prefix)), distance):
+            result.add("".join(c for i, c in enumerate(prefix) if i not in positions))
+    return result
+
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def _display_forms(reader, terms: List[str]) -> List[str]:
+    """
+    Her sözlük terimi (normalize kök) için kullanıcıya gösterilecek biçim: saklanan
+    metinlerde o köke inen en sık yüzey kelime ("rabit" -> "rabıta"). Bulunamazsa terimin kendisi.
+    """
+    surface_counts = Counter()
+    for fields in reader.all_stored_fields():
+        content = fields.get("content")
+        if content:
+            surface_counts.update(_WORD_PATTERN.findall(content.lower()))
+
+    wanted = set(terms)
+    best: Dict[str, Tuple[int, str]] = {}
+    for word, count in surface_counts.items():
+        if len(word) < SPELLING_MIN_TERM_LENGTH or not word.isalpha():
+            continue
+        term = stem_turkish_word(normalize_turkish_text(word))
+        if term in wanted and count > best.get(term, (0, ""))[0]:
+            best[term] = (count, word)
+    return [best[term][1] if term in best else term for term in terms]
+
+
+def _hash(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+
+def build_spelling_index(reader, index_dir, generation: int,
+                         max_distance: int = SPELLING_MAX_DISTANCE,
+                         prefix_length: int = SPELLING_PREFIX_LENGTH,
+                         min_doc_freq: int = SPELLING_MIN_DOC_FREQ) -> int:
+    """
+    Index okuyucusunun content sözlüğünden yazım sözlüğünü oluşturup yan dosyaya yaz.
+
+    Her terimin silme dizgilerinin özetleri (hash) sıralı bir diziye yazılır;
+    sorgu tarafı aynı silmeleri üretip ikili aramayla aday terimleri bulur.
+
+    Returns:
+        Sözlükteki terim sayısı
+    """
+    start = time.time()
+    terms, freqs = [], []
+    for term_bytes, terminfo in reader.iter_field("content"):
+        term = term_bytes.decode("utf-8") if isinstance(term_bytes, bytes) else term_bytes
+        if len(term) < SPELLING_MIN_TERM_LENGTH or not term.isalpha():
+            continue
+        if terminfo.doc_frequency() < min_doc_freq:
+            continue
+        terms.append(term)
+        freqs.append(terminfo.doc_frequency())
+
+    hashes, ids = [], []
+    for term_id, term in enumerate(terms):
+        for delete in _deletes(term, max_distance, prefix_length):
+            hashes.append(_hash(delete))
+            ids.append(term_id)
+
+    hashes = np.array(hashes, dtype="int64")
+    ids = np.array(ids, dtype="int32")
+    order = np.argsort(hashes, kind="stable")
+
+    path = Path(index_dir) / SPELLING_FILE
+    tmp_path = path.with_suffix(".tmp.npz")
+    np.savez(
+        tmp_path,
+        terms=np.array(terms, dtype=object).astype(str),
+        display=np.array(_display_forms(reader, terms), dtype=object).astype(str),
+        freqs=np.array(freqs, dtype="int32"),
+        hashes=hashes[order],
+        ids=ids[order],
+        meta=np.array([generation, max_distance, prefix_length], dtype="int64"),
+    )
+    os.replace(tmp_path, path)
+    logger.info(f"Spelling index written: {len(terms)} terms, {len(hashes)} deletes in {time.time() - start:.1f}s")
+    return len(terms)
+
+
+def spelling_index_outdated(index_dir) -> bool:
+    """Sözlük dosyası yoksa ya da gösterim biçimlerinden önceki formattaysa True"""
+    path = Path(index_dir) / SPELLING_FILE
+    if not path.exists():
+        return True
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            return "display" not in data.files
+    except Exception:
+        return True
+
+
+class SpellingIndex:
+    """Yan dosyadan yüklenen yazım sözlüğü; lookup birkaç milisaniyede biter"""
+
+    def __init__(self, path):
+        with np.load(path, allow_pickle=False) as data:
+            self.terms = data["terms"]
+            # Eski sözlük dosyalarında gösterim biçimleri yok: terimin kendisi gösterilir
+            self.display = data["display"] if "display" in data.files else self.terms
+            self.freqs = data["freqs"]
+            self.hashes = data["hashes"]
+            self.ids = data["ids"]
+            self.generation, self.max_distance, self.prefix_length = (int(v) for v in data["meta"])
+        # Kökler sözlükteki biçimdir, ama stemmer yanlış yazılmış kelimeleri bozabilir
+        # ("rabta" -> "rap"): öneriler hem normalize kelime hem kökü için aranır
+        self._analyzer = create_basic_turkish_analyzer()
+
+    def lookup(self, term: str, max_suggestions: int = 5,
+               max_distance: Optional[int] = None) -> List[Tuple[str, int, int]]:
+        """
+        Analiz edilmiş (normalize + kök) bir terim için öneriler.
+
+        Returns:
+            (terim, düzenleme mesafesi, belge frekansı) listesi; önce mesafe, sonra frekans
+        """
+        max_distance = min(max_distance or self.max_distance, self.max_distance)
+        keys = np.array([_hash(d) for d in _deletes(term, max_distance, self.prefix_length)], dtype="int64")
+        left = np.searchsorted(self.hashes, keys, side="left")
+        right = np.searchsorted(self.hashes, keys, side="right")
+        candidate_ids = {int(i) for lo, hi in zip(left, right) if hi > lo for i in self.ids[lo:hi]}
+
+        suggestions = []
+        for term_id in candidate_ids:
+            candidate = str(self.terms[term_id])
+            if abs(len(candidate) - len(term)) > max_distance:
+                continue
+            distance = OSA.distance(term, candidate, score_cutoff=max_distance)
+            if distance <= max_distance:
+                suggestions.append((candidate, distance, int(self.freqs[term_id])))
+        suggestions.sort(key=lambda s: (s[1], -s[2]))
+        return suggestions[:max_suggestions]
+
+    def display_form(self, term: str) -> str:
+        """Sözlük teriminin (kök) kullanıcıya gösterilecek biçimi"""
+        # terms, reader.iter_field sırasıyla (sıralı) yazılır
+        i = int(np.searchsorted(self.terms, term))
+        if i < len(self.terms) and self.terms[i] == term:
+            return str(self.display[i])
+        return term
+
+    def suggest(self, query: str, known_term=None, max_suggestions: int = 5) -> Dict[str, object]:
+        """
+        Sorgu kelimeleri için düzeltme önerileri ve düzeltilmiş sorgu.
+
+        Düzeltilmiş sorguda yalnızca düzeltilen kelimeler değişir (önerinin gösterim
+        biçimiyle); diğer kelimeler kullanıcının yazdığı gibi kalır.
+
+        Args:
+            known_term: Terimin index'te geçip geçmediğini söyleyen fonksiyon;
+                geçen terimler düzeltilmez (sözlük yalnızca sık terimleri tutar)
+        """
+        words = []
+        replacements = []
+        for token in self._analyzer(query, chars=True):
+            word = token.text
+            start, end = token.startchar, token.endchar
+            term = stem_turkish_word(word)
+            if len(term) < SPELLING_MIN_TERM_LENGTH or (known_term and known_term(term)):
+                continue
+            best = {}
+            for form in {word, term}:
+                for candidate, distance, freq in self.lookup(form, max_suggestions=max_suggestions):
+                    if candidate not in best or distance < best[candidate][1]:
+                        best[candidate] = (candidate, distance, freq)
+            suggestions = sorted(best.values(), key=lambda s: (s[1], -s[2]))[:max_suggestions]
+            if suggestions and suggestions[0][1] > 0:
+                words.append({
+                    "term": term,
+                    "word": query[start:end],
+                    "suggestions": [
+                        {"term": s, "display": self.display_form(s), "distance": d, "doc_frequency": f}
+                        for s, d, f in suggestions
+                    ],
+                })
+                replacements.append((start, end, self.display_form(suggestions[0][0])))
+
+        corrected = None
+        if replacements:
+            corrected = query
+            for start, end, replacement in reversed(replacements):
+                corrected = corrected[:start] + replacement + corrected[end:]
+        return {
+            "corrected_query": corrected,
+            "words": words,
+        }
+
+
+# Dosya değiştiğinde yeniden yüklenen sözlük
+_spelling_index: Optional[SpellingIndex] = None
+_spelling_mtime: Optional[float] = None
+_spelling_lock = threading.Lock()
+
+def get_spelling_index(index_dir=None) -> Optional[SpellingIndex]:
+    """Yazım sözlüğünü getir; yan dosya yoksa None, dosya yenilendiyse yeniden yükler"""
+    global _spelling_index, _spelling_mtime
+    if index_dir is None:
+        from config import INDEX_DIR
+        index_dir = INDEX_DIR
+    path = Path(index_dir) / SPELLING_FILE
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        return _spelling_index
+    if mtime == _spelling_mtime:
+        return _spelling_index
+    with _spelling_lock:
+        if mtime != _spelling_mtime:
+            try:
+                _spelling_index = SpellingIndex(path)
+                logger.info(f"Spelling index loaded (generation {_spelling_index.generation}, "
+                            f"{len(_spelling_index.terms)} terms)")
+            except Exception as e:
+                logger.error(f"Spelling index could not be loaded: {e}")
+            _spelling_mtime = mtime
+        return _spelling_index
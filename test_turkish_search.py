@@ -358,6 +358,98 @@ class TurkishSearchTester:
             print(f"  ❌ Query expansion performansı yavaş")
             self.results['failed'] += 1
     
+    def run_query_expansion_benchmark(self, filler_docs: int = 3000, repeats: int = 20):
+        """
+        Varyasyon (Or ağacı) ve normalize (tek terim) genişletme modlarının
+        bellekteki bir indeks üzerinde recall ve gecikme karşılaştırması.
+        """
+        print("\n🏁 Sorgu Genişletme Benchmark (variants vs normalized)")
+        print("=" * 50)
+        
+        import random
+        from whoosh.fields import Schema, TEXT, ID
+        from whoosh.filedb.filestore import RamStorage
+        
+        analyzer = create_turkish_analyzer()
+        ix = RamStorage().create_index(Schema(id=ID(stored=True), content=TEXT(analyzer=analyzer)))
+        
+        # Her varyasyon yazımı ayrı bir belgede + arama terimlerini içermeyen dolgu belgeleri
+        rng = random.Random(42)
+        filler = ['kitap', 'sayfa', 'ilim', 'kalp', 'dua', 'namaz', 'edep', 'hizmet', 'yol', 'nur',
+                  'hakikat', 'marifet', 'ahlak', 'sabır', 'şükür', 'niyet', 'amel', 'ihlas', 'takva', 'huzur']
+        writer = ix.writer()
+        doc_id = 0
+        words = []
+        for case in self.test_cases['vowel_variations']:
+            words.extend(case['variations'])
+        for case in self.test_cases['fuzzy_matching']:
+            words.extend([case['query']] + case['targets'])
+        for word in words:
+            text = " ".join(rng.choice(filler) for _ in range(30)) + f" {word} nedir nasıl"
+            writer.add_document(id=str(doc_id), content=text)
+            doc_id += 1
+        for _ in range(filler_docs):
+            writer.add_document(id=str(doc_id), content=" ".join(rng.choice(filler) for _ in range(60)))
+            doc_id += 1
+        writer.commit()
+        
+        queries = list(dict.fromkeys(
+            words + [case['query'] for case in self.test_cases['query_expansion']]
+        ))
+        expanders = {mode: TurkishQueryExpander(mode=mode) for mode in ('variants', 'normalized')}
+        found = {mode: {} for mode in expanders}
+        timings = {mode: 0.0 for mode in expanders}
+        
+        with ix.searcher() as searcher:
+            for mode, expander in expanders.items():
+                start_time = time.time()
+                for _ in range(repeats):
+                    for query in queries:
+                        results = searcher.search(expander.create_expanded_query(query, "content"), limit=980)
+                        found[mode][query] = {hit['id'] for hit in results}
+                timings[mode] = (time.time() - start_time) / (repeats * len(queries)) * 1000
+        
+        # Referans: test senaryolarında aynı kelime sayılan yazım grupları. Normalizasyondan
+        # bağımsızdır; aksi halde normalize modun recall'u tanım gereği tam çıkardı.
+        truth_groups = {
+            'varyasyon': [{case['base_word'], *case['variations']} for case in self.test_cases['vowel_variations']],
+            'fuzzy': [{case['query'], *case['targets']} for case in self.test_cases['fuzzy_matching']],
+        }
+        recall = {name: {mode: 0.0 for mode in expanders} for name in truth_groups}
+        for name, groups in truth_groups.items():
+            judged = 0
+            for query in queries:
+                head = query.split()[0]
+                spellings = set().union(*(group for group in groups if head in group))
+                if not spellings:
+                    continue
+                judged += 1
+                relevant = {str(i) for i, word in enumerate(words) if word in spellings}
+                for mode in expanders:
+                    recall[name][mode] += len(found[mode][query] & relevant) / len(relevant)
+            for mode in expanders:
+                recall[name][mode] /= max(judged, 1)
+                print(f"  📊 {mode:<10} recall ({name}, {judged} sorgu): {recall[name][mode]:.3f}")
+        for mode in expanders:
+            print(f"  📊 {mode:<10} ortalama sorgu: {timings[mode]:.3f} ms")
+        
+        speedup = timings['variants'] / timings['normalized'] if timings['normalized'] else 0.0
+        print(f"  📊 Hızlanma: {speedup:.1f}x")
+        
+        if all(recall[name]['normalized'] >= recall[name]['variants'] for name in truth_groups):
+            print("  ✅ Normalize mod recall kaybı olmadan çalışıyor")
+            self.results['passed'] += 1
+        else:
+            print("  ❌ Normalize mod recall kaybına yol açıyor")
+            self.results['failed'] += 1
+        
+        if timings['normalized'] < timings['variants']:
+            print("  ✅ Normalize mod daha hızlı")
+            self.results['passed'] += 1
+        else:
+            print("  ❌ Normalize mod daha yavaş")
+            self.results['failed'] += 1
+    
     def run_all_tests(self):
         """
         Tüm testleri çalıştırır.
@@ -374,6 +466,7 @@ class TurkishSearchTester:
         self.test_stemming()
         self.test_analyzer_integration()
         self.run_performance_tests()
+        self.run_query_expansion_benchmark()
         
         total_time = time.time() - start_time
         
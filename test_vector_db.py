@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# test_vector_db.py
+# Vektör veritabanında silme / yeniden oluşturma sonrası vector_id -> metadata eşlemesini test eder
+
+import hashlib
+
+import pytest
+
+np = pytest.importorskip("numpy")
+faiss = pytest.importorskip("faiss")
+
+import data.vector_db as vector_db
+
+
+class HashEmbeddingModel:
+    """Model indirmeden deterministik embedding üreten test modeli (aynı metin -> aynı vektör)"""
+
+    dimension = 16
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+
+    def get_sentence_embedding_dimension(self):
+        return self.dimension
+
+    def encode(self, texts, convert_to_numpy=True):
+        vectors = [
+            np.random.default_rng(int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16)).standard_normal(self.dimension)
+            for text in texts
+        ]
+        return np.array(vectors, dtype="float32")
+
+
+@pytest.fixture
+def make_db(tmp_path, monkeypatch):
+    # Yalnızca embedding modeli sahte; FAISS ve SQLite gerçek
+    monkeypatch.setattr(vector_db, "np", np)
+    monkeypatch.setattr(vector_db, "faiss", faiss)
+    monkeypatch.setattr(vector_db, "SentenceTransformer", HashEmbeddingModel)
+    monkeypatch.setattr(vector_db, "VECTOR_DEPS_AVAILABLE", True)
+    monkeypatch.setattr(vector_db, "QUERY_CACHE_DISK", False)
+    monkeypatch.setattr(vector_db.VectorDatabase, "_download_from_backblaze", lambda self: False)
+
+    def make(**settings):
+        for name, value in settings.items():
+            monkeypatch.setattr(vector_db, name, value)
+        # Aynı dizini açan iki örnek iki gunicorn worker'ı gibi davranır
+        return vector_db.VectorDatabase(db_path=str(tmp_path / "vector_db"))
+
+    return make
+
+
+def _documents(n, start=0):
+    return [
+        {"content": f"doc {i}", "source_type": "book", "source_id": f"s{i}", "title": f"T{i}"}
+        for i in range(start, start + n)
+    ]
+
+
+def _assert_results_match_content(db, queries):
+    for i in queries:
+        results = db.search(f"doc {i}", k=1)
+        assert results, f"doc {i} bulunamadı"
+        assert results[0]["content"] == f"doc {i}"
+        assert results[0]["source_id"] == f"s{i}"
+
+
+def test_rebuild_as_ivf_pq_after_delete_keeps_ids_aligned(make_db):
+    # PQ2: tek çekirdekte PQ eğitimi hızlı kalsın
+    db = make_db(VECTOR_INDEX_TRAIN_THRESHOLD=100, VECTOR_PQ_M=2)
+    db.add_documents(_documents(400))
+    db.compact()
+
+    assert db.delete_by_source("book", "s5") == 1
+    db.rebuild_index("ivf_pq")
+    assert vector_db.detect_backend(db.index) == "ivf_pq"
+
+    # PQ index'ten vektör geri alınamaz: ikinci yeniden oluşturma metadata'dan encode eder
+    assert db.delete_by_source("book", "s6") == 1
+    db.rebuild_index("ivf_pq")
+    assert db.index.ntotal == 398
+
+    _assert_results_match_content(db, [0, 4, 7, 8, 200, 399])
+    assert all(r["source_id"] not in ("s5", "s6") for r in db.search("doc 5", k=20))
+
+
+def test_purge_after_delete_keeps_ids_aligned(make_db):
+    db = make_db()
+    db.add_documents(_documents(50))
+    db.compact()
+
+    db.delete_by_source("book", "s10")
+    assert db.purge_deleted() == 1
+    assert db.index.ntotal == 49
+    _assert_results_match_content(db, [9, 11, 49])
+
+
+def test_workers_share_ids_wal_and_compaction(make_db):
+    worker_a = make_db()
+    worker_b = make_db()
+
+    # Her worker diğerinin eklemelerini görerek id ayırır: çakışma / üzerine yazma yok
+    assert worker_a.add_documents(_documents(10)) == list(range(0, 10))
+    assert worker_b.add_documents(_documents(10, 10)) == list(range(10, 20))
+    assert worker_a.add_documents(_documents(5, 20)) == list(range(20, 25))
+    _assert_results_match_content(worker_a, [3, 15, 22])
+    _assert_results_match_content(worker_b, [3, 15, 22])
+
+    # Sıkıştırma diğer worker'ın WAL'a yazdıklarını da birleştirir
+    assert worker_b.compact() == 25
+    assert worker_b.wal_file.stat().st_size == 0
+    assert worker_a.add_documents(_documents(5, 25)) == list(range(25, 30))
+    worker_a.compact()
+    assert worker_a.index.ntotal == 30
+
+    # Diğer worker yeni index'i ve silmeleri generation değişince yükler
+    worker_a.delete_by_source("book", "s12")
+    _assert_results_match_content(worker_b, [0, 11, 27, 29])
+    assert worker_b.delta_index.ntotal == 0
+    assert all(r["source_id"] != "s12" for r in worker_b.search("doc 12", k=30))
+
+    # Yeniden açılışta her şey ana index'te
+    reopened = make_db()
+    assert reopened.index.ntotal == 30 and reopened.delta_index.ntotal == 0
+    _assert_results_match_content(reopened, [0, 15, 29])
+
+
+def test_replayed_wal_is_compacted_in_background(make_db):
+    writer = make_db()
+    writer.add_documents(_documents(20))
+    writer._compaction_timer.cancel()  # süreç çıkmış gibi: WAL birleştirilmedi
+
+    reader = make_db(VECTOR_DELTA_COMPACT_THRESHOLD=10)
+    # Eşiği aşan WAL açılışta eşzamanlı birleştirilir
+    assert reader.delta_index.ntotal == 0 and reader.index.ntotal == 20
+
+    writer.add_documents(_documents(5, 20))
+    writer._compaction_timer.cancel()
+    restarted = make_db(VECTOR_DELTA_COMPACT_INTERVAL=0)
+    # Küçük delta için arka planda sıkıştırma planlanır
+    restarted._compaction_timer.join(timeout=30)
+    assert restarted.delta_index.ntotal == 0 and restarted.index.ntotal == 25
+    _assert_results_match_content(restarted, [0, 24])
+
+
+def test_query_embedding_disk_cache_is_capped_lru(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_db, "np", np)
+    disk_path = tmp_path / "query_embeddings.db"
+
+    # last_used kolonu olmayan eski tablo açılışta taşınır
+    conn = vector_db.sqlite3.connect(disk_path)
+    conn.execute("""
+        CREATE TABLE query_embeddings (
+            query_key TEXT NOT NULL, model TEXT NOT NULL, vector BLOB NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, PRIMARY KEY (query_key, model)
+        )
+    """)
+    conn.execute("INSERT INTO query_embeddings (query_key, model, vector) VALUES ('eski', 'm', ?)",
+                 (np.zeros(4, dtype="float32").tobytes(),))
+    conn.commit()
+    conn.close()
+
+    cache = vector_db.QueryEmbeddingCache("m", 4, disk_path=disk_path, max_size=0, disk_max_rows=10)
+    assert cache.get("eski") is not None
+    for i in range(10):
+        cache.put(f"q{i}", np.full(4, i, dtype="float32"))
+        cache.get("eski")  # kullanılan satır budanmaz
+
+    stats = cache.stats()
+    assert stats["disk_rows"] <= 10 and stats["disk_pruned"] > 0 and stats["disk_size_mb"] >= 0
+    assert cache.get("eski") is not None
+    assert cache.get("q0") is None
+    assert cache.get("q9") is not None
@@ -6,7 +6,9 @@ Bu modül Türkçe sesli harf uyumları ve yazım varyasyonları için
 whoosh arama motorunda tutarlı sonuçlar sağlar.
 """
 
+import os
 import re
+from functools import lru_cache
 from typing import List, Dict, Set, Tuple
 from whoosh.analysis import Filter, RegexTokenizer, LowercaseFilter
 from whoosh.query import Or, Term, And, FuzzyTerm
@@ -19,6 +21,34 @@ except ImportError:
     print("Warning: TurkishStemmer not available. Install with: pip install TurkishStemmer")
 
 
+# Sesli harf grupları - aynı anlama gelen varyasyonlar
+VOWEL_GROUPS = {
+    'a': ['a', 'â', 'à'],
+    'e': ['e', 'ê', 'è'], 
+    'i': ['i', 'î', 'ì', 'ı'],
+    'o': ['o', 'ô', 'ò'],
+    'u': ['u', 'û', 'ù', 'ü', 'ű'],
+    'ö': ['ö', 'ő']
+}
+
+# Ters mapping - her varyasyonu temel harfe çevir (büyük harfler dahil)
+VOWEL_NORMALIZE_MAP = {}
+for _base, _variants in VOWEL_GROUPS.items():
+    for _variant in _variants:
+        VOWEL_NORMALIZE_MAP[_variant] = _base
+        VOWEL_NORMALIZE_MAP[_variant.upper()] = _base.upper()
+
+# str.translate için önceden derlenmiş tablo (karakter başına Python döngüsü yerine C'de çalışır)
+VOWEL_TRANSLATION_TABLE = str.maketrans(VOWEL_NORMALIZE_MAP)
+
+# Stem önbelleğinde tutulacak en fazla farklı kelime sayısı
+STEM_CACHE_SIZE = int(os.getenv("TURKISH_STEM_CACHE_SIZE", "200000"))
+
+# Sorgu genişletme modu: "normalized" (indeks analyzer'ı ile kelime başına tek terim)
+# veya "variants" (kelime başına sesli harf varyasyonlarından oluşan Or)
+QUERY_EXPANSION_MODE = os.getenv("TURKISH_QUERY_EXPANSION", "normalized")
+
+
 class TurkishVowelNormalizer(Filter):
     """
     Türkçe sesli harf varyasyonlarını normalize eden filter.
@@ -27,57 +57,55 @@ class TurkishVowelNormalizer(Filter):
     """
     
     def __init__(self):
-        # Sesli harf grupları - aynı anlama gelen varyasyonlar
-        self.vowel_groups = {
-            'a': ['a', 'â', 'à'],
-            'e': ['e', 'ê', 'è'], 
-            'i': ['i', 'î', 'ì', 'ı'],
-            'o': ['o', 'ô', 'ò'],
-            'u': ['u', 'û', 'ù', 'ü', 'ű'],
-            'ö': ['ö', 'ő']
-        }
-        
-        # Ters mapping oluştur - her varyasyonu temel harfe çevir
-        self.normalize_map = {}
-        for base, variants in self.vowel_groups.items():
-            for variant in variants:
-                self.normalize_map[variant] = base
-                # Büyük harfler için de mapping ekle
-                self.normalize_map[variant.upper()] = base.upper()
+        self.vowel_groups = VOWEL_GROUPS
+        self.normalize_map = VOWEL_NORMALIZE_MAP
     
     def __call__(self, tokens):
+        table = VOWEL_TRANSLATION_TABLE
         for token in tokens:
-            # Her karakteri normalize et
-            normalized = ''.join(
-                self.normalize_map.get(char, char) 
-                for char in token.text
-            )
-            token.text = normalized
+            token.text = token.text.translate(table)
             yield token
 
 
+_stemmer = TurkishStemmer() if TURKISH_STEMMER_AVAILABLE else None
+
+@lru_cache(maxsize=STEM_CACHE_SIZE)
+def stem_turkish_word(word: str) -> str:
+    """
+    Kelimenin kökünü döndürür; sonuç kelime biçimine göre önbelleğe alınır.
+    
+    Kısa kelimeler, geçersiz stem'ler ve stemmer hataları için kelimenin kendisi döner.
+    """
+    if _stemmer is None or len(word) <= 2:  # Çok kısa kelimeleri stem etme
+        return word
+    try:
+        stemmed = _stemmer.stem(word)
+    except Exception:
+        return word  # Stemming başarısız olursa orijinal kelimeyi koru
+    if stemmed and len(stemmed) > 1:  # Geçerli stem kontrolü
+        return stemmed
+    return word
+
+
 class TurkishStemFilter(Filter):
     """
     Türkçe stemming için filter.
     
     TurkishStemmer kütüphanesini kullanarak kelimeleri kök hallerine indirgir.
+    Sonuçlar `stem_turkish_word` üzerinden süreç genelinde önbelleğe alınır.
     """
     
     def __init__(self):
+        # Şema ile birlikte pickle edilir: mevcut indekslerle uyum için korunur
         if TURKISH_STEMMER_AVAILABLE:
             self.stemmer = TurkishStemmer()
         else:
             self.stemmer = None
     
     def __call__(self, tokens):
+        stem = stem_turkish_word
         for token in tokens:
-            if self.stemmer and len(token.text) > 2:  # Çok kısa kelimeleri stem etme
-                try:
-                    stemmed = self.stemmer.stem(token.text)
-                    if stemmed and len(stemmed) > 1:  # Geçerli stem kontrolü
-                        token.text = stemmed
-                except Exception:
-                    pass  # Stemming başarısız olursa orijinal kelimeyi koru
+            token.text = stem(token.text)
             yield token
 
 
@@ -86,7 +114,8 @@ class TurkishQueryExpander:
     Türkçe sorgular için query expansion ve fuzzy matching.
     """
     
-    def __init__(self):
+    def __init__(self, mode: str = QUERY_EXPANSION_MODE):
+        self.mode = mode
         self.vowel_variants = {
             'a': ['a', 'â', 'à'],
             'e': ['e', 'ê', 'è'],
@@ -142,6 +171,41 @@ class TurkishQueryExpander:
         return list(variants)[:max_variants]
     
     def create_expanded_query(self, query_text: str, field_name: str = "content") -> Or:
+        """
+        Sorgu metnini genişletir (mod: self.mode).
+        
+        Args:
+            query_text: Arama metni
+            field_name: Aranacak alan adı
+            
+        Returns:
+            Genişletilmiş whoosh query objesi
+        """
+        if self.mode == "normalized":
+            return self.create_normalized_query(query_text, field_name)
+        return self.create_variant_query(query_text, field_name)
+    
+    def create_normalized_query(self, query_text: str, field_name: str = "content"):
+        """
+        Sorguyu indeksle aynı analyzer'dan geçirip kelime başına tek terim üretir.
+        
+        İndeks sesli harfleri normalize edip kökleri sakladığı için varyasyonların
+        hepsi aynı terime düşer; Or ağaçlarına gerek kalmaz.
+        """
+        words = [w for w in query_text.lower().split() if w not in self.stop_words and len(w) > 1]
+        
+        terms = []
+        for token in _query_analyzer()(" ".join(words)):
+            # "mürşid-i" gibi eklerden kalan tek harfli parçalar atlanır
+            if len(token.text) > 1 and token.text not in terms:
+                terms.append(token.text)
+        
+        if not terms:
+            return Term(field_name, query_text.lower())
+        word_queries = [Term(field_name, term) for term in terms]
+        return And(word_queries) if len(word_queries) > 1 else word_queries[0]
+    
+    def create_variant_query(self, query_text: str, field_name: str = "content") -> Or:
         """
         Sorgu metnini tüm varyasyonlarıyla genişletir.
         
@@ -179,18 +243,29 @@ class TurkishQueryExpander:
         else:
             return word_queries[0] if word_queries else Term(field_name, query_text.lower())
     
-    def create_fuzzy_query(self, query_text: str, field_name: str = "content", max_dist: int = 2) -> Or:
+    def create_fuzzy_query(self, query_text: str, field_name: str = "content", max_dist: int = 2,
+                           index_dir=None) -> Or:
         """
         Fuzzy matching ile sorgu oluşturur.
         
+        index_dir altında create_index.py'nin yazdığı yazım sözlüğü varsa tüm terim
+        sözlüğünü tarayan FuzzyTerm yerine sözlükten gelen öneri terimleri kullanılır;
+        düzeltilecek kelime yoksa FuzzyTerm genişletmesine dönülür.
+        
         Args:
             query_text: Arama metni
             field_name: Aranacak alan adı
             max_dist: Maksimum edit distance
+            index_dir: Whoosh index dizini (yazım sözlüğü için)
             
         Returns:
             Fuzzy whoosh query objesi
         """
+        if index_dir is not None:
+            suggestion_query = self.create_suggestion_query(query_text, field_name, index_dir)
+            if suggestion_query is not None:
+                return suggestion_query
+        
         words = [w.lower().strip() for w in query_text.split() if w.strip()]
         words = [w for w in words if w not in self.stop_words and len(w) > 2]
         
@@ -206,6 +281,32 @@ class TurkishQueryExpander:
         else:
             return fuzzy_terms[0]
     
+    def create_suggestion_query(self, query_text: str, field_name: str, index_dir, max_suggestions: int = 3):
+        """
+        Yazım sözlüğündeki önerilerden sorgu: kelime başına en yakın terimlerin Or'u.
+        Sözlük yoksa ya da düzeltilecek kelime yoksa None (sorgu asıl aramayla aynı olurdu).
+        """
+        from spelling_index import get_spelling_index
+        
+        spelling = get_spelling_index(index_dir)
+        if spelling is None:
+            return None
+        
+        words = [w for w in query_text.lower().split() if w not in self.stop_words and len(w) > 2]
+        suggestion = spelling.suggest(" ".join(words), max_suggestions=max_suggestions)
+        corrections = {w["term"]: [s["term"] for s in w["suggestions"]] for w in suggestion["words"]}
+        if not corrections:
+            return None
+        
+        word_queries = []
+        for token in _query_analyzer()(" ".join(words)):
+            terms = [Term(field_name, term) for term in corrections.get(token.text, [token.text])]
+            word_queries.append(Or(terms) if len(terms) > 1 else terms[0])
+        
+        if not word_queries:
+            return None
+        return And(word_queries) if len(word_queries) > 1 else word_queries[0]
+    
     def calculate_similarity(self, text1: str, text2: str) -> float:
         """
         İki metin arasındaki benzerlik skorunu hesaplar.
@@ -221,19 +322,8 @@ class TurkishQueryExpander:
             return 0.0
         
         # Metinleri normalize et
-        normalizer = TurkishVowelNormalizer()
-        
-        # Basit token oluştur
-        class SimpleToken:
-            def __init__(self, text):
-                self.text = text
-        
-        # Normalize et
-        token1 = SimpleToken(text1.lower())
-        token2 = SimpleToken(text2.lower())
-        
-        normalized1 = list(normalizer([token1]))[0].text
-        normalized2 = list(normalizer([token2]))[0].text
+        normalized1 = normalize_turkish_text(text1)
+        normalized2 = normalize_turkish_text(text2)
         
         # Fuzzy ratio hesapla
         return fuzz.ratio(normalized1, normalized2)
@@ -253,6 +343,12 @@ def create_turkish_analyzer():
             TurkishStemFilter())
 
 
+@lru_cache(maxsize=1)
+def _query_analyzer():
+    """Sorgu tarafında paylaşılan analyzer (indeksleme zinciriyle aynı)"""
+    return create_turkish_analyzer()
+
+
 def create_basic_turkish_analyzer():
     """
     Temel Türkçe analyzer (stemming olmadan).
@@ -279,16 +375,7 @@ def normalize_turkish_text(text: str) -> str:
     if not text:
         return text
     
-    normalizer = TurkishVowelNormalizer()
-    
-    class SimpleToken:
-        def __init__(self, text):
-            self.text = text
-    
-    token = SimpleToken(text.lower())
-    normalized_token = list(normalizer([token]))[0]
-    
-    return normalized_token.text
+    return text.lower().translate(VOWEL_TRANSLATION_TABLE)
 
 
 def test_turkish_search_utils():